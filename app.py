@@ -22,8 +22,17 @@ from reportlab.pdfbase import pdfmetrics
 from reportlab.pdfbase.ttfonts import TTFont
 
 # Import custom modules
-from z_score_calculator import WHOZScoreCalculator
-from knn_model_trainer import StuntingKNNModel
+from z_score_calculator import DAYS_PER_MONTH, WHOZScoreCalculator, age_in_days
+from model_manager import ModelManager
+from model_registry import RegionModelRegistry, estimate_model_bytes
+from tracing import TRACER
+from metrics import METRICS
+from child_registry import ChildRegistry
+from screening_log import ScreeningLog, screening_record
+from prevalence_aggregates import PrevalenceAggregates, shift_period
+from result_store import PDFStore, SessionMemory, compact_result, expand_result
+from task_queue import FINISHED_STATES, TASK_CANCELLED, TASK_DONE, TASK_FAILED, TASK_QUEUED, TaskQueue
+from batch_screener import DEFAULT_COLUMNS as SCREENING_COLUMNS, iter_chunks, screen_chunk
 
 # =====================================================
 # CONFIGURATION
@@ -598,32 +607,272 @@ st.markdown(f"""
 # LOAD MODELS
 # =====================================================
 
+def register_model_metrics(model_manager, region_registry):
+    """Daftarkan metrik versi, waktu load, memori dan cache model ke METRICS"""
+    def collect():
+        handle = model_manager.current
+        monitor = handle.model.drift_monitor if handle else None
+        drift = monitor.summary() if monitor else {'psi': {}, 'n_window': None}
+        versions = [({'region': 'default', 'version': handle.version}, 1)] if handle else []
+        versions += [({'region': code, 'version': version}, 1) for (code, version), _ in region_registry.resident()]
+        return [
+            ('stunting_model_info', 'gauge', 'Model KNN yang sedang resident', versions),
+            ('stunting_model_memory_bytes', 'gauge', 'Perkiraan memori model KNN', [
+                ({'region': 'default'}, estimate_model_bytes(handle.model) if handle else None),
+                ({'region': 'regions'}, region_registry.resident_bytes)
+            ]),
+            ('stunting_model_reloads_total', 'counter', 'Penukaran model default berhasil/gagal', [
+                ({'result': 'success'}, model_manager.stats['reloads']),
+                ({'result': 'failure'}, model_manager.stats['reload_failures'])
+            ]),
+            ('stunting_model_last_load_seconds', 'gauge', 'Durasi load + smoke test model default terakhir', [
+                ({}, model_manager.stats['last_load_seconds'])
+            ]),
+            ('stunting_region_cache_total', 'counter', 'Akses cache LRU model wilayah', [
+                ({'result': 'hit'}, region_registry.stats['hits']),
+                ({'result': 'miss'}, region_registry.stats['misses']),
+                ({'result': 'eviction'}, region_registry.stats['evictions'])
+            ]),
+            ('stunting_region_load_seconds_total', 'counter', 'Total durasi load model wilayah', [
+                ({}, region_registry.stats['load_seconds'])
+            ]),
+            ('stunting_input_drift_psi', 'gauge', 'PSI input prediksi (jendela terbaru) vs data training', [
+                ({'feature': feature}, value) for feature, value in drift['psi'].items()
+            ]),
+            ('stunting_input_drift_observations', 'gauge', 'Input prediksi di jendela monitor drift', [
+                ({}, drift['n_window'])
+            ])
+        ]
+    
+    METRICS.register_collector(collect)
+
 @st.cache_resource
 def load_models():
-    """Load WHO Z-Score Calculator and KNN Model"""
-    zscore_calc = WHOZScoreCalculator()
+    """Load WHO Z-Score Calculator, KNN Model Manager (hot reload dari folder models/) dan registry model per wilayah"""
+    with TRACER.trace('load_models'):
+        with TRACER.span('load_models.zscore_calculator'):
+            zscore_calc = WHOZScoreCalculator()
+        
+        # Get the directory where app.py is located
+        current_dir = os.path.dirname(os.path.abspath(__file__))
+        data_path = os.path.join(current_dir, "data_balita.csv")
+        model_path = os.path.join(current_dir, "models")
+        
+        # Indeks KNN ringkas (compact_index.npz) dipakai jika tersedia; STUNTING_COMPACT_KNN=0 untuk menonaktifkan
+        use_compact = os.environ.get("STUNTING_COMPACT_KNN", "1") != "0"
+        
+        # Satu manager per proses: versi baru dimuat di background lalu ditukar atomik.
+        # STUNTING_SHARED_MODEL_DIR: indeks di-mmap dari slot yang dipublikasikan loader
+        # `python shared_model.py serve` (dibagi oleh semua proses Streamlit)
+        with TRACER.span('load_models.model_manager'):
+            model_manager = ModelManager(
+                model_path,
+                poll_interval=float(os.environ.get("STUNTING_MODEL_POLL_SECONDS", "30")),
+                smoke_data_path=data_path,
+                compact=use_compact,
+                shared_dir=os.environ.get("STUNTING_SHARED_MODEL_DIR") or None
+            ).start()
+        
+        # Model khusus wilayah di models/regions/<kode>/, dimuat saat dipakai (LRU dengan batas memori)
+        region_registry = RegionModelRegistry(
+            model_path,
+            max_bytes=int(float(os.environ.get("STUNTING_REGION_MODEL_BUDGET_MB", "256")) * 1024 * 1024),
+            default_manager=model_manager,
+            compact=use_compact
+        )
     
-    # Get the directory where app.py is located
+    register_model_metrics(model_manager, region_registry)
+    METRICS.start_from_env()
+    
+    return zscore_calc, model_manager, region_registry
+
+zscore_calculator, model_manager, region_registry = load_models()
+
+if model_manager.current is None:
+    st.warning(f"⚠️ Model KNN tidak tersedia. Pastikan model sudah di-training terlebih dahulu.")
+
+@st.cache_resource
+def load_registry():
+    """Load registry longitudinal anak (SQLite lokal) beserta agregat prevalensi"""
+    current_dir = os.path.dirname(os.path.abspath(__file__))
+    db_path = os.environ.get("STUNTING_REGISTRY_DB", os.path.join(current_dir, "child_registry.db"))
+    registry = ChildRegistry(db_path, calculator=zscore_calculator)
+    return registry, PrevalenceAggregates(registry)
+
+child_registry, prevalence_aggregates = load_registry()
+
+@st.cache_resource
+def load_screening_log():
+    """Log audit append-only setiap analisis (writer background, satu per proses)"""
     current_dir = os.path.dirname(os.path.abspath(__file__))
-    data_path = os.path.join(current_dir, "data_balita.csv")
-    model_path = os.path.join(current_dir, "models")
+    log_dir = os.environ.get("STUNTING_SCREENING_LOG_DIR", os.path.join(current_dir, "logs", "screening"))
+    screening_log = ScreeningLog(
+        log_dir,
+        flush_interval=float(os.environ.get("STUNTING_SCREENING_LOG_FLUSH_SECONDS", "1"))
+    ).start()
+    METRICS.register_collector(lambda: [
+        ('stunting_screening_log_records_total', 'counter', 'Record audit screening yang sudah ditulis ke disk', [
+            ({}, screening_log.stats['written'])
+        ]),
+        ('stunting_screening_log_pending', 'gauge', 'Record audit di antrean writer', [({}, screening_log.pending)]),
+        ('stunting_screening_log_write_errors_total', 'counter', 'Kegagalan tulis log audit', [
+            ({}, screening_log.stats['write_errors'])
+        ])
+    ])
+    return screening_log
+
+screening_log = load_screening_log()
+
+@st.cache_resource
+def load_result_store():
+    """Store PDF bersama (LRU dengan batas byte) dan akuntansi memori per sesi, satu per proses"""
+    pdf_store = PDFStore(max_bytes=int(float(os.environ.get("STUNTING_PDF_STORE_MB", "32")) * 1024 * 1024))
+    session_memory = SessionMemory(ttl=float(os.environ.get("STUNTING_SESSION_TTL_SECONDS", "3600")))
+    
+    def collect():
+        sessions = session_memory.summary()
+        return [
+            ('stunting_pdf_store_bytes', 'gauge', 'Byte laporan PDF di store bersama', [({}, pdf_store.nbytes)]),
+            ('stunting_pdf_store_total', 'counter', 'Akses store PDF', [
+                ({'result': 'hit'}, pdf_store.stats['hits']),
+                ({'result': 'miss'}, pdf_store.stats['misses']),
+                ({'result': 'eviction'}, pdf_store.stats['evictions'])
+            ]),
+            ('stunting_sessions_active', 'gauge', 'Sesi dengan script run dalam TTL', [({}, sessions['sessions'])]),
+            ('stunting_session_state_bytes', 'gauge', 'Perkiraan ukuran session_state', [
+                ({'stat': 'total'}, sessions['total_bytes']),
+                ({'stat': 'max'}, sessions['max_bytes'])
+            ])
+        ]
     
-    knn_model = StuntingKNNModel(data_path)
-    try:
-        knn_model.load_model(model_path)
-        # Model loaded successfully (silently)
-    except Exception as e:
-        st.warning(f"⚠️ Model KNN tidak tersedia. Pastikan model sudah di-training terlebih dahulu.")
-        return zscore_calc, None
+    METRICS.register_collector(collect)
+    return pdf_store, session_memory
+
+pdf_store, session_memory = load_result_store()
+
+@st.cache_resource
+def load_task_queue():
+    """Antrean tugas berat (PDF, screening file) dengan batas worker global dan per sesi, satu per proses"""
+    task_queue = TaskQueue(
+        max_workers=int(os.environ.get("STUNTING_TASK_WORKERS", "2")),
+        max_per_user=int(os.environ.get("STUNTING_TASK_PER_USER", "1")),
+        max_queued_per_user=int(os.environ.get("STUNTING_TASK_QUEUED_PER_USER", "4")),
+        result_ttl=float(os.environ.get("STUNTING_TASK_RESULT_TTL_SECONDS", "600"))
+    ).start()
+    
+    def collect():
+        summary = task_queue.summary()
+        return [
+            ('stunting_tasks', 'gauge', 'Tugas background per state (belum di-collect)', [
+                ({'state': state}, count) for state, count in summary['states'].items()
+            ]),
+            ('stunting_tasks_total', 'counter', 'Tugas background per hasil', [
+                ({'result': result}, summary[result])
+                for result in ('submitted', 'deduplicated', 'rejected', 'completed', 'failed', 'cancelled', 'expired')
+            ]),
+            ('stunting_task_seconds_total', 'counter', 'Total waktu tunggu & jalan tugas background', [
+                ({'phase': 'wait'}, summary['wait_seconds']),
+                ({'phase': 'run'}, summary['run_seconds'])
+            ])
+        ]
     
-    return zscore_calc, knn_model
+    METRICS.register_collector(collect)
+    return task_queue
 
-zscore_calculator, knn_model = load_models()
+task_queue = load_task_queue()
 
 # =====================================================
 # HELPER FUNCTIONS
 # =====================================================
 
+def resolve_model_handle(model_region, model_version):
+    """ModelHandle versi yang dipakai saat analisis (None jika sudah ditukar/tidak tersedia)"""
+    try:
+        handle = region_registry.get(model_region, model_version) if model_region else model_manager.current
+    except KeyError:
+        return None
+    return handle if handle is not None and handle.version == model_version else None
+
+def current_session_id():
+    """ID sesi Streamlit untuk akuntansi memori (None di luar script run)"""
+    try:
+        from streamlit.runtime.scriptrunner import get_script_run_ctx
+    except ImportError:
+        return None
+    ctx = get_script_run_ctx()
+    return ctx.session_id if ctx is not None else None
+
+TASK_POLL_SECONDS = float(os.environ.get("STUNTING_TASK_POLL_SECONDS", "1"))
+
+def task_owner():
+    """Pemilik tugas background (batas per pengguna dihitung per sesi Streamlit)"""
+    return current_session_id() or 'local'
+
+def render_task_status(task_id, label):
+    """Progress tugas yang belum selesai; rerun seluruh halaman begitu tugas selesai"""
+    status = task_queue.status(task_id)
+    if status is None or status['state'] in FINISHED_STATES:
+        st.rerun()
+    if status['state'] == TASK_QUEUED:
+        st.info(f"⏳ {label}: menunggu giliran (antrean ke-{status['position']})")
+    else:
+        st.progress(status['progress'], text=f"⚙️ {label}: {status['message'] or 'sedang diproses'}")
+    if st.button("✖️ Batalkan", key=f"cancel_{task_id}"):
+        task_queue.cancel(task_id)
+        st.rerun()
+
+# Polling otomatis hanya me-rerun bagian status (Streamlit >= 1.37); versi lama memakai tombol
+poll_task_status = st.fragment(run_every=TASK_POLL_SECONDS)(render_task_status) if hasattr(st, 'fragment') else None
+
+def background_task(kind, key, label, fn, *args, submit=True, keep=False):
+    """
+    Jalankan `fn(progress, *args)` di antrean tugas (satu tugas per kind+key per sesi)
+
+    Returns: Hasil tugas jika sudah selesai; None jika masih menunggu/berjalan (progress
+    ditampilkan dan dipoll), gagal, dibatalkan, atau belum disubmit (`submit=False`).
+    `keep=True` membiarkan hasil di cache antrean sampai dibuang (mis. file hasil untuk diunduh).
+    """
+    owner = task_owner()
+    task_id = task_queue.find(owner, (kind, key))
+    status = task_queue.status(task_id) if task_id else None
+    
+    if status is not None and status['state'] in (TASK_FAILED, TASK_CANCELLED):
+        if status['state'] == TASK_FAILED:
+            st.error(f"❌ {label} gagal: {status['error']}")
+        else:
+            st.info(f"ℹ️ {label} dibatalkan.")
+        if st.button("🔁 Coba Lagi", key=f"retry_{task_id}"):
+            task_queue.discard(task_id)
+            st.rerun()
+        return None
+    
+    if status is None:
+        if not submit:
+            return None
+        try:
+            task_id = task_queue.submit(owner, kind, fn, *args, key=(kind, key))
+        except RuntimeError as e:
+            st.warning(f"⏳ {e}")
+            return None
+        status = task_queue.status(task_id)
+    
+    if status['state'] == TASK_DONE:
+        return task_queue.collect(task_id, keep=keep)
+    
+    if poll_task_status is not None:
+        poll_task_status(task_id, label)
+    else:
+        render_task_status(task_id, label)
+        st.button("🔄 Perbarui Status", key=f"poll_{task_id}")
+    return None
+
+WEIGHT_INDICATOR_NAMES = {
+    'wfa': 'BB/U (Berat Badan menurut Umur)',
+    'wfh': 'BB/TB (Berat Badan menurut Tinggi Badan)',
+    'bfa': 'IMT/U (Indeks Massa Tubuh menurut Umur)'
+}
+
+@TRACER.traced('chart.gauge')
 def create_gauge_chart(value, title, color):
     """Create gauge chart for visualization"""
     # Use theme-appropriate text colors
@@ -664,6 +913,7 @@ def create_gauge_chart(value, title, color):
     
     return fig
 
+@TRACER.traced('chart.probability')
 def create_probability_chart(probabilities):
     """Create bar chart for KNN probabilities"""
     # Use theme-appropriate text colors
@@ -704,6 +954,37 @@ def create_probability_chart(probabilities):
     
     return fig
 
+@TRACER.traced('chart.trajectory')
+def create_trajectory_chart(trajectory):
+    """Create line chart of Z-Score history from registry"""
+    text_color = COLORS['text_dark'] if st.session_state.theme == 'light' else COLORS['text_light']
+    
+    fig = go.Figure()
+    fig.add_trace(go.Scatter(
+        x=trajectory['measured_at'],
+        y=trajectory['zscore_hfa'],
+        mode='lines+markers',
+        name='Z-Score TB/U',
+        line={'color': COLORS['primary'], 'width': 3},
+        customdata=trajectory[['height_cm']],
+        hovertemplate='%{x}<br>Z-Score: %{y:.2f}<br>TB: %{customdata[0]:.1f} cm<extra></extra>'
+    ))
+    fig.add_hline(y=-2, line_dash='dash', line_color='#F59E0B')
+    fig.add_hline(y=-3, line_dash='dash', line_color='#DC2626')
+    
+    fig.update_layout(
+        height=320,
+        margin=dict(l=20, r=20, t=30, b=20),
+        xaxis_title="Tanggal Pengukuran",
+        yaxis_title="Z-Score TB/U",
+        paper_bgcolor='rgba(0,0,0,0)',
+        plot_bgcolor='rgba(0,0,0,0)',
+        font={'color': text_color}
+    )
+    
+    return fig
+
+@TRACER.traced('pdf_report')
 def generate_pdf_report(result):
     """Generate PDF report for detection results"""
     buffer = BytesIO()
@@ -746,8 +1027,9 @@ def generate_pdf_report(result):
     elements.append(Paragraph("LAPORAN HASIL DETEKSI STUNTING", title_style))
     elements.append(Spacer(1, 0.5*cm))
     
-    # Timestamp
-    timestamp = datetime.now().strftime("%d %B %Y, %H:%M")
+    # Timestamp (waktu analisis, sehingga laporan yang sama selalu menghasilkan byte yang sama)
+    analyzed_at = datetime.fromtimestamp(result['analyzed_at']) if result.get('analyzed_at') else datetime.now()
+    timestamp = analyzed_at.strftime("%d %B %Y, %H:%M")
     elements.append(Paragraph(f"<i>Tanggal Pemeriksaan: {timestamp}</i>", normal_style))
     elements.append(Spacer(1, 0.5*cm))
     
@@ -786,6 +1068,10 @@ def generate_pdf_report(result):
         ['Kategori', result['who_recommendation']['title']]
     ]
     
+    for code, indicator in (result.get('weight_indicators') or {}).items():
+        zscore_data.append([WEIGHT_INDICATOR_NAMES[code].split(' ')[0],
+                            f"{indicator['zscore']:.2f} ({indicator['status']})"])
+    
     table_zscore = Table(zscore_data, colWidths=[5*cm, 10*cm])
     table_zscore.setStyle(TableStyle([
         ('BACKGROUND', (0, 0), (0, -1), colors.HexColor('#8FC0A9')),
@@ -816,7 +1102,9 @@ def generate_pdf_report(result):
         knn_table_data = [
             ['Prediksi Status', knn_data['prediction'].title()],
             ['Tingkat Risiko', risk_info['level']],
-            ['Persentase Risiko', f"{knn_data['risk_percentage']}%"]
+            ['Persentase Risiko', f"{knn_data['risk_percentage']}%"],
+            ['Keyakinan Model', f"{knn_data['confidence'] * 100:.0f}%" if 'confidence' in knn_data else '-'],
+            ['Versi Model', knn_data.get('model_version', '-')]
         ]
         
         table_knn = Table(knn_table_data, colWidths=[5*cm, 10*cm])
@@ -872,6 +1160,57 @@ def generate_pdf_report(result):
     buffer.seek(0)
     return buffer
 
+# =====================================================
+# TUGAS BACKGROUND
+# =====================================================
+
+# Baris per chunk screening file register (progress dilaporkan per chunk)
+REGISTER_CHUNK_ROWS = 20_000
+
+def build_pdf_task(progress, result):
+    """Tugas background: buat laporan PDF lalu simpan di store bersama"""
+    progress.report(0.1, "menyusun laporan")
+    
+    def build():
+        METRICS.inc('stunting_pdf_reports_total')
+        return generate_pdf_report(result).getvalue()
+    
+    return pdf_store.get_or_create(result['audit_id'], build)
+
+def screen_register_task(progress, data, file_name, columns, knn_model, model_version):
+    """
+    Tugas background: screening file register (CSV/Parquet hasil upload) per chunk
+    
+    Returns: Dict {'csv': byte CSV hasil, 'rows', 'status_counts', 'model_version', 'file_name'}
+    """
+    is_parquet = file_name.lower().endswith(('.parquet', '.pq'))
+    if is_parquet:
+        import pyarrow.parquet as pq
+        total = pq.ParquetFile(BytesIO(data)).metadata.num_rows
+    else:
+        # Perkiraan (baris header & baris kosong di akhir file ikut terhitung)
+        total = data.count(b'\n')
+    
+    output = BytesIO()
+    rows = 0
+    status_counts = pd.Series(dtype='int64')
+    for chunk in iter_chunks(BytesIO(data), REGISTER_CHUNK_ROWS, is_parquet=is_parquet):
+        if progress.cancelled:
+            return None
+        screened = screen_chunk(chunk, columns, zscore_calculator, knn_model)
+        screened.to_csv(output, header=rows == 0, index=False)
+        status_counts = status_counts.add(screened['Status WHO'].value_counts(), fill_value=0)
+        rows += len(chunk)
+        progress.report(rows / max(total, rows, 1), f"{rows:,} dari ±{total:,} baris")
+    
+    return {
+        'csv': output.getvalue(),
+        'rows': rows,
+        'status_counts': {str(status): int(n) for status, n in status_counts.items()},
+        'model_version': model_version,
+        'file_name': file_name
+    }
+
 # =====================================================
 # PAGE: DASHBOARD (EDUKASI)
 # =====================================================
@@ -1195,6 +1534,11 @@ def render_detection():
     
     with col1:
         child_name = st.text_input("Nama Anak (Opsional)", placeholder="Contoh: Ahmad")
+        child_id = st.text_input(
+            "ID Anak (Opsional)",
+            placeholder="Contoh: NIK atau nomor KIA",
+            help="Isi untuk menyimpan pengukuran ke riwayat pertumbuhan anak"
+        )
         gender = st.radio(
             "Jenis Kelamin",
             options=['laki-laki', 'perempuan'],
@@ -1215,8 +1559,9 @@ def render_detection():
             help="Pilih tanggal lahir"
         )
         
-        # Calculate age in months
-        age_months = int((today - datetime.combine(birth_date, datetime.min.time())).days / 30)
+        # Umur dalam hari (Z-Score memakai tabel LMS harian); bulan genap untuk tampilan & KNN
+        age_days = age_in_days(birth_date, today)
+        age_months = int(age_days // DAYS_PER_MONTH)
         st.info(f"📅 Umur anak: **{age_months} bulan** ({age_months // 12} tahun {age_months % 12} bulan)")
     
     with col2:
@@ -1235,7 +1580,15 @@ def render_detection():
             max_value=50.0,
             value=10.0,
             step=0.1,
-            help="Masukkan berat badan anak (tidak digunakan dalam analisis, hanya untuk catatan)"
+            help="Masukkan berat badan anak untuk analisis BB/U, BB/TB dan IMT/U (usia 0-60 bulan)"
+        )
+        
+        village = st.text_input("Desa/Kelurahan (Opsional)", placeholder="Contoh: Bojong Nangka")
+        
+        region_code = st.text_input(
+            "Kode Wilayah (Opsional)",
+            placeholder="Contoh: 3201",
+            help="Kode wilayah BPS (provinsi/kabupaten) untuk memakai model KNN khusus wilayah jika tersedia"
         )
     
     st.markdown('</div>', unsafe_allow_html=True)
@@ -1264,13 +1617,21 @@ def render_detection():
             return
         
         # Perform analysis
-        with st.spinner('🔄 Menganalisis data...'):
+        with st.spinner('🔄 Menganalisis data...'), TRACER.span('analysis'):
+            
+            # 1. WHO Z-Score Analysis (teks status/rekomendasi diambil dari tabel saat render)
+            with TRACER.span('analysis.who_zscore'):
+                zscore, is_adult = zscore_calculator.calculate_zscore(age_months, height_cm, gender, age_days=age_days)
+                who_status = zscore_calculator.classify_nutrition_status(zscore, is_adult)
             
-            # 1. WHO Z-Score Analysis
-            zscore, is_adult = zscore_calculator.calculate_zscore(age_months, height_cm, gender)
-            who_status = zscore_calculator.classify_nutrition_status(zscore, is_adult)
-            who_interpretation = zscore_calculator.get_zscore_interpretation(zscore, is_adult)
-            who_recommendation = zscore_calculator.get_recommendation(zscore, who_status)
+            # Indikator berbasis berat badan (tabel WHO hanya untuk 0-60 bulan)
+            with TRACER.span('analysis.weight_indicators'):
+                weight_zscores = None
+                if age_months <= 60:
+                    indicator_zscores = zscore_calculator.calculate_all_indicators(
+                        None, [height_cm], [weight_kg], [gender], age_days=[age_days]
+                    )
+                    weight_zscores = {code: float(indicator_zscores[code][0]) for code in ('wfa', 'wfh', 'bfa')}
             
             # Warning untuk usia dewasa
             if is_adult:
@@ -1278,39 +1639,59 @@ def render_detection():
             
             # 2. KNN Model Prediction (if available)
             knn_result = None
-            risk_interpretation = None
+            ood_threshold = None
             
-            # KNN model hanya akurat untuk usia 0-60 bulan (data training range)
-            if knn_model is not None and age_months <= 60:
+            # Cakupan model ditentukan dari jarak ke tetangga training (query yang sama dengan prediksi)
+            # Handle model diambil sekali: request ini tetap memakai versi yang sama walau model ditukar
+            with TRACER.span('analysis.knn_predict'):
                 try:
-                    knn_result = knn_model.predict(age_months, gender, height_cm)
-                    risk_interpretation = knn_model.get_risk_interpretation(knn_result['risk_percentage'])
+                    model_region, active_model = region_registry.route(region_code)
                 except Exception as e:
-                    st.warning(f"⚠️ Model KNN error: {str(e)}")
-            elif age_months > 60:
-                st.info("ℹ️ **Model KNN tidak tersedia untuk usia > 60 bulan (5 tahun)**. Model KNN di-training dengan data anak usia 0-60 bulan, sehingga prediksi untuk usia di luar range ini tidak akurat. Gunakan hasil WHO Z-Score sebagai acuan utama.")
+                    METRICS.inc('stunting_knn_errors_total', kind='region_load')
+                    st.warning(f"⚠️ Model wilayah gagal dimuat, memakai model default: {str(e)}")
+                    model_region, active_model = None, model_manager.current
+                if active_model is not None:
+                    try:
+                        knn_result = active_model.model.predict(age_months, gender, height_cm)
+                        knn_result['model_version'] = active_model.version
+                        knn_result['model_region'] = model_region
+                        if knn_result['out_of_distribution']:
+                            METRICS.inc('stunting_knn_out_of_distribution_total')
+                            ood_threshold = active_model.model.metadata['neighbor_distance']['ood_threshold']
+                    except Exception as e:
+                        METRICS.inc('stunting_knn_errors_total', kind='predict')
+                        st.warning(f"⚠️ Model KNN error: {str(e)}")
+            if ood_threshold is not None:
+                st.info("ℹ️ **Model KNN tidak dipakai untuk data ini**: tetangga terdekat di data training terlalu jauh (umur/tinggi di luar cakupan data training, yang berisi anak usia 0-60 bulan), sehingga prediksi tidak dapat diandalkan. Gunakan hasil WHO Z-Score sebagai acuan utama.")
             
-            # Save to session state
-            st.session_state.detection_result = {
-                'child_name': child_name if child_name else "Anak",
-                'age_months': age_months,
-                'gender': gender,
-                'height_cm': height_cm,
-                'weight_kg': weight_kg,
-                'zscore': zscore,
-                'is_adult': is_adult,
-                'who_status': who_status,
-                'who_interpretation': who_interpretation,
-                'who_recommendation': who_recommendation,
-                'knn_result': knn_result,
-                'risk_interpretation': risk_interpretation if knn_result else None
-            }
+            # 3. Simpan ke riwayat pertumbuhan (jika ID anak diisi)
+            child_id = child_id.strip()
+            if child_id:
+                try:
+                    with TRACER.span('analysis.registry_save'):
+                        child_registry.upsert_child(child_id, gender, birth_date,
+                                                    name=child_name or None, village=village.strip() or None)
+                        child_registry.add_measurement(child_id, today, height_cm, weight_kg)
+                except Exception as e:
+                    METRICS.inc('stunting_registry_errors_total')
+                    st.warning(f"⚠️ Gagal menyimpan riwayat pertumbuhan: {str(e)}")
+            
+            # Session state hanya menyimpan record ringkas (ID & angka)
+            record = compact_result(age_months, gender, height_cm, weight_kg, zscore, is_adult, age_days=age_days,
+                                    weight_zscores=weight_zscores, knn_prediction=knn_result,
+                                    ood_threshold=ood_threshold, child_id=child_id, child_name=child_name)
+            METRICS.inc('stunting_detections_total', who_status=who_status)
+            
+            # Catat ke log audit (hanya masuk antrean; penulisan disk di background)
+            audit_id = screening_log.append(screening_record(expand_result(record, zscore_calculator)))
+            st.session_state.detection_result = record._replace(audit_id=audit_id)
         
         st.success("✅ Analisis selesai!")
     
     # Display results
     if st.session_state.detection_result:
-        result = st.session_state.detection_result
+        # Dict lengkap dibuat ulang tiap script run dari record ringkas + tabel bersama
+        result = expand_result(st.session_state.detection_result, zscore_calculator, resolve_model_handle)
         
         st.markdown("---")
         st.markdown("## 📊 Hasil Analisis")
@@ -1329,11 +1710,24 @@ def render_detection():
         
         st.markdown("<br>", unsafe_allow_html=True)
         
+        # Riwayat pertumbuhan anak dari registry
+        if result.get('child_id'):
+            with TRACER.span('registry.trajectory'):
+                trajectory = child_registry.get_child_trajectory(result['child_id'])
+            if len(trajectory) > 1:
+                with st.expander(f"📈 Riwayat Pertumbuhan ({len(trajectory)} pengukuran)", expanded=True):
+                    st.plotly_chart(create_trajectory_chart(trajectory), use_container_width=True)
+                    last = trajectory.iloc[-1]
+                    if pd.notna(last['height_velocity']):
+                        st.caption(f"Kecepatan tumbuh sejak pengukuran sebelumnya: "
+                                   f"**{last['height_velocity']:.2f} cm/bulan** "
+                                   f"(perubahan Z-Score {last['zscore_change']:+.2f})")
+        
         # Create tabs for different analyses
         tab1, tab2, tab3 = st.tabs(["📈 Analisis WHO Z-Score", "🤖 Analisis Model KNN", "💡 Rekomendasi"])
         
         # TAB 1: WHO Z-Score Analysis
-        with tab1:
+        with tab1, TRACER.span('render.tab_who'):
             col1, col2 = st.columns([1, 1])
             
             with col1:
@@ -1387,9 +1781,18 @@ def render_detection():
                 - Z-Score **positif** = Di atas rata-rata
                 - Z-Score **negatif** = Di bawah rata-rata
                 """)
+            
+            # Indikator berat badan
+            if result.get('weight_indicators'):
+                st.markdown("### ⚖️ Indikator Berat Badan")
+                cols = st.columns(len(result['weight_indicators']))
+                for col, (code, indicator) in zip(cols, result['weight_indicators'].items()):
+                    with col:
+                        st.metric(WEIGHT_INDICATOR_NAMES[code], f"{indicator['zscore']:.2f}")
+                        st.caption(indicator['status'])
         
         # TAB 2: KNN Model Analysis
-        with tab2:
+        with tab2, TRACER.span('render.tab_knn'):
             if result['knn_result']:
                 knn_data = result['knn_result']
                 risk_info = result['risk_interpretation']
@@ -1453,20 +1856,47 @@ def render_detection():
                         'Probabilitas (%)': [f"{v*100:.2f}%" for v in knn_data['probabilities'].values()]
                     })
                     st.dataframe(prob_df, use_container_width=True, hide_index=True)
+                
+                if knn_data.get('neighbors'):
+                    with st.expander(f"🔍 Tetangga Terdekat (keyakinan model {knn_data['confidence'] * 100:.0f}%)"):
+                        st.caption("Data training yang paling mirip dan menentukan prediksi; "
+                                   "jarak dalam satuan fitur yang sudah dinormalisasi (0 = identik).")
+                        neighbors_df = pd.DataFrame(knn_data['neighbors']).rename(columns={
+                            'age_months': 'Umur (bulan)', 'gender': 'Jenis Kelamin',
+                            'height_cm': 'Tinggi (cm)', 'label': 'Status Gizi', 'distance': 'Jarak'
+                        })
+                        st.dataframe(neighbors_df, use_container_width=True, hide_index=True)
+                
+                if knn_data.get('model_version'):
+                    region_note = f" (wilayah {knn_data['model_region']})" if knn_data.get('model_region') else ""
+                    st.caption(f"Versi model: {knn_data['model_version']}{region_note}")
             
+            elif result.get('knn_out_of_distribution'):
+                ood = result['knn_out_of_distribution']
+                st.info(f"""
+                ℹ️ **Model KNN Tidak Dipakai: Data di Luar Cakupan Training**
+                
+                Rata-rata jarak ke tetangga terdekat di data training **{ood['mean_distance']:.3f}**, 
+                melebihi batas **{ood['threshold']:.3f}**. Model KNN di-training dengan data anak usia 
+                **0-60 bulan (0-5 tahun)**; untuk kombinasi umur dan tinggi sejauh ini dari data training, 
+                prediksi tidak dapat diandalkan.
+                
+                Silakan gunakan **hasil WHO Z-Score** sebagai acuan utama, yang memiliki standar untuk 
+                semua kelompok usia.
+                """)
             else:
                 st.info("""
                 ℹ️ **Model KNN Tidak Tersedia**
                 
-                Model KNN hanya tersedia untuk anak usia **0-60 bulan (0-5 tahun)** karena model 
-                di-training dengan data pada rentang usia tersebut. 
-                
-                Untuk usia di luar range ini, silakan gunakan **hasil WHO Z-Score** sebagai acuan utama, 
+                Model KNN belum dimuat. Silakan gunakan **hasil WHO Z-Score** sebagai acuan utama, 
                 yang memiliki standar untuk semua kelompok usia.
                 """)
+            
+            if result.get('knn_model_card'):
+                render_model_card(result['knn_model_card'], (result['knn_result'] or {}).get('model_version'))
         
         # TAB 3: Recommendations
-        with tab3:
+        with tab3, TRACER.span('render.tab_recommendation'):
             st.markdown("### 💡 Rekomendasi Tindakan")
             
             reco = result['who_recommendation']
@@ -1518,14 +1948,20 @@ def render_detection():
             st.markdown("---")
             col1, col2, col3 = st.columns([1, 1, 1])
             with col2:
-                pdf_buffer = generate_pdf_report(result)
-                st.download_button(
-                    label="📄 Download Laporan PDF",
-                    data=pdf_buffer,
-                    file_name=f"Laporan_Stunting_{result['child_name'].replace(' ', '_')}_{datetime.now().strftime('%Y%m%d_%H%M%S')}.pdf",
-                    mime="application/pdf",
-                    use_container_width=True
-                )
+                # Dibuat sekali per hasil di antrean tugas lalu dipakai ulang di setiap rerun
+                # (store bersama dengan batas byte); laporan yang ter-evict dibuat ulang
+                pdf_bytes = pdf_store.get(result['audit_id'])
+                if pdf_bytes is None:
+                    pdf_bytes = background_task('pdf', result['audit_id'], "Laporan PDF", build_pdf_task, result)
+                if pdf_bytes is not None:
+                    analyzed_at = datetime.fromtimestamp(result['analyzed_at'])
+                    st.download_button(
+                        label="📄 Download Laporan PDF",
+                        data=pdf_bytes,
+                        file_name=f"Laporan_Stunting_{result['child_name'].replace(' ', '_')}_{analyzed_at.strftime('%Y%m%d_%H%M%S')}.pdf",
+                        mime="application/pdf",
+                        use_container_width=True
+                    )
         
         # Additional comparison with KNN
         if result['knn_result']:
@@ -1576,13 +2012,286 @@ def render_detection():
             </div>
             """, unsafe_allow_html=True)
     
+    render_register_screening()
+    
     # Spacer untuk footer sticky
     st.markdown("<div style='height: 80px;'></div>", unsafe_allow_html=True)
 
+def render_register_screening():
+    """Screening massal file register (CSV/Parquet) di antrean tugas background"""
+    st.markdown("---")
+    with st.expander("📂 Screening Massal dari File Register", expanded=False):
+        st.caption("File diproses per chunk di background; halaman tetap bisa dipakai selama screening "
+                   "berjalan. Hasil disimpan sementara sampai ditutup atau kedaluwarsa.")
+        uploaded = st.file_uploader("File Register (CSV/Parquet)", type=['csv', 'parquet'], key='register_file')
+        if uploaded is None:
+            return
+        
+        is_parquet = uploaded.name.lower().endswith('.parquet')
+        if is_parquet:
+            import pyarrow.parquet as pq
+            file_columns = list(pq.ParquetFile(uploaded).schema_arrow.names)
+        else:
+            file_columns = list(pd.read_csv(uploaded, nrows=0).columns)
+        uploaded.seek(0)
+        
+        unused = "— tidak dipakai —"
+        options = [unused] + file_columns
+        
+        def column_select(label, field, col):
+            default = SCREENING_COLUMNS.get(field)
+            with col:
+                value = st.selectbox(label, options, index=options.index(default) if default in options else 0,
+                                     key=f"register_col_{field}")
+            return None if value == unused else value
+        
+        col1, col2, col3 = st.columns(3)
+        columns = {
+            'age': column_select("Kolom Umur (bulan)", 'age', col1),
+            'gender': column_select("Kolom Jenis Kelamin", 'gender', col2),
+            'height': column_select("Kolom Tinggi Badan (cm)", 'height', col3)
+        }
+        col1, col2 = st.columns(2)
+        columns['birth_date'] = column_select("Kolom Tanggal Lahir (opsional)", 'birth_date', col1)
+        columns['measured_at'] = column_select("Kolom Tanggal Ukur (opsional)", 'measured_at', col2)
+        
+        use_dates = bool(columns['birth_date'] and columns['measured_at'])
+        if not (columns['gender'] and columns['height'] and (columns['age'] or use_dates)):
+            st.warning("⚠️ Pilih kolom jenis kelamin, tinggi badan, dan umur (atau tanggal lahir + tanggal ukur).")
+            return
+        
+        # Satu tugas per file + mapping kolom per sesi
+        key = f"{getattr(uploaded, 'file_id', uploaded.name)}:{uploaded.size}:{sorted(columns.items(), key=str)}"
+        start = st.button("▶️ Mulai Screening", key='register_start', type='primary')
+        handle = model_manager.current
+        args = (uploaded.getvalue(), uploaded.name, columns,
+                handle.model if handle else None, handle.version if handle else None) if start else ()
+        result = background_task('register', key, "Screening file", screen_register_task, *args,
+                                 submit=start, keep=True)
+        if result is None:
+            return
+        
+        st.success(f"✅ {result['rows']:,} baris selesai discreening "
+                   f"(model KNN: {result['model_version'] or 'tidak tersedia'}).")
+        if result['status_counts']:
+            st.dataframe(pd.DataFrame(
+                [{'Status WHO': status, 'Jumlah': n} for status, n in result['status_counts'].items()]
+            ), hide_index=True, use_container_width=True)
+        col1, col2 = st.columns(2)
+        with col1:
+            st.download_button("📥 Download Hasil (CSV)", result['csv'],
+                               file_name=f"hasil_screening_{os.path.splitext(result['file_name'])[0]}.csv",
+                               mime="text/csv", use_container_width=True)
+        with col2:
+            if st.button("🗑️ Tutup Hasil", use_container_width=True, key='register_close'):
+                task_queue.discard(task_queue.find(task_owner(), ('register', key)))
+                st.rerun()
+
+# =====================================================
+# PAGE: DASHBOARD PREVALENSI
+# =====================================================
+
+def render_prevalence():
+    """Render halaman dashboard prevalensi stunting (dari agregat, tanpa scan data mentah)"""
+    
+    header_gradient = f"linear-gradient(135deg, {COLORS['primary']} 0%, {COLORS['secondary']} 100%)"
+    st.markdown(f"""
+    <div class="detection-header" style="background: {header_gradient};">
+        <h1 style="margin: 0;">📊 Dashboard Prevalensi Stunting</h1>
+        <p style="opacity: 0.9; margin-top: 0.5rem;">
+            Prevalensi per kelompok umur, jenis kelamin dan desa dari riwayat pengukuran
+        </p>
+    </div>
+    """, unsafe_allow_html=True)
+    
+    periods = prevalence_aggregates.list_periods()
+    if not periods:
+        st.info("ℹ️ Belum ada data pengukuran di registry. Isi **ID Anak** pada halaman deteksi untuk mulai mencatat.")
+        return
+    
+    col1, col2, col3 = st.columns(3)
+    with col1:
+        village_options = ["Semua Desa"] + prevalence_aggregates.list_villages()
+        village = st.selectbox("Desa/Kelurahan", village_options)
+        village = None if village == "Semua Desa" else village
+    with col2:
+        window = st.radio("Periode", ["Bulanan", "12 Bulan Terakhir"], horizontal=True)
+    with col3:
+        end_period = st.selectbox("Bulan", list(reversed(periods)))
+    
+    start_period = end_period if window == "Bulanan" else shift_period(end_period, -11)
+    
+    overall = prevalence_aggregates.get_prevalence(start_period, end_period, by=(), village=village)
+    total = overall.iloc[0]
+    n_screened = int(total['n_screened'])
+    
+    col1, col2, col3 = st.columns(3)
+    col1.metric("Jumlah Pengukuran", f"{n_screened:,}")
+    col2.metric("Prevalensi Stunting", f"{total['prevalensi_stunting (%)']:.1f}%" if n_screened else "-")
+    col3.metric("Sangat Pendek", f"{total['prevalensi_sangat_pendek (%)']:.1f}%" if n_screened else "-")
+    
+    text_color = COLORS['text_dark'] if st.session_state.theme == 'light' else COLORS['text_light']
+    
+    by_group = prevalence_aggregates.get_prevalence(start_period, end_period,
+                                                    by=('age_band', 'gender'), village=village)
+    if not by_group.empty:
+        fig = px.bar(
+            by_group,
+            x='age_band',
+            y='prevalensi_stunting (%)',
+            color='gender',
+            barmode='group',
+            title='Prevalensi Stunting per Kelompok Umur',
+            color_discrete_sequence=[COLORS['primary'], COLORS['warning']]
+        )
+        fig.update_layout(
+            xaxis_title="Kelompok Umur",
+            yaxis_title="Prevalensi (%)",
+            paper_bgcolor='rgba(0,0,0,0)',
+            plot_bgcolor='rgba(0,0,0,0)',
+            font={'color': text_color}
+        )
+        st.plotly_chart(fig, use_container_width=True)
+    
+    trend = prevalence_aggregates.get_prevalence(by=('period',), village=village)
+    if len(trend) > 1:
+        fig_trend = px.line(trend, x='period', y='prevalensi_stunting (%)', markers=True,
+                            title='Tren Prevalensi Stunting per Bulan')
+        fig_trend.update_layout(
+            xaxis_title="Bulan",
+            yaxis_title="Prevalensi (%)",
+            paper_bgcolor='rgba(0,0,0,0)',
+            plot_bgcolor='rgba(0,0,0,0)',
+            font={'color': text_color}
+        )
+        st.plotly_chart(fig_trend, use_container_width=True)
+    
+    if village is None:
+        st.markdown("### 🏘️ Prevalensi per Desa")
+        by_village = prevalence_aggregates.get_prevalence(start_period, end_period, by=('village',))
+        st.dataframe(by_village, use_container_width=True, hide_index=True)
+    
+    st.caption("Data disajikan dari agregat yang diperbarui setiap pengukuran disimpan. "
+               "Untuk menghitung ulang dari data mentah: `python prevalence_aggregates.py child_registry.db --rebuild`")
+    
+    st.markdown("<div style='height: 80px;'></div>", unsafe_allow_html=True)
+
 # =====================================================
 # MAIN APPLICATION
 # =====================================================
 
+def render_model_card(card, model_version=None):
+    """Kartu model dari model_card.json (hasil evaluasi saat training, tanpa hitung ulang)"""
+    evaluation = card.get('evaluation') or {}
+    model_info = card.get('model') or {}
+    
+    def percent(value):
+        return f"{value * 100:.1f}%" if value is not None else "-"
+    
+    with st.expander("📋 Kartu Model (Kualitas Model KNN)"):
+        stunting = evaluation.get('stunting') or {}
+        col1, col2, col3, col4 = st.columns(4)
+        col1.metric("Akurasi Test", percent(evaluation.get('accuracy')))
+        col2.metric("Macro F1", percent(evaluation.get('macro_f1')))
+        col3.metric("Sensitivitas Stunting", percent(stunting.get('sensitivity')))
+        col4.metric("Spesifisitas Stunting", percent(stunting.get('specificity')))
+        
+        st.markdown("**Per Kategori Status Gizi**")
+        st.dataframe(pd.DataFrame([
+            {'Status Gizi': row['class'].title(), 'Precision': percent(row['precision']),
+             'Recall': percent(row['recall']), 'F1': percent(row['f1']), 'Jumlah Data Test': row['support']}
+            for row in evaluation.get('classes', [])
+        ]), use_container_width=True, hide_index=True)
+        
+        st.markdown("**Per Kelompok Umur**")
+        st.dataframe(pd.DataFrame([
+            {'Kelompok Umur': row['band'], 'Jumlah Data Test': row['n'], 'Akurasi': percent(row['accuracy']),
+             'Sensitivitas Stunting': percent(row['stunting_sensitivity']),
+             'Spesifisitas Stunting': percent(row['stunting_specificity']),
+             'Stunting Teramati': percent(row['observed_stunting_rate']),
+             'Rata-rata Risiko Prediksi': percent(row['mean_predicted_risk'])}
+            for row in evaluation.get('age_bands', []) if row['n']
+        ]), use_container_width=True, hide_index=True)
+        
+        st.caption(f"Model {model_info.get('version', '-')} | training {model_info.get('n_train_samples', '-')} data, "
+                   f"test {evaluation.get('n_test', '-')} data | parameter {model_info.get('params')}")
+        evaluated_version = evaluation.get('model_version')
+        if evaluated_version and model_version and evaluated_version != model_version:
+            st.warning(f"⚠️ Evaluasi ini untuk versi {evaluated_version}; model sudah di-update "
+                       f"ke versi {model_version} tanpa evaluasi ulang.")
+
+def render_debug_panel():
+    """Panel debug latensi per tahap (aktif via STUNTING_DEBUG_PANEL=1 di server)"""
+    with st.expander("🛠️ Debug: Latency Breakdown", expanded=False):
+        enabled = st.checkbox("Aktifkan tracing", value=TRACER.enabled, key='debug_tracing')
+        if enabled != TRACER.enabled:
+            TRACER.enabled = enabled
+            st.rerun()
+        
+        summary = TRACER.summary()
+        if not summary:
+            st.info("Belum ada trace. Aktifkan tracing lalu jalankan analisis.")
+            return
+        
+        st.markdown("**Histogram Latensi per Tahap (ms)**")
+        summary_df = pd.DataFrame([
+            {'Tahap': name, 'Count': s['count'], 'Mean': s['mean_ms'], 'P50': s['p50_ms'],
+             'P95': s['p95_ms'], 'P99': s['p99_ms'], 'Max': s['max_ms']}
+            for name, s in summary.items()
+        ])
+        st.dataframe(summary_df.round(2), hide_index=True, use_container_width=True)
+        
+        traces = TRACER.recent_traces(limit=1)
+        if traces:
+            last = traces[-1]
+            st.markdown(f"**Trace terakhir:** `{last['trace']}` — {last['duration_ms']:.1f} ms")
+            spans_df = pd.DataFrame([
+                {'Tahap': ('  ' * (span['depth'] - 1)) + span['name'], 'Mulai (ms)': span['offset_ms'],
+                 'Durasi (ms)': span['duration_ms'], 'Error': span['error'] or ''}
+                for span in last['spans']
+            ])
+            if not spans_df.empty:
+                st.dataframe(spans_df, hide_index=True, use_container_width=True)
+        
+        col1, col2 = st.columns(2)
+        with col1:
+            st.download_button("📥 Unduh Trace (JSONL)", TRACER.to_jsonl(), file_name="traces.jsonl",
+                               mime="application/json", use_container_width=True)
+        with col2:
+            if st.button("🗑️ Reset Trace", use_container_width=True):
+                TRACER.reset()
+                st.rerun()
+
+def render_memory_panel():
+    """Panel debug akuntansi memori: session_state per sesi, store PDF dan model resident"""
+    with st.expander("🧠 Debug: Memori Sesi", expanded=False):
+        summary = session_memory.summary()
+        handle = model_manager.current
+        model_bytes = (estimate_model_bytes(handle.model) if handle else 0) + region_registry.resident_bytes
+        
+        col1, col2, col3, col4 = st.columns(4)
+        col1.metric("Sesi Aktif", summary['sessions'])
+        col2.metric("Session State", f"{summary['total_bytes'] / 1024:.1f} KB",
+                    help=f"Rata-rata {summary['mean_bytes'] / 1024:.1f} KB, terbesar {summary['max_bytes'] / 1024:.1f} KB per sesi")
+        col3.metric("Store PDF", f"{pdf_store.nbytes / 1024:.1f} KB",
+                    help=f"{len(pdf_store)} laporan, batas {pdf_store.max_bytes / 1024 / 1024:.0f} MB")
+        col4.metric("Model Resident", f"{model_bytes / 1024 / 1024:.1f} MB")
+        
+        st.caption(f"Perkiraan memori data worker: {(summary['total_bytes'] + pdf_store.max_bytes + model_bytes) / 1024 / 1024:.1f} MB "
+                   f"(session state + batas store PDF + model). Store PDF: {pdf_store.stats['hits']} hit, "
+                   f"{pdf_store.stats['misses']} miss, {pdf_store.stats['evictions']} eviction.")
+        
+        sessions = session_memory.sessions()
+        if sessions:
+            current = current_session_id()
+            st.dataframe(pd.DataFrame([
+                {'Sesi': row['session'][:8] + (' (ini)' if row['session'] == current else ''),
+                 'Terakhir Aktif': datetime.fromtimestamp(row['last_seen']).strftime('%H:%M:%S'),
+                 'Total (KB)': round(row['bytes'] / 1024, 2), 'Key': row['keys'],
+                 'Key Terbesar': row['largest_key'], 'Key Terbesar (KB)': round(row['largest_bytes'] / 1024, 2)}
+                for row in sessions
+            ]), hide_index=True, use_container_width=True)
+
 def main():
     """Main application function"""
     
@@ -1622,6 +2331,11 @@ def main():
             st.session_state.page = 'detection'
             st.rerun()
         
+        if st.button("📊 Prevalensi", use_container_width=True,
+                     type="primary" if st.session_state.page == 'prevalence' else "secondary"):
+            st.session_state.page = 'prevalence'
+            st.rerun()
+        
         st.markdown("---")
         
         st.markdown("### ℹ️ Tentang")
@@ -1634,6 +2348,7 @@ def main():
         **Versi:** 1.0  
         **Tahun:** 2025
         """)
+        st.caption(f"Model KNN aktif: {model_manager.status()['version'] or '-'}")
         
         st.markdown("---")
         
@@ -1648,11 +2363,25 @@ def main():
         ✉️ SMS: 0812-8156-2620
         """)
     
-    # Route to appropriate page
-    if st.session_state.page == 'dashboard':
-        render_dashboard()
-    elif st.session_state.page == 'detection':
-        render_detection()
+    # Route to appropriate page (satu trace per script run halaman)
+    METRICS.inc('stunting_requests_total', page=st.session_state.page)
+    with TRACER.trace(f"page.{st.session_state.page}"):
+        if st.session_state.page == 'dashboard':
+            render_dashboard()
+        elif st.session_state.page == 'detection':
+            render_detection()
+        elif st.session_state.page == 'prevalence':
+            render_prevalence()
+    
+    # Akuntansi memori sesi (ukuran session_state setelah script run ini)
+    session_id = current_session_id()
+    if session_id is not None:
+        session_memory.update(session_id, st.session_state.to_dict())
+    
+    # Panel operator: hanya lewat konfigurasi server (toggle tracing & data sesi berlaku untuk semua pengguna)
+    if os.environ.get('STUNTING_DEBUG_PANEL', '0') == '1':
+        render_debug_panel()
+        render_memory_panel()
     
     # Footer sticky - muncul di semua halaman
     footer_bg = "rgba(248, 250, 251, 0.98)" if st.session_state.theme == 'light' else "rgba(26, 32, 44, 0.98)"
@@ -0,0 +1,319 @@
+"""
+Batch Screener untuk File Register Besar
+Screening stunting dari command line tanpa Streamlit (CSV/Parquet, streaming per chunk)
+
+Contoh:
+    python batch_screener.py data_balita.csv hasil_screening.csv --workers 4
+    python batch_screener.py export_emr.parquet hasil.parquet \\
+        --age-col umur_bln --gender-col jk --height-col tb_cm
+    python batch_screener.py register.csv hasil.csv --birth-date-col tgl_lahir --measure-date-col tgl_ukur
+"""
+
+import argparse
+import os
+import sys
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+from z_score_calculator import DAYS_PER_MONTH, WHOZScoreCalculator, age_in_days
+from knn_model_trainer import StuntingKNNModel
+
+
+# Nama kolom default mengikuti skema data_balita.csv
+DEFAULT_COLUMNS = {
+    'age': 'Umur (bulan)',
+    'gender': 'Jenis Kelamin',
+    'height': 'Tinggi Badan (cm)',
+    # Opsional: jika keduanya diisi, umur dihitung per hari dari tanggal (kolom umur diabaikan)
+    'birth_date': None,
+    'measured_at': None
+}
+
+# Variasi penulisan jenis kelamin yang umum di export EMR
+GENDER_ALIASES = {
+    'laki-laki': 'laki-laki', 'laki laki': 'laki-laki', 'l': 'laki-laki',
+    'm': 'laki-laki', 'male': 'laki-laki', 'pria': 'laki-laki',
+    'perempuan': 'perempuan', 'p': 'perempuan', 'f': 'perempuan',
+    'female': 'perempuan', 'wanita': 'perempuan'
+}
+
+# Batas usia data training KNN (sama dengan aturan di app.py)
+KNN_MAX_AGE_MONTHS = 60
+
+# State per proses worker (diisi sekali oleh _init_worker)
+_worker_state = {}
+
+
+def _init_worker(model_dir):
+    """Load kalkulator dan model sekali per proses worker"""
+    _worker_state['calculator'] = WHOZScoreCalculator()
+    _worker_state['knn_model'] = load_knn_model(model_dir)
+
+
+def load_knn_model(model_dir):
+    """Load model KNN; None jika model_dir kosong atau model tidak tersedia"""
+    if not model_dir:
+        return None
+    knn_model = StuntingKNNModel(None)
+    try:
+        knn_model.load_model(model_dir)
+    except (OSError, EOFError) as e:
+        print(f"⚠️ Model KNN tidak tersedia ({e}); hanya WHO Z-Score yang dihitung", file=sys.stderr)
+        return None
+    return knn_model
+
+
+def screen_chunk(df, columns, calculator, knn_model):
+    """
+    Screening satu chunk data secara vektor
+
+    Parameters:
+    - df: DataFrame chunk input
+    - columns: Dict {'age', 'gender', 'height', 'birth_date', 'measured_at'} -> nama kolom di input
+    - calculator: WHOZScoreCalculator
+    - knn_model: StuntingKNNModel atau None
+
+    Returns: DataFrame input dengan kolom hasil screening
+    """
+    use_dates = bool(columns.get('birth_date') and columns.get('measured_at'))
+    if use_dates:
+        # Umur per hari dari kolom tanggal (vektor); Z-Score memakai tabel LMS harian
+        age_days = age_in_days(
+            pd.to_datetime(df[columns['birth_date']], errors='coerce').to_numpy(dtype='datetime64[D]'),
+            pd.to_datetime(df[columns['measured_at']], errors='coerce').to_numpy(dtype='datetime64[D]')
+        )
+        age = age_days / DAYS_PER_MONTH
+    else:
+        age = pd.to_numeric(df[columns['age']], errors='coerce').to_numpy(dtype=np.float64)
+    height = pd.to_numeric(df[columns['height']], errors='coerce').to_numpy(dtype=np.float64)
+    gender = (df[columns['gender']].astype(str).str.strip().str.lower()
+              .map(GENDER_ALIASES).to_numpy())
+
+    valid = ~np.isnan(age) & ~np.isnan(height) & pd.notna(gender) & (age >= 0)
+
+    zscore = np.full(len(df), np.nan)
+    if valid.any():
+        zscore[valid] = calculator.calculate_indicator(
+            'hfa', age_days[valid] if use_dates else age[valid], height[valid], gender[valid].astype(str),
+            x_in_days=use_dates
+        )
+    is_adult = age > max(calculator.male_data)
+
+    result = df.copy()
+    if use_dates:
+        result['Umur (hari)'] = age_days
+    result['Z-Score TB/U'] = zscore
+    result['Dewasa'] = is_adult
+    # Dtype string eksplisit agar skema output stabil antar chunk
+    result['Status WHO'] = pd.array(calculator.classify_indicator('hfa', zscore, is_adult), dtype='string')
+    result['Prediksi KNN'] = pd.Series(pd.NA, index=df.index, dtype='string')
+    result['Risiko Stunting KNN (%)'] = np.nan
+    result['Keyakinan KNN'] = np.nan
+    # Jarak & flag OOD diisi untuk semua baris yang diquery KNN (NA jika tidak diquery)
+    result['Jarak Rata-rata KNN'] = np.nan
+    result['KNN di Luar Distribusi'] = pd.Series(pd.NA, index=df.index, dtype='boolean')
+
+    if knn_model is not None:
+        knn_rows = valid & (age <= KNN_MAX_AGE_MONTHS)
+        if knn_rows.any():
+            # Data training KNN memakai umur bulan genap
+            knn_age = np.floor(age[knn_rows]) if use_dates else age[knn_rows]
+            knn_result = knn_model.predict_batch(knn_age, gender[knn_rows].astype(str), height[knn_rows])
+            result.loc[knn_rows, 'Jarak Rata-rata KNN'] = knn_result['mean_distance']
+            result.loc[knn_rows, 'KNN di Luar Distribusi'] = knn_result['out_of_distribution']
+            # Input yang tetangganya terlalu jauh dari data training tidak diberi prediksi
+            # (ditandai di kolom 'KNN di Luar Distribusi', bukan sekadar kosong)
+            in_range = ~knn_result['out_of_distribution']
+            knn_rows[knn_rows] = in_range
+            result.loc[knn_rows, 'Prediksi KNN'] = knn_result['prediction'][in_range]
+            result.loc[knn_rows, 'Risiko Stunting KNN (%)'] = knn_result['risk_percentage'][in_range]
+            result.loc[knn_rows, 'Keyakinan KNN'] = knn_result['confidence'][in_range]
+
+    return result
+
+
+def _screen_chunk_in_worker(df, columns):
+    """Entry point chunk di proses worker"""
+    return screen_chunk(df, columns, _worker_state['calculator'], _worker_state['knn_model'])
+
+
+def iter_chunks(input_path, chunksize, is_parquet=None):
+    """
+    Baca CSV atau Parquet per chunk tanpa memuat seluruh file
+
+    input_path boleh berupa buffer (mis. file upload); format lalu ditentukan oleh is_parquet.
+    """
+    if is_parquet is None:
+        is_parquet = input_path.lower().endswith(('.parquet', '.pq'))
+    if is_parquet:
+        try:
+            import pyarrow.parquet as pq
+        except ImportError:
+            raise SystemExit("❌ Membaca Parquet memerlukan pyarrow: pip install pyarrow")
+
+        parquet_file = pq.ParquetFile(input_path)
+        for batch in parquet_file.iter_batches(batch_size=chunksize):
+            yield batch.to_pandas()
+    else:
+        yield from pd.read_csv(input_path, chunksize=chunksize)
+
+
+class ResultWriter:
+    """
+    Penulis hasil streaming (CSV append atau Parquet row group)
+    """
+
+    def __init__(self, output_path):
+        self.output_path = output_path
+        self.is_parquet = output_path.lower().endswith(('.parquet', '.pq'))
+        self._parquet_writer = None
+        self._header_written = False
+
+    def write(self, df):
+        if self.is_parquet:
+            import pyarrow as pa
+            import pyarrow.parquet as pq
+
+            table = pa.Table.from_pandas(df, preserve_index=False)
+            if self._parquet_writer is None:
+                self._parquet_writer = pq.ParquetWriter(self.output_path, table.schema)
+            self._parquet_writer.write_table(table.cast(self._parquet_writer.schema))
+        else:
+            df.to_csv(self.output_path, mode='w' if not self._header_written else 'a',
+                      header=not self._header_written, index=False, encoding='utf-8')
+            self._header_written = True
+
+    def close(self):
+        if self._parquet_writer is not None:
+            self._parquet_writer.close()
+
+
+def run_screening(input_path, output_path, columns=None, model_dir='models',
+                  chunksize=100_000, workers=None, max_in_flight=None, report_every=5.0):
+    """
+    Screening streaming: baca per chunk, proses paralel, tulis berurutan
+
+    Parameters:
+    - input_path: File CSV/Parquet input
+    - output_path: File CSV/Parquet output
+    - columns: Dict mapping kolom input (default: skema data_balita.csv)
+    - model_dir: Folder model KNN (None = tanpa KNN)
+    - chunksize: Jumlah baris per chunk
+    - workers: Jumlah proses worker (0 = proses utama saja)
+    - max_in_flight: Maksimum chunk yang sedang diproses (membatasi memori)
+    - report_every: Interval laporan throughput (detik)
+
+    Returns: Dict ringkasan (rows, seconds, rows_per_sec)
+    """
+    columns = {**DEFAULT_COLUMNS, **(columns or {})}
+    if workers is None:
+        workers = os.cpu_count() or 1
+    if max_in_flight is None:
+        max_in_flight = max(2 * workers, 1)
+
+    writer = ResultWriter(output_path)
+    start = time.perf_counter()
+    last_report = start
+    total_rows = 0
+
+    def report(final=False):
+        elapsed = time.perf_counter() - start
+        rate = total_rows / elapsed if elapsed > 0 else 0.0
+        end = "\n" if final else "\r"
+        print(f"⏱️ {total_rows:,} baris | {elapsed:,.1f} detik | {rate:,.0f} baris/detik",
+              end=end, file=sys.stderr, flush=True)
+        return rate
+
+    try:
+        if workers == 0:
+            calculator = WHOZScoreCalculator()
+            knn_model = load_knn_model(model_dir)
+            for chunk in iter_chunks(input_path, chunksize):
+                writer.write(screen_chunk(chunk, columns, calculator, knn_model))
+                total_rows += len(chunk)
+                if time.perf_counter() - last_report >= report_every:
+                    report()
+                    last_report = time.perf_counter()
+        else:
+            with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker,
+                                     initargs=(model_dir,)) as executor:
+                # Antrian FIFO: hasil ditulis sesuai urutan input,
+                # chunk baru hanya dibaca saat ada slot kosong
+                in_flight = deque()
+                for chunk in iter_chunks(input_path, chunksize):
+                    if len(in_flight) >= max_in_flight:
+                        result = in_flight.popleft().result()
+                        writer.write(result)
+                        total_rows += len(result)
+                    in_flight.append(executor.submit(_screen_chunk_in_worker, chunk, columns))
+
+                    if time.perf_counter() - last_report >= report_every:
+                        report()
+                        last_report = time.perf_counter()
+
+                while in_flight:
+                    result = in_flight.popleft().result()
+                    writer.write(result)
+                    total_rows += len(result)
+    finally:
+        writer.close()
+
+    rate = report(final=True)
+    return {
+        'rows': total_rows,
+        'seconds': time.perf_counter() - start,
+        'rows_per_sec': rate
+    }
+
+
+def main(argv=None):
+    """Entry point command line"""
+    parser = argparse.ArgumentParser(
+        description="Screening stunting batch (WHO Z-Score + KNN) untuk file register besar"
+    )
+    parser.add_argument('input', help="File input CSV atau Parquet")
+    parser.add_argument('output', help="File output CSV atau Parquet")
+    parser.add_argument('--model-dir', default=os.path.join(os.path.dirname(os.path.abspath(__file__)), 'models'),
+                        help="Folder model KNN (default: models/)")
+    parser.add_argument('--no-knn', action='store_true', help="Lewati prediksi KNN")
+    parser.add_argument('--chunksize', type=int, default=100_000, help="Baris per chunk")
+    parser.add_argument('--workers', type=int, default=None,
+                        help="Jumlah proses worker (default: jumlah CPU, 0 = tanpa pool)")
+    parser.add_argument('--max-in-flight', type=int, default=None,
+                        help="Maksimum chunk dalam proses (default: 2 x workers)")
+    parser.add_argument('--age-col', default=DEFAULT_COLUMNS['age'], help="Kolom umur (bulan)")
+    parser.add_argument('--gender-col', default=DEFAULT_COLUMNS['gender'], help="Kolom jenis kelamin")
+    parser.add_argument('--height-col', default=DEFAULT_COLUMNS['height'], help="Kolom tinggi badan (cm)")
+    parser.add_argument('--birth-date-col', default=None, help="Kolom tanggal lahir (umur dihitung per hari)")
+    parser.add_argument('--measure-date-col', default=None, help="Kolom tanggal pengukuran")
+    args = parser.parse_args(argv)
+
+    if bool(args.birth_date_col) != bool(args.measure_date_col):
+        parser.error("--birth-date-col dan --measure-date-col harus diisi bersamaan")
+
+    print("=" * 80)
+    print("🚀 BATCH SCREENING STUNTING")
+    print("=" * 80)
+
+    summary = run_screening(
+        args.input,
+        args.output,
+        columns={'age': args.age_col, 'gender': args.gender_col, 'height': args.height_col,
+                 'birth_date': args.birth_date_col, 'measured_at': args.measure_date_col},
+        model_dir=None if args.no_knn else args.model_dir,
+        chunksize=args.chunksize,
+        workers=args.workers,
+        max_in_flight=args.max_in_flight
+    )
+
+    print(f"\n✅ {summary['rows']:,} baris diproses dalam {summary['seconds']:.1f} detik")
+    print(f"💾 Hasil disimpan ke: {args.output}")
+    return summary
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,420 @@
+"""
+Benchmark Suite untuk Jalur Kritis Aplikasi
+Mengukur WHO Z-Score, prediksi KNN, load/training model, laporan PDF dan chart
+pada data sintetis dari generate_sample_data (seed tetap), menyimpan hasil JSON,
+dan membandingkannya dengan baseline tersimpan (regresi -> exit code 1)
+
+Contoh:
+    python benchmark.py --save-baseline          # rekam baseline di mesin referensi
+    python benchmark.py                          # jalankan & bandingkan dengan baseline
+    python benchmark.py --only zscore,knn --tolerance 0.3
+"""
+
+import argparse
+import json
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+from contextlib import redirect_stdout
+from datetime import datetime
+from io import StringIO
+
+import numpy as np
+
+CURRENT_DIR = os.path.dirname(os.path.abspath(__file__))
+DEFAULT_BASELINE = os.path.join(CURRENT_DIR, 'benchmark_baseline.json')
+DEFAULT_RESULTS_DIR = os.path.join(CURRENT_DIR, 'benchmark_results')
+
+# Grup benchmark yang bisa dipilih dengan --only
+GROUPS = ('zscore', 'knn', 'load', 'train', 'pdf', 'chart')
+
+# Metrik yang dibandingkan dengan baseline (waktu: makin kecil makin baik)
+COMPARE_KEY = 'p50_ms'
+
+
+def summarize(times_ms, n_items=None):
+    """Ringkasan statistik daftar durasi (ms)"""
+    times_ms = np.asarray(times_ms, dtype=np.float64)
+    summary = {
+        'n': int(len(times_ms)),
+        'mean_ms': float(times_ms.mean()),
+        'p50_ms': float(np.percentile(times_ms, 50)),
+        'p95_ms': float(np.percentile(times_ms, 95)),
+        'p99_ms': float(np.percentile(times_ms, 99)),
+        'max_ms': float(times_ms.max())
+    }
+    if n_items:
+        summary['items_per_sec'] = float(n_items / (summary['p50_ms'] / 1000)) if summary['p50_ms'] > 0 else None
+    return summary
+
+
+def time_calls(func, calls, warmup=3):
+    """Durasi (ms) setiap pemanggilan func(*args) untuk daftar argumen"""
+    for args in calls[:warmup]:
+        func(*args)
+    times = []
+    for args in calls:
+        start = time.perf_counter()
+        func(*args)
+        times.append((time.perf_counter() - start) * 1000)
+    return times
+
+
+def time_repeat(func, repeat, warmup=1):
+    """Durasi (ms) pemanggilan func() berulang"""
+    for _ in range(warmup):
+        func()
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        times.append((time.perf_counter() - start) * 1000)
+    return times
+
+
+def quiet(func, *args, **kwargs):
+    """Jalankan func tanpa output print (trainer/loader cukup verbose)"""
+    with redirect_stdout(StringIO()):
+        return func(*args, **kwargs)
+
+
+# =====================================================
+# DATA & MODEL SINTETIS
+# =====================================================
+
+def make_synthetic_data(n_samples):
+    """Data sintetis generate_sample_data dengan format sama seperti data_balita.csv"""
+    from generate_sample_data import generate_sample_data
+
+    df = quiet(generate_sample_data, n_samples)
+    df['Jenis Kelamin'] = df['Jenis Kelamin'].str.lower()
+    return df
+
+
+def train_synthetic_model(data_path, model_dir, optimize=True):
+    """Training model pada CSV sintetis; mengembalikan (model, detik)"""
+    from knn_model_trainer import StuntingKNNModel
+
+    knn_model = StuntingKNNModel(data_path)
+    start = time.perf_counter()
+    quiet(knn_model.train_model, optimize=optimize)
+    seconds = time.perf_counter() - start
+    quiet(knn_model.save_model, model_dir)
+    return knn_model, seconds
+
+
+# =====================================================
+# BENCHMARK
+# =====================================================
+
+def bench_zscore(df, n_calls):
+    from z_score_calculator import WHOZScoreCalculator
+
+    calculator = WHOZScoreCalculator()
+    sample = df.head(n_calls)
+    ages = sample['Umur (bulan)'].to_numpy(dtype=np.float64)
+    heights = sample['Tinggi Badan (cm)'].to_numpy(dtype=np.float64)
+    genders = sample['Jenis Kelamin'].to_numpy()
+    calls = list(zip(ages, heights, genders))
+
+    all_ages = df['Umur (bulan)'].to_numpy(dtype=np.float64)
+    all_heights = df['Tinggi Badan (cm)'].to_numpy(dtype=np.float64)
+    all_genders = df['Jenis Kelamin'].to_numpy()
+
+    return {
+        'zscore.calculate_zscore': summarize(time_calls(calculator.calculate_zscore, calls)),
+        'zscore.interpolate_lms': summarize(
+            time_calls(calculator.interpolate_lms, [(age, gender) for age, _, gender in calls])
+        ),
+        'zscore.calculate_indicator_bulk': summarize(
+            time_repeat(lambda: calculator.calculate_indicator('hfa', all_ages, all_heights, all_genders), 20),
+            n_items=len(df)
+        ),
+        'zscore.calculate_all_indicators_bulk': summarize(
+            time_repeat(lambda: calculator.calculate_all_indicators(
+                all_ages, all_heights, all_heights * 0.15, all_genders), 10),
+            n_items=len(df)
+        )
+    }
+
+
+def bench_knn(knn_model, df, n_calls):
+    sample = df.head(n_calls)
+    calls = list(zip(sample['Umur (bulan)'].astype(float), sample['Jenis Kelamin'],
+                     sample['Tinggi Badan (cm)'].astype(float)))
+    ages = df['Umur (bulan)'].to_numpy(dtype=np.float64)
+    genders = df['Jenis Kelamin'].to_numpy()
+    heights = df['Tinggi Badan (cm)'].to_numpy(dtype=np.float64)
+
+    return {
+        'knn.predict': summarize(time_calls(knn_model.predict, calls)),
+        'knn.predict_batch': summarize(
+            time_repeat(lambda: knn_model.predict_batch(ages, genders, heights), 10), n_items=len(df)
+        )
+    }
+
+
+def bench_load(model_dir, repeat):
+    """Cold start load_model di proses baru (termasuk import), dan load ulang di proses yang sama"""
+    from knn_model_trainer import StuntingKNNModel
+
+    script = (
+        "import time; start = time.perf_counter(); "
+        "import sys; sys.path.insert(0, {root!r}); "
+        "from knn_model_trainer import StuntingKNNModel; "
+        "m = StuntingKNNModel(None); m.load_model({model_dir!r}); "
+        "print('BENCH', (time.perf_counter() - start) * 1000)"
+    ).format(root=CURRENT_DIR, model_dir=model_dir)
+
+    cold = []
+    for _ in range(repeat):
+        output = subprocess.run([sys.executable, '-c', script], capture_output=True, text=True, check=True).stdout
+        cold.append(float(output.rsplit('BENCH', 1)[1]))
+
+    def warm_load():
+        quiet(StuntingKNNModel(None).load_model, model_dir)
+
+    return {
+        'load.cold_start': summarize(cold),
+        'load.load_model': summarize(time_repeat(warm_load, repeat * 3))
+    }
+
+
+def _import_app(tmp_dir):
+    """Import app.py di luar runtime Streamlit (bare mode) dengan registry sementara"""
+    import streamlit.logger
+
+    os.environ.setdefault('STUNTING_REGISTRY_DB', os.path.join(tmp_dir, 'bench_registry.db'))
+    os.environ.setdefault('STUNTING_MODEL_POLL_SECONDS', '0')
+    os.environ.setdefault('STUNTING_SCREENING_LOG_DIR', os.path.join(tmp_dir, 'screening_log'))
+    streamlit.logger.set_log_level('error')
+    import app
+    # Streamlit mengatur ulang level logger saat app di-import
+    streamlit.logger.set_log_level('error')
+    return app
+
+
+def _sample_result(app, knn_model, age, gender, height, weight):
+    """Dict hasil deteksi seperti yang disusun render_detection"""
+    calculator = app.zscore_calculator
+    zscore, is_adult = calculator.calculate_zscore(age, height, gender)
+    status = calculator.classify_nutrition_status(zscore, is_adult)
+    indicator_zscores = calculator.calculate_all_indicators([age], [height], [weight], [gender])
+    knn_result = knn_model.predict(age, gender, height)
+    knn_result['model_version'] = knn_model.version
+    return {
+        'child_id': None,
+        'child_name': 'Anak Benchmark',
+        'age_months': int(age),
+        'gender': gender,
+        'height_cm': height,
+        'weight_kg': weight,
+        'zscore': zscore,
+        'is_adult': is_adult,
+        'who_status': status,
+        'who_interpretation': calculator.get_zscore_interpretation(zscore, is_adult),
+        'who_recommendation': calculator.get_recommendation(zscore, status),
+        'weight_indicators': {
+            code: {'zscore': float(indicator_zscores[code][0]),
+                   'status': calculator.classify_indicator(code, indicator_zscores[code])[0]}
+            for code in ('wfa', 'wfh', 'bfa') if not np.isnan(indicator_zscores[code][0])
+        },
+        'knn_result': knn_result,
+        'risk_interpretation': knn_model.get_risk_interpretation(knn_result['risk_percentage'])
+    }
+
+
+def bench_pdf(app, knn_model, df, repeat):
+    rows = df.head(repeat)
+    results = [_sample_result(app, knn_model, float(row['Umur (bulan)']), row['Jenis Kelamin'],
+                              float(row['Tinggi Badan (cm)']), 10.0) for _, row in rows.iterrows()]
+    return {'pdf.generate_pdf_report': summarize(time_calls(app.generate_pdf_report, [(r,) for r in results]))}
+
+
+def bench_chart(app, knn_model, df, repeat):
+    import pandas as pd
+
+    rows = df.head(repeat)
+    probabilities = [knn_model.predict(float(row['Umur (bulan)']), row['Jenis Kelamin'],
+                                       float(row['Tinggi Badan (cm)']))['probabilities']
+                     for _, row in rows.iterrows()]
+    trajectory = pd.DataFrame({
+        'measured_at': pd.date_range('2024-01-01', periods=24, freq='MS').strftime('%Y-%m-%d'),
+        'zscore_hfa': np.linspace(-2.5, -1.0, 24),
+        'height_cm': np.linspace(70, 90, 24)
+    })
+    return {
+        'chart.gauge': summarize(time_calls(
+            app.create_gauge_chart, [(z, "Z-Score Height-for-Age", '#10B981') for z in np.linspace(-4, 3, repeat)]
+        )),
+        'chart.probability': summarize(time_calls(app.create_probability_chart, [(p,) for p in probabilities])),
+        'chart.trajectory': summarize(time_calls(app.create_trajectory_chart, [(trajectory,)] * repeat))
+    }
+
+
+def run_benchmarks(n_samples=2000, n_calls=500, repeat=5, groups=GROUPS, optimize=True):
+    """
+    Jalankan benchmark terpilih
+
+    Returns: Dict {'meta': ..., 'results': {nama: ringkasan}}
+    """
+    import pandas as pd
+    import sklearn
+
+    results = {}
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        df = make_synthetic_data(n_samples)
+        data_path = os.path.join(tmp_dir, 'synthetic.csv')
+        model_dir = os.path.join(tmp_dir, 'models')
+        df.to_csv(data_path, index=False)
+
+        # Model sintetis dibutuhkan hampir semua grup; waktu training dicatat sekali
+        print("🏋️ train_model (data sintetis)...")
+        knn_model, train_seconds = train_synthetic_model(data_path, model_dir, optimize=optimize)
+        if 'train' in groups:
+            results['train.train_model'] = summarize([train_seconds * 1000])
+
+        if 'zscore' in groups:
+            print("📏 WHO Z-Score...")
+            results.update(bench_zscore(df, n_calls))
+        if 'knn' in groups:
+            print("🤖 Prediksi KNN...")
+            results.update(bench_knn(knn_model, df, n_calls))
+        if 'load' in groups:
+            print("📂 Load model...")
+            results.update(bench_load(model_dir, repeat))
+        if 'pdf' in groups or 'chart' in groups:
+            app = quiet(_import_app, tmp_dir)
+            if 'pdf' in groups:
+                print("📄 Laporan PDF...")
+                results.update(bench_pdf(app, knn_model, df, max(repeat * 4, 10)))
+            if 'chart' in groups:
+                print("📊 Chart...")
+                results.update(bench_chart(app, knn_model, df, max(repeat * 10, 20)))
+
+    return {
+        'meta': {
+            'timestamp': datetime.now().strftime('%Y-%m-%d %H:%M:%S'),
+            'git_commit': _git_commit(),
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            'cpu_count': os.cpu_count(),
+            'numpy': np.__version__,
+            'pandas': pd.__version__,
+            'sklearn': sklearn.__version__,
+            'n_samples': n_samples,
+            'n_calls': n_calls,
+            'repeat': repeat,
+            'optimize': optimize
+        },
+        'results': results
+    }
+
+
+def _git_commit():
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=CURRENT_DIR,
+                              capture_output=True, text=True).stdout.strip() or None
+    except OSError:
+        return None
+
+
+# =====================================================
+# BASELINE
+# =====================================================
+
+def compare_with_baseline(report, baseline, tolerance):
+    """
+    Bandingkan p50 dengan baseline
+
+    Returns: List (nama, baseline_ms, sekarang_ms, rasio, regresi)
+    """
+    rows = []
+    for name, current in report['results'].items():
+        reference = baseline['results'].get(name)
+        if reference is None or not reference.get(COMPARE_KEY):
+            continue
+        ratio = current[COMPARE_KEY] / reference[COMPARE_KEY]
+        rows.append((name, reference[COMPARE_KEY], current[COMPARE_KEY], ratio, ratio > 1 + tolerance))
+    return rows
+
+
+def print_report(report, comparison=None):
+    print("\n" + "=" * 80)
+    print(f"{'Benchmark':<38}{'p50 (ms)':>11}{'p95 (ms)':>11}{'p99 (ms)':>11}{'n':>7}")
+    print("-" * 80)
+    for name, summary in report['results'].items():
+        print(f"{name:<38}{summary['p50_ms']:>11.3f}{summary['p95_ms']:>11.3f}"
+              f"{summary['p99_ms']:>11.3f}{summary['n']:>7}")
+
+    if comparison:
+        print("\n" + "=" * 80)
+        print(f"{'Perbandingan p50':<38}{'baseline':>11}{'sekarang':>11}{'rasio':>9}")
+        print("-" * 80)
+        for name, reference, current, ratio, regressed in comparison:
+            flag = "  ❌ REGRESI" if regressed else ""
+            print(f"{name:<38}{reference:>11.3f}{current:>11.3f}{ratio:>8.2f}x{flag}")
+
+
+def main(argv=None):
+    """Entry point command line"""
+    parser = argparse.ArgumentParser(description="Benchmark jalur kritis aplikasi deteksi stunting")
+    parser.add_argument('--samples', type=int, default=2000, help="Jumlah data sintetis")
+    parser.add_argument('--calls', type=int, default=500, help="Jumlah pemanggilan per benchmark latensi")
+    parser.add_argument('--repeat', type=int, default=5, help="Pengulangan untuk benchmark berat (load, PDF)")
+    parser.add_argument('--only', default=','.join(GROUPS), help=f"Grup benchmark ({', '.join(GROUPS)})")
+    parser.add_argument('--no-optimize', action='store_true', help="Training tanpa grid search")
+    parser.add_argument('--output', default=None, help="File JSON hasil (default: benchmark_results/<waktu>.json)")
+    parser.add_argument('--baseline', default=DEFAULT_BASELINE, help="File JSON baseline")
+    parser.add_argument('--save-baseline', action='store_true', help="Simpan hasil sebagai baseline baru")
+    parser.add_argument('--tolerance', type=float, default=0.5,
+                        help="Batas kenaikan p50 relatif terhadap baseline sebelum dianggap regresi (0.5 = +50%%)")
+    args = parser.parse_args(argv)
+
+    groups = [group.strip() for group in args.only.split(',') if group.strip()]
+    unknown = set(groups) - set(GROUPS)
+    if unknown:
+        parser.error(f"Grup tidak dikenal: {', '.join(sorted(unknown))}")
+
+    print("=" * 80)
+    print("⏱️ BENCHMARK STUNTING DETECTION")
+    print("=" * 80)
+    report = run_benchmarks(args.samples, args.calls, args.repeat, groups, optimize=not args.no_optimize)
+
+    output_path = args.output or os.path.join(
+        DEFAULT_RESULTS_DIR, f"benchmark_{datetime.now():%Y%m%d_%H%M%S}.json"
+    )
+    os.makedirs(os.path.dirname(os.path.abspath(output_path)), exist_ok=True)
+    with open(output_path, 'w', encoding='utf-8') as f:
+        json.dump(report, f, indent=2)
+
+    comparison = None
+    if args.save_baseline:
+        with open(args.baseline, 'w', encoding='utf-8') as f:
+            json.dump(report, f, indent=2)
+    elif os.path.exists(args.baseline):
+        with open(args.baseline, 'r', encoding='utf-8') as f:
+            comparison = compare_with_baseline(report, json.load(f), args.tolerance)
+
+    print_report(report, comparison)
+    print(f"\n💾 Hasil disimpan ke: {output_path}")
+
+    if args.save_baseline:
+        print(f"📌 Baseline disimpan ke: {args.baseline}")
+    elif comparison is None:
+        print(f"ℹ️ Baseline {args.baseline} belum ada; jalankan dengan --save-baseline untuk merekamnya")
+    else:
+        regressions = [row[0] for row in comparison if row[4]]
+        if regressions:
+            print(f"\n❌ {len(regressions)} benchmark lebih lambat dari baseline "
+                  f"(> +{args.tolerance:.0%}): {', '.join(regressions)}")
+            return 1
+        print(f"\n✅ Tidak ada regresi (toleransi +{args.tolerance:.0%})")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,452 @@
+"""
+Registry Longitudinal Anak
+Penyimpanan lokal (SQLite) untuk data anak dan pengukuran berulang
+"""
+
+import os
+import sqlite3
+import threading
+from datetime import date, datetime
+
+import numpy as np
+import pandas as pd
+
+from z_score_calculator import DAYS_PER_MONTH, WHOZScoreCalculator, age_in_days
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS children (
+    child_id TEXT PRIMARY KEY,
+    name TEXT,
+    gender TEXT NOT NULL,
+    birth_date TEXT NOT NULL,
+    village TEXT,
+    n_measurements INTEGER NOT NULL DEFAULT 0,
+    last_measured_at TEXT,
+    last_height_cm REAL,
+    last_zscore_hfa REAL,
+    last_who_status TEXT
+);
+
+CREATE INDEX IF NOT EXISTS idx_children_village ON children (village);
+
+CREATE TABLE IF NOT EXISTS measurements (
+    measurement_id INTEGER PRIMARY KEY AUTOINCREMENT,
+    child_id TEXT NOT NULL REFERENCES children (child_id),
+    village TEXT,
+    measured_at TEXT NOT NULL,
+    age_months REAL NOT NULL,
+    height_cm REAL NOT NULL,
+    weight_kg REAL,
+    zscore_hfa REAL,
+    zscore_wfa REAL,
+    zscore_wfh REAL,
+    who_status TEXT,
+    height_velocity REAL,
+    zscore_change REAL
+);
+
+CREATE INDEX IF NOT EXISTS idx_measurements_child_date ON measurements (child_id, measured_at);
+CREATE INDEX IF NOT EXISTS idx_measurements_village_date ON measurements (village, measured_at);
+CREATE INDEX IF NOT EXISTS idx_measurements_date ON measurements (measured_at);
+"""
+
+MEASUREMENT_COLUMNS = [
+    'measurement_id', 'child_id', 'village', 'measured_at', 'age_months', 'height_cm',
+    'weight_kg', 'zscore_hfa', 'zscore_wfa', 'zscore_wfh', 'who_status',
+    'height_velocity', 'zscore_change'
+]
+
+
+def _to_iso_date(value):
+    """Normalisasi tanggal (date/datetime/str) ke format ISO YYYY-MM-DD"""
+    if isinstance(value, datetime):
+        return value.date().isoformat()
+    if isinstance(value, date):
+        return value.isoformat()
+    return pd.Timestamp(value).date().isoformat()
+
+
+def age_in_months(birth_date, measured_at):
+    """Umur (bulan, pecahan) antara tanggal lahir dan tanggal pengukuran"""
+    return age_in_days(_to_iso_date(birth_date), _to_iso_date(measured_at)) / DAYS_PER_MONTH
+
+
+class ChildRegistry:
+    """
+    Registry anak dan riwayat pengukuran dengan indeks per anak, desa dan tanggal
+
+    Setiap pengukuran baru hanya menghitung Z-Score miliknya sendiri dan
+    kecepatan tumbuh terhadap pengukuran sebelumnya (satu lookup indeks),
+    tanpa menghitung ulang seluruh riwayat.
+    """
+
+    def __init__(self, db_path, calculator=None):
+        self.db_path = db_path
+        self.calculator = calculator or WHOZScoreCalculator()
+        self._local = threading.local()
+        self._write_lock = threading.Lock()
+        self._listeners = []
+
+        db_dir = os.path.dirname(os.path.abspath(db_path))
+        os.makedirs(db_dir, exist_ok=True)
+        self.connection.executescript(SCHEMA)
+
+    @property
+    def connection(self):
+        """Koneksi SQLite per thread (Streamlit menjalankan sesi di thread berbeda)"""
+        conn = getattr(self._local, 'connection', None)
+        if conn is None:
+            conn = sqlite3.connect(self.db_path, timeout=30)
+            conn.row_factory = sqlite3.Row
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.execute("PRAGMA foreign_keys=ON")
+            self._local.connection = conn
+        return conn
+
+    def close(self):
+        conn = getattr(self._local, 'connection', None)
+        if conn is not None:
+            conn.close()
+            self._local.connection = None
+
+    def add_listener(self, listener):
+        """
+        Daftarkan listener `on_measurements(conn, df)` yang dipanggil di dalam
+        transaksi yang sama setiap kali pengukuran baru disimpan
+        (df berisi kolom MEASUREMENT_COLUMNS + gender)
+        """
+        self._listeners.append(listener)
+
+    def _notify(self, conn, df):
+        for listener in self._listeners:
+            listener.on_measurements(conn, df)
+
+    # -------------------------------------------------
+    # Data anak
+    # -------------------------------------------------
+
+    def upsert_child(self, child_id, gender, birth_date, name=None, village=None):
+        """
+        Tambah anak baru atau perbarui identitasnya (ringkasan pengukuran tidak disentuh)
+        """
+        with self._write_lock, self.connection as conn:
+            conn.execute(
+                """
+                INSERT INTO children (child_id, name, gender, birth_date, village)
+                VALUES (?, ?, ?, ?, ?)
+                ON CONFLICT (child_id) DO UPDATE SET
+                    name = COALESCE(excluded.name, children.name),
+                    gender = excluded.gender,
+                    birth_date = excluded.birth_date,
+                    village = COALESCE(excluded.village, children.village)
+                """,
+                (child_id, name, gender.lower(), _to_iso_date(birth_date), village)
+            )
+
+    def get_child(self, child_id):
+        """Data anak beserta ringkasan pengukuran terakhir (dict) atau None"""
+        row = self.connection.execute(
+            "SELECT * FROM children WHERE child_id = ?", (child_id,)
+        ).fetchone()
+        return dict(row) if row else None
+
+    # -------------------------------------------------
+    # Pengukuran
+    # -------------------------------------------------
+
+    def _compute_zscores(self, age_days, height_cm, weight_kg, gender):
+        """Z-Score satu pengukuran lewat kernel vektor kalkulator (tabel LMS harian)"""
+        weight = np.nan if weight_kg is None else weight_kg
+        zscores = self.calculator.calculate_all_indicators(None, [height_cm], [weight], [gender],
+                                                           age_days=[age_days])
+        is_adult = age_days > self.calculator.adult_age_days
+        status = self.calculator.classify_indicator('hfa', zscores['hfa'], [is_adult])[0]
+        return {
+            'zscore_hfa': _nan_to_none(zscores['hfa'][0]),
+            'zscore_wfa': _nan_to_none(zscores['wfa'][0]),
+            'zscore_wfh': _nan_to_none(zscores['wfh'][0]),
+            'who_status': status
+        }
+
+    def add_measurement(self, child_id, measured_at, height_cm, weight_kg=None):
+        """
+        Simpan pengukuran baru dan perbarui Z-Score serta kecepatan tumbuh secara inkremental
+
+        Parameters:
+        - child_id: ID anak (harus sudah terdaftar lewat upsert_child)
+        - measured_at: Tanggal pengukuran
+        - height_cm: Tinggi badan (cm)
+        - weight_kg: Berat badan (kg), opsional
+
+        Returns: Dict baris pengukuran yang tersimpan
+        """
+        child = self.get_child(child_id)
+        if child is None:
+            raise KeyError(f"Anak dengan ID '{child_id}' belum terdaftar")
+
+        measured_at = _to_iso_date(measured_at)
+        age_days = age_in_days(child['birth_date'], measured_at)
+        record = {
+            'child_id': child_id,
+            'village': child['village'],
+            'measured_at': measured_at,
+            'age_months': age_days / DAYS_PER_MONTH,
+            'height_cm': float(height_cm),
+            'weight_kg': None if weight_kg is None else float(weight_kg),
+            **self._compute_zscores(age_days, height_cm, weight_kg, child['gender'])
+        }
+
+        with self._write_lock, self.connection as conn:
+            previous = conn.execute(
+                """
+                SELECT age_months, height_cm, zscore_hfa FROM measurements
+                WHERE child_id = ? AND measured_at <= ?
+                ORDER BY measured_at DESC, measurement_id DESC LIMIT 1
+                """,
+                (child_id, measured_at)
+            ).fetchone()
+            record['height_velocity'], record['zscore_change'] = _velocity(previous, record)
+
+            cursor = conn.execute(
+                f"INSERT INTO measurements ({', '.join(MEASUREMENT_COLUMNS[1:])}) "
+                f"VALUES ({', '.join('?' * (len(MEASUREMENT_COLUMNS) - 1))})",
+                [record[col] for col in MEASUREMENT_COLUMNS[1:]]
+            )
+            record['measurement_id'] = cursor.lastrowid
+
+            # Pengukuran susulan (tanggal lebih lama): perbarui velocity pengukuran berikutnya saja
+            following = conn.execute(
+                """
+                SELECT measurement_id, age_months, height_cm, zscore_hfa FROM measurements
+                WHERE child_id = ? AND measured_at > ?
+                ORDER BY measured_at ASC, measurement_id ASC LIMIT 1
+                """,
+                (child_id, measured_at)
+            ).fetchone()
+            if following is not None:
+                velocity, change = _velocity(record, following)
+                conn.execute(
+                    "UPDATE measurements SET height_velocity = ?, zscore_change = ? WHERE measurement_id = ?",
+                    (velocity, change, following['measurement_id'])
+                )
+
+            conn.execute(
+                """
+                UPDATE children SET
+                    n_measurements = n_measurements + 1,
+                    last_measured_at = CASE WHEN last_measured_at IS NULL OR ? >= last_measured_at
+                                            THEN ? ELSE last_measured_at END,
+                    last_height_cm = CASE WHEN last_measured_at IS NULL OR ? >= last_measured_at
+                                          THEN ? ELSE last_height_cm END,
+                    last_zscore_hfa = CASE WHEN last_measured_at IS NULL OR ? >= last_measured_at
+                                           THEN ? ELSE last_zscore_hfa END,
+                    last_who_status = CASE WHEN last_measured_at IS NULL OR ? >= last_measured_at
+                                           THEN ? ELSE last_who_status END
+                WHERE child_id = ?
+                """,
+                (measured_at, measured_at, measured_at, record['height_cm'],
+                 measured_at, record['zscore_hfa'], measured_at, record['who_status'], child_id)
+            )
+
+            if self._listeners:
+                self._notify(conn, pd.DataFrame([{**record, 'gender': child['gender']}]))
+
+        return record
+
+    def import_measurements(self, df, chunksize=100_000):
+        """
+        Import massal pengukuran (DataFrame) dengan Z-Score dan velocity dihitung vektor
+
+        Kolom wajib: child_id, gender, birth_date, measured_at, height_cm.
+        Kolom opsional: weight_kg, village, name.
+        Pengukuran diasumsikan lebih baru dari riwayat yang sudah tersimpan.
+
+        Returns: Jumlah pengukuran yang disimpan
+        """
+        total = 0
+        for start in range(0, len(df), chunksize):
+            total += self._import_chunk(df.iloc[start:start + chunksize])
+        return total
+
+    def _import_chunk(self, df):
+        df = df.copy()
+        for col in ('weight_kg', 'village', 'name'):
+            if col not in df:
+                df[col] = None
+        df['gender'] = df['gender'].str.lower()
+        df['birth_date'] = pd.to_datetime(df['birth_date']).dt.strftime('%Y-%m-%d')
+        df['measured_at'] = pd.to_datetime(df['measured_at']).dt.strftime('%Y-%m-%d')
+        age_days = age_in_days(df['birth_date'].to_numpy(dtype='datetime64[D]'),
+                               df['measured_at'].to_numpy(dtype='datetime64[D]'))
+        df['age_months'] = age_days / DAYS_PER_MONTH
+        df = df.sort_values(['child_id', 'measured_at'], kind='stable')
+
+        weight = pd.to_numeric(df['weight_kg'], errors='coerce').to_numpy(dtype=np.float64)
+        zscores = self.calculator.calculate_all_indicators(
+            None, df['height_cm'].to_numpy(dtype=np.float64), weight,
+            df['gender'].to_numpy(dtype=str), age_days=age_days
+        )
+        df['zscore_hfa'] = zscores['hfa']
+        df['zscore_wfa'] = zscores['wfa']
+        df['zscore_wfh'] = zscores['wfh']
+        df['who_status'] = self.calculator.classify_indicator(
+            'hfa', zscores['hfa'], age_days > self.calculator.adult_age_days
+        )
+
+        with self._write_lock, self.connection as conn:
+            children = df.drop_duplicates('child_id', keep='last')
+            identity = children[['child_id', 'name', 'gender', 'birth_date', 'village']].astype(object)
+            conn.executemany(
+                """
+                INSERT INTO children (child_id, name, gender, birth_date, village)
+                VALUES (?, ?, ?, ?, ?)
+                ON CONFLICT (child_id) DO UPDATE SET
+                    name = COALESCE(excluded.name, children.name),
+                    village = COALESCE(excluded.village, children.village)
+                """,
+                identity.where(identity.notna(), None).itertuples(index=False, name=None)
+            )
+
+            # Titik awal velocity: pengukuran terakhir per anak yang sudah ada di registry
+            child_ids = children['child_id'].tolist()
+            last = pd.DataFrame(
+                _fetch_by_ids(conn, """
+                    SELECT c.child_id, m.age_months, m.height_cm, m.zscore_hfa
+                    FROM children c JOIN measurements m
+                      ON m.child_id = c.child_id AND m.measured_at = c.last_measured_at
+                    WHERE c.child_id IN ({ids})
+                    """, child_ids),
+                columns=['child_id', 'prev_age', 'prev_height', 'prev_zscore']
+            ).drop_duplicates('child_id', keep='last')
+
+            grouped = df.groupby('child_id', sort=False)
+            df['prev_age'] = grouped['age_months'].shift()
+            df['prev_height'] = grouped['height_cm'].shift()
+            df['prev_zscore'] = grouped['zscore_hfa'].shift()
+            if not last.empty:
+                first = df['prev_age'].isna()
+                seed = df.loc[first, ['child_id']].merge(last, on='child_id', how='left')
+                for col in ('prev_age', 'prev_height', 'prev_zscore'):
+                    df.loc[first, col] = seed[col].to_numpy()
+
+            elapsed = df['age_months'] - df['prev_age']
+            with np.errstate(divide='ignore', invalid='ignore'):
+                df['height_velocity'] = np.where(elapsed > 0, (df['height_cm'] - df['prev_height']) / elapsed, np.nan)
+            df['zscore_change'] = (df['zscore_hfa'] - df['prev_zscore']).round(2)
+
+            df['village'] = df['child_id'].map(dict(
+                _fetch_by_ids(conn, "SELECT child_id, village FROM children WHERE child_id IN ({ids})", child_ids)
+            ))
+
+            rows = df[MEASUREMENT_COLUMNS[1:]].astype(object)
+            rows = rows.where(rows.notna(), None)
+            conn.executemany(
+                f"INSERT INTO measurements ({', '.join(MEASUREMENT_COLUMNS[1:])}) "
+                f"VALUES ({', '.join('?' * (len(MEASUREMENT_COLUMNS) - 1))})",
+                rows.itertuples(index=False, name=None)
+            )
+
+            latest = df.groupby('child_id', sort=False).agg(
+                n=('measured_at', 'size'),
+                measured_at=('measured_at', 'last'),
+                height_cm=('height_cm', 'last'),
+                zscore_hfa=('zscore_hfa', 'last'),
+                who_status=('who_status', 'last')
+            ).reset_index()
+            summary = latest[['n', 'measured_at', 'height_cm', 'zscore_hfa', 'who_status', 'child_id']].astype(object)
+            conn.executemany(
+                """
+                UPDATE children SET
+                    n_measurements = n_measurements + ?,
+                    last_measured_at = ?, last_height_cm = ?, last_zscore_hfa = ?, last_who_status = ?
+                WHERE child_id = ?
+                """,
+                summary.where(summary.notna(), None).itertuples(index=False, name=None)
+            )
+
+            if self._listeners:
+                self._notify(conn, df)
+
+        return len(df)
+
+    # -------------------------------------------------
+    # Query trajectory
+    # -------------------------------------------------
+
+    def get_child_trajectory(self, child_id):
+        """Riwayat pengukuran satu anak urut tanggal (DataFrame)"""
+        return pd.read_sql_query(
+            f"SELECT {', '.join(MEASUREMENT_COLUMNS)} FROM measurements "
+            "WHERE child_id = ? ORDER BY measured_at, measurement_id",
+            self.connection, params=(child_id,)
+        )
+
+    def get_village_trajectory(self, village, start_date=None, end_date=None):
+        """
+        Pengukuran satu desa dalam rentang tanggal (memakai indeks village + measured_at)
+        """
+        start_date = _to_iso_date(start_date) if start_date else '0000-01-01'
+        end_date = _to_iso_date(end_date) if end_date else '9999-12-31'
+        return pd.read_sql_query(
+            f"SELECT {', '.join(MEASUREMENT_COLUMNS)} FROM measurements "
+            "WHERE village = ? AND measured_at BETWEEN ? AND ? ORDER BY measured_at, measurement_id",
+            self.connection, params=(village, start_date, end_date)
+        )
+
+    def list_villages(self):
+        """Daftar desa yang punya anak terdaftar"""
+        rows = self.connection.execute(
+            "SELECT DISTINCT village FROM children WHERE village IS NOT NULL ORDER BY village"
+        ).fetchall()
+        return [row[0] for row in rows]
+
+
+def _fetch_by_ids(conn, sql, ids, batch_size=900):
+    """Jalankan query `... IN ({ids})` per batch (batas parameter SQLite)"""
+    rows = []
+    for start in range(0, len(ids), batch_size):
+        batch = ids[start:start + batch_size]
+        rows.extend(tuple(row) for row in conn.execute(sql.format(ids=', '.join('?' * len(batch))), batch))
+    return rows
+
+
+def _nan_to_none(value):
+    value = float(value)
+    return None if np.isnan(value) else value
+
+
+def _velocity(previous, current):
+    """Kecepatan tumbuh (cm/bulan) dan perubahan Z-Score antara dua pengukuran"""
+    if previous is None:
+        return None, None
+    elapsed = current['age_months'] - previous['age_months']
+    velocity = (current['height_cm'] - previous['height_cm']) / elapsed if elapsed > 0 else None
+    change = None
+    if current['zscore_hfa'] is not None and previous['zscore_hfa'] is not None:
+        change = round(current['zscore_hfa'] - previous['zscore_hfa'], 2)
+    return velocity, change
+
+
+# Testing function
+if __name__ == "__main__":
+    import tempfile
+    import time
+
+    db_path = os.path.join(tempfile.mkdtemp(), 'registry.db')
+    registry = ChildRegistry(db_path)
+
+    registry.upsert_child('A001', 'laki-laki', '2023-01-15', name='Ahmad', village='Bojong Nangka')
+    for measured_at, height in [('2023-07-15', 64.0), ('2024-01-15', 71.5), ('2024-07-15', 77.0)]:
+        registry.add_measurement('A001', measured_at, height, weight_kg=9.0)
+    # Pengukuran susulan di antara dua pengukuran lama
+    registry.add_measurement('A001', '2023-10-15', 68.0)
+
+    print(registry.get_child_trajectory('A001')[['measured_at', 'age_months', 'height_cm',
+                                                 'zscore_hfa', 'height_velocity']])
+    print(registry.get_child('A001'))
+
+    start = time.perf_counter()
+    for _ in range(100):
+        registry.get_village_trajectory('Bojong Nangka', '2023-01-01', '2024-12-31')
+    print(f"\nVillage query: {(time.perf_counter() - start) * 10:.2f} ms/query")
@@ -0,0 +1,484 @@
+"""
+Indeks KNN Hemat Memori
+Data training model KNN disimpan ringkas: umur & tinggi (sudah di-scaling) sebagai
+float32 atau fixed-point int16, jenis kelamin sebagai kunci partisi, label sebagai int8.
+Jarak dihitung langsung pada representasi ringkas itu.
+
+Contoh:
+    python compact_knn.py models --precision int16
+"""
+
+import argparse
+import json
+import os
+
+import numpy as np
+
+COMPACT_INDEX_FILE = 'compact_index.npz'
+
+# Layout array mentah (.npy per array) yang bisa di-mmap read-only dan dibagi antar proses
+COMPACT_INDEX_DIR = 'compact_index'
+INDEX_ARRAYS = ('points', 'labels', 'offsets', 'gender_values', 'classes')
+INDEX_PARAMS_FILE = 'index.json'
+
+# Kolom fitur (urutan sama dengan StuntingKNNModel.feature_names)
+AGE_COL, GENDER_COL, HEIGHT_COL = 0, 1, 2
+
+# Fixed-point int16: nilai scaled x disimpan sebagai round(x * INT16_SCALE)
+# (rentang +-8 SD, resolusi ~0.00024 SD)
+INT16_SCALE = 4096.0
+
+# Lebar jendela umur (satuan SD umur) di sekitar satu blok query; query yang tetangganya
+# melewati batas jendela dihitung ulang terhadap seluruh partisi
+AGE_WINDOW = 0.1
+
+# Toleransi pembulatan float32 pada cek batas jendela (hasil dekat batas dihitung ulang)
+DISTANCE_TOLERANCE = 1e-4
+
+# Ukuran blok query untuk pencarian lintas partisi
+REDO_BLOCK = 256
+
+# Batas elemen matriks jarak per blok query (float32 -> ~16 MB)
+MAX_BLOCK_ELEMENTS = 4_000_000
+
+
+def neighbor_proba(distances, neighbor_labels, n_classes, weights='uniform'):
+    """
+    Probabilitas kelas dari hasil query tetangga (setara predict_proba sklearn)
+
+    Parameters:
+    - distances: Array (m, k) jarak ke tetangga
+    - neighbor_labels: Array (m, k) indeks kelas tetangga
+    - n_classes: Jumlah kelas
+    - weights: 'uniform' atau 'distance'
+    """
+    distances = np.asarray(distances)
+    if weights == 'distance':
+        with np.errstate(divide='ignore'):
+            vote = 1.0 / distances.astype(np.float64)
+        # Sama dengan sklearn: jika ada tetangga berjarak 0, hanya tetangga itu yang dihitung
+        zero = distances == 0
+        has_zero = zero.any(axis=1)
+        vote[has_zero] = zero[has_zero]
+    else:
+        vote = np.ones(distances.shape)
+
+    probabilities = np.zeros((len(distances), n_classes))
+    rows = np.repeat(np.arange(len(distances)), distances.shape[1])
+    np.add.at(probabilities, (rows, np.asarray(neighbor_labels).ravel()), vote.ravel())
+    probabilities /= probabilities.sum(axis=1, keepdims=True)
+    return probabilities
+
+
+class CompactKNNIndex:
+    """
+    Pengganti KNeighborsClassifier (metric euclidean/manhattan, weights uniform/distance)
+    dengan penyimpanan ringkas per partisi jenis kelamin
+
+    Setiap partisi diurutkan menurut umur, sehingga satu blok query (juga diurutkan
+    menurut umur) hanya membaca potongan array yang bersebelahan. Hasil tetap eksak:
+    query yang tetangga ke-k-nya lebih jauh dari batas jendela umur atau dari jarak
+    antar jenis kelamin dihitung ulang terhadap seluruh kandidat.
+    """
+
+    def __init__(self, points, labels, offsets, gender_values, classes, n_neighbors, weights, p,
+                 precision='float32'):
+        self.points = points              # (n, 2) umur & tinggi scaled, float32 atau int16 (kolom-mayor)
+        self.labels = labels              # (n,) indeks kelas int8
+        self.offsets = offsets            # batas partisi: partisi g = [offsets[g], offsets[g+1])
+        self.gender_values = gender_values  # nilai kolom jenis kelamin (scaled) per partisi
+        self.classes = classes            # label kelas asli model (urutan predict_proba)
+        self.n_neighbors = int(n_neighbors)
+        self.weights = weights
+        self.p = int(p)
+        self.precision = precision
+
+        self._quant = INT16_SCALE if precision == 'int16' else 1.0
+        # Jendela umur dicari langsung pada kolom umur tersimpan (dtype asli). Points disimpan
+        # kolom-mayor sehingga kolom ini bersebelahan di memori; indeks format lama (baris-mayor)
+        # menyalin kolom umur sekali agar searchsorted tidak menyalin di setiap panggilan
+        age_column = points[:, 0]
+        if not age_column.flags.c_contiguous:
+            age_column = np.ascontiguousarray(age_column)
+        self._age_column = age_column
+        self._ages = [age_column[offsets[g]:offsets[g + 1]] for g in range(len(gender_values))]
+        # Folder asal jika array di-mmap (memori dibagi dengan proses lain)
+        self.mapped_from = None
+
+    # -------------------------------------------------
+    # Build & simpan
+    # -------------------------------------------------
+
+    @classmethod
+    def from_model(cls, model, precision='float32'):
+        """
+        Bangun indeks dari KNeighborsClassifier yang sudah di-fit (fitur scaled)
+
+        Raises: ValueError untuk metric/weights yang tidak didukung
+        """
+        if precision not in ('float32', 'int16'):
+            raise ValueError(f"Precision tidak dikenal: {precision}")
+
+        metric = model.effective_metric_
+        p = model.effective_metric_params_.get('p', 2)
+        if metric == 'euclidean':
+            p = 2
+        elif metric == 'manhattan':
+            p = 1
+        elif metric != 'minkowski' or p not in (1, 2):
+            raise ValueError(f"Metric tidak didukung: {metric} (p={p})")
+        if model.weights not in ('uniform', 'distance'):
+            raise ValueError(f"Weights tidak didukung: {model.weights}")
+
+        X = np.asarray(model._fit_X, dtype=np.float64)
+        y = np.asarray(model._y)
+
+        gender_values = np.unique(X[:, GENDER_COL])
+        partition = np.searchsorted(gender_values, X[:, GENDER_COL])
+        order = np.lexsort((X[:, HEIGHT_COL], X[:, AGE_COL], partition))
+        offsets = np.searchsorted(partition[order], np.arange(len(gender_values) + 1))
+
+        features = X[order][:, [AGE_COL, HEIGHT_COL]]
+        if precision == 'int16':
+            scaled = np.round(features * INT16_SCALE)
+            if np.abs(scaled).max() > np.iinfo(np.int16).max:
+                raise ValueError("Nilai fitur di luar rentang fixed-point int16")
+            points = scaled.astype(np.int16)
+        else:
+            points = features.astype(np.float32)
+
+        return cls(np.asfortranarray(points), y[order].astype(np.int8), offsets.astype(np.int64),
+                   gender_values, np.asarray(model.classes_), model.n_neighbors, model.weights, p,
+                   precision)
+
+    def save(self, path):
+        np.savez(path, points=self.points, labels=self.labels, offsets=self.offsets,
+                 gender_values=self.gender_values, classes=self.classes,
+                 params=np.array([self.n_neighbors, self.p]),
+                 weights=np.array(self.weights), precision=np.array(self.precision))
+
+    @classmethod
+    def load(cls, path):
+        with np.load(path, allow_pickle=False) as data:
+            n_neighbors, p = data['params']
+            return cls(np.asfortranarray(data['points']), data['labels'], data['offsets'], data['gender_values'],
+                       data['classes'], n_neighbors, str(data['weights']), p, str(data['precision']))
+
+    def save_arrays(self, directory):
+        """
+        Simpan array sebagai .npy mentah + index.json (tanpa kompresi, bisa di-mmap;
+        urutan memori kolom-mayor points ikut tersimpan)
+
+        Semua file di-fsync sebelum kembali. Returns: Dict spesifikasi array (shape, dtype)
+        """
+        os.makedirs(directory, exist_ok=True)
+        specs = {}
+        for name in INDEX_ARRAYS:
+            array = getattr(self, name)
+            path = os.path.join(directory, f"{name}.npy")
+            with open(path, 'wb') as f:
+                np.save(f, array, allow_pickle=False)
+                f.flush()
+                os.fsync(f.fileno())
+            specs[name] = {'shape': list(array.shape), 'dtype': array.dtype.str}
+        with open(os.path.join(directory, INDEX_PARAMS_FILE), 'w', encoding='utf-8') as f:
+            json.dump({'n_neighbors': self.n_neighbors, 'p': self.p, 'weights': self.weights,
+                       'precision': self.precision, 'arrays': specs}, f, indent=2)
+            f.flush()
+            os.fsync(f.fileno())
+        return specs
+
+    @classmethod
+    def load_mapped(cls, directory):
+        """
+        Indeks dari folder save_arrays dengan array di-mmap read-only: halaman memori dibagi
+        dengan semua proses yang memetakan file yang sama (page cache / tmpfs)
+
+        Raises: ValueError jika shape/dtype file tidak sesuai index.json (file terpotong/tertukar)
+        """
+        with open(os.path.join(directory, INDEX_PARAMS_FILE), 'r', encoding='utf-8') as f:
+            params = json.load(f)
+        arrays = {}
+        for name in INDEX_ARRAYS:
+            mapped = np.load(os.path.join(directory, f"{name}.npy"), mmap_mode='r', allow_pickle=False)
+            spec = params['arrays'][name]
+            if list(mapped.shape) != spec['shape'] or mapped.dtype.str != spec['dtype']:
+                raise ValueError(f"Array {name} tidak sesuai index.json: {mapped.shape} {mapped.dtype}")
+            # View ndarray biasa (hasil operasi tidak ikut bertipe memmap)
+            arrays[name] = mapped.view(np.ndarray)
+        index = cls(arrays['points'], arrays['labels'], arrays['offsets'], arrays['gender_values'],
+                    arrays['classes'], params['n_neighbors'], params['weights'], params['p'],
+                    params['precision'])
+        index.mapped_from = directory
+        return index
+
+    @property
+    def nbytes(self):
+        """Memori data indeks (byte), termasuk salinan kolom umur pada indeks format lama"""
+        age_copy = 0 if np.may_share_memory(self._age_column, self.points) else self._age_column.nbytes
+        return (self.points.nbytes + self.labels.nbytes + self.offsets.nbytes
+                + self.gender_values.nbytes + age_copy)
+
+    def training_data(self):
+        """Data training dalam ruang scaled (float64) beserta indeks kelas, untuk update model"""
+        X = np.empty((len(self.labels), 3))
+        X[:, AGE_COL] = self._decode(self.points[:, 0])
+        X[:, HEIGHT_COL] = self._decode(self.points[:, 1])
+        X[:, GENDER_COL] = np.repeat(self.gender_values, np.diff(self.offsets))
+        return X, self.labels.astype(np.int64)
+
+    def rows(self, indices):
+        """Baris training (ruang scaled, float64) dan indeks kelas untuk indeks hasil kneighbors"""
+        indices = np.asarray(indices)
+        X = np.empty(indices.shape + (3,))
+        X[..., AGE_COL] = self._decode(self.points[indices, 0])
+        X[..., HEIGHT_COL] = self._decode(self.points[indices, 1])
+        X[..., GENDER_COL] = self.gender_values[np.searchsorted(self.offsets, indices, side='right') - 1]
+        return X, self.labels[indices].astype(np.int64)
+
+    # -------------------------------------------------
+    # Query
+    # -------------------------------------------------
+
+    def _decode(self, values):
+        return values.astype(np.float64) / self._quant if self._quant != 1.0 else values.astype(np.float64)
+
+    def _encode(self, values):
+        if self._quant != 1.0:
+            return np.round(values * self._quant).astype(np.int32)
+        return values.astype(np.float32)
+
+    def _age_bound(self, value, side):
+        """
+        Batas umur (float64, skala scaled) dalam dtype kolom umur tersimpan untuk searchsorted:
+        side='left' -> nilai tersimpan terkecil >= value, 'right' -> terbesar <= value
+        (batas di luar rentang int16 di-clip, jendela hanya bisa melebar)
+        """
+        if self._quant != 1.0:
+            scaled = value * self._quant
+            scaled = np.ceil(scaled) if side == 'left' else np.floor(scaled)
+            info = np.iinfo(np.int16)
+            return np.int16(np.clip(scaled, info.min, info.max))
+        encoded = np.float32(value)
+        if side == 'left' and encoded < value:
+            encoded = np.nextafter(encoded, np.float32(np.inf))
+        elif side == 'right' and encoded > value:
+            encoded = np.nextafter(encoded, np.float32(-np.inf))
+        return encoded
+
+    def _age_window(self, ages, lo_age, hi_age):
+        """Rentang [lo, hi) titik partisi dengan umur di [lo_age, hi_age]"""
+        return (np.searchsorted(ages, self._age_bound(lo_age, 'left'), side='left'),
+                np.searchsorted(ages, self._age_bound(hi_age, 'right'), side='right'))
+
+    def _distances(self, query, points):
+        """Matriks jarak (m, n) antara query ter-encode dan potongan points, float32"""
+        d_age = np.subtract(points[None, :, 0], query[:, None, 0], dtype=np.float32)
+        d_height = np.subtract(points[None, :, 1], query[:, None, 1], dtype=np.float32)
+        if self.p == 1:
+            dist = np.abs(d_age)
+            dist += np.abs(d_height)
+        else:
+            np.square(d_age, out=d_age)
+            np.square(d_height, out=d_height)
+            dist = d_age
+            dist += d_height
+            np.sqrt(dist, out=dist)
+        if self._quant != 1.0:
+            dist /= np.float32(self._quant)
+        return dist
+
+    def _nearest(self, dist, base=0, index=None):
+        """k jarak & indeks terkecil per baris (indeks global), terurut menurut jarak"""
+        if index is None:
+            index = np.broadcast_to(np.arange(dist.shape[1]) + base, dist.shape)
+        k = min(self.n_neighbors, dist.shape[1])
+        part = np.argpartition(dist, k - 1, axis=1)[:, :k]
+        part_dist = np.take_along_axis(dist, part, axis=1)
+        order = np.argsort(part_dist, axis=1, kind='stable')
+        return (np.take_along_axis(part_dist, order, axis=1),
+                np.take_along_axis(np.take_along_axis(index, part, axis=1), order, axis=1))
+
+    def _search_partition(self, g, query_age, query):
+        """Tetangga terdekat untuk query (sudah terurut umur) di partisi jenis kelamin g"""
+        start, stop = self.offsets[g], self.offsets[g + 1]
+        ages = self._ages[g]
+        n_points = stop - start
+        k = min(self.n_neighbors, n_points)
+        m = len(query)
+        out_dist = np.empty((m, k), dtype=np.float32)
+        out_index = np.empty((m, k), dtype=np.int64)
+
+        # Blok query: rentang umur <= AGE_WINDOW dan ukuran matriks jarak terbatas
+        block = max(1, MAX_BLOCK_ELEMENTS // max(n_points, 1))
+        bins = np.floor((query_age - query_age[0]) / AGE_WINDOW)
+        bin_starts = np.flatnonzero(np.r_[True, bins[1:] != bins[:-1]])
+        bounds = np.r_[bin_starts, m]
+        blocks = [(b, min(b + block, e)) for s_, e in zip(bounds[:-1], bounds[1:]) for b in range(s_, e, block)]
+
+        for i, j in blocks:
+            q_age = query_age[i:j]
+            lo, hi = self._age_window(ages, q_age.min() - AGE_WINDOW, q_age.max() + AGE_WINDOW)
+            if hi - lo < k:
+                lo, hi = 0, n_points
+
+            dist, index = self._nearest(self._distances(query[i:j], self.points[start + lo:start + hi]),
+                                        base=start + lo)
+            # Titik di luar jendela berjarak > selisih umur ke batas jendela
+            bound = np.minimum(q_age - (float(ages[lo - 1]) / self._quant if lo > 0 else -np.inf),
+                               (float(ages[hi]) / self._quant if hi < n_points else np.inf) - q_age)
+            redo = dist[:, -1] >= bound - DISTANCE_TOLERANCE
+            if redo.any():
+                # Jarak tetangga ke-k di jendela adalah batas atas jarak sebenarnya:
+                # cukup cari ulang di semua titik dengan selisih umur <= jarak itu
+                radius = dist[redo, -1].astype(np.float64) + DISTANCE_TOLERANCE
+                lo, hi = self._age_window(ages, (q_age[redo] - radius).min(), (q_age[redo] + radius).max())
+                dist[redo], index[redo] = self._nearest(
+                    self._distances(query[i:j][redo], self.points[start + lo:start + hi]), base=start + lo
+                )
+            out_dist[i:j], out_index[i:j] = dist, index
+        return out_dist, out_index
+
+    def kneighbors(self, X_scaled):
+        """
+        k tetangga terdekat untuk query (fitur scaled, sama dengan input model sklearn)
+
+        Returns: (distances, indices) array (m, k); indeks merujuk ke urutan internal indeks
+        """
+        X_scaled = np.asarray(X_scaled, dtype=np.float64)
+        m = len(X_scaled)
+        k = min(self.n_neighbors, len(self.labels))
+        distances = np.empty((m, k), dtype=np.float32)
+        indices = np.empty((m, k), dtype=np.int64)
+
+        partition = np.abs(X_scaled[:, GENDER_COL][:, None] - self.gender_values[None, :]).argmin(axis=1)
+        for g in range(len(self.gender_values)):
+            rows = np.flatnonzero(partition == g)
+            if len(rows) == 0:
+                continue
+            rows = rows[np.argsort(X_scaled[rows, AGE_COL], kind='stable')]
+            query = self._encode(X_scaled[rows][:, [AGE_COL, HEIGHT_COL]])
+            query_age = X_scaled[rows, AGE_COL]
+
+            # Titik partisi lain berjarak minimal selisih kolom jenis kelamin
+            others = [h for h in range(len(self.gender_values)) if h != g]
+            own_searched = self.offsets[g + 1] - self.offsets[g] >= k
+            if own_searched:
+                dist, index = self._search_partition(g, query_age, query)
+                redo = np.zeros(len(rows), dtype=bool)
+                if others:
+                    gap = min(abs(self.gender_values[h] - self.gender_values[g]) for h in others)
+                    redo = dist[:, -1] >= gap - DISTANCE_TOLERANCE
+            else:
+                dist = np.empty((len(rows), k), dtype=np.float32)
+                index = np.empty((len(rows), k), dtype=np.int64)
+                redo = np.ones(len(rows), dtype=bool)
+
+            # Blok kecil agar jendela umur per blok tetap sempit
+            redo_rows = np.flatnonzero(redo)
+            for b in range(0, len(redo_rows), REDO_BLOCK):
+                sel = redo_rows[b:b + REDO_BLOCK]
+                if own_searched:
+                    radius = dist[sel, -1].astype(np.float64) + DISTANCE_TOLERANCE
+                else:
+                    radius = np.full(len(sel), np.inf)
+                dist[sel], index[sel] = self._search_all(query[sel], query_age[sel], radius, g, others)
+
+            distances[rows], indices[rows] = dist, index
+        return distances, indices
+
+    def _search_all(self, query, query_age, radius, g, others):
+        """
+        Pencarian yang juga mencakup partisi jenis kelamin lain (kasus jarang: query jauh
+        dari data). radius = batas atas jarak tetangga ke-k, membatasi jendela umur tiap partisi.
+        """
+        dist_parts, index_parts = [], []
+        for h in [g] + others:
+            h_start = self.offsets[h]
+            lo, hi = self._age_window(self._ages[h], (query_age - radius).min(), (query_age + radius).max())
+            d = self._distances(query, self.points[h_start + lo:h_start + hi])
+            if h != g:
+                gap = abs(self.gender_values[h] - self.gender_values[g])
+                d = (d + gap if self.p == 1 else np.sqrt(d.astype(np.float64) ** 2 + gap ** 2)).astype(np.float32)
+            dist_parts.append(d)
+            index_parts.append(np.broadcast_to(np.arange(h_start + lo, h_start + hi), d.shape))
+        return self._nearest(np.concatenate(dist_parts, axis=1), base=0,
+                             index=np.concatenate(index_parts, axis=1))
+
+    def predict_proba(self, X_scaled):
+        """Probabilitas kelas, urutan kolom sama dengan classes (setara predict_proba sklearn)"""
+        distances, indices = self.kneighbors(X_scaled)
+        return neighbor_proba(distances, self.labels[indices], len(self.classes), self.weights)
+
+    def predict(self, X_scaled):
+        return self.classes[self.predict_proba(X_scaled).argmax(axis=1)]
+
+
+def check_agreement(index, model, X_scaled):
+    """
+    Bandingkan prediksi indeks ringkas dengan model float64 asli
+
+    Label yang berbeda karena jarak tetangga ke-k sama dengan ke-(k+1) (pilihan di
+    antara tetangga berjarak sama tidak ditentukan, juga di sklearn) dihitung terpisah.
+
+    Returns: Dict agreement (fraksi label sama), n_mismatch, n_tie_mismatch, max_proba_diff
+    """
+    proba_ref = model.predict_proba(X_scaled)
+    proba = index.predict_proba(X_scaled)
+    mismatch = np.flatnonzero(proba_ref.argmax(axis=1) != proba.argmax(axis=1))
+
+    n_tie = 0
+    if len(mismatch):
+        k = model.n_neighbors
+        distances, _ = model.kneighbors(X_scaled[mismatch], n_neighbors=k + 1)
+        n_tie = int(np.isclose(distances[:, k - 1], distances[:, k], rtol=0, atol=DISTANCE_TOLERANCE).sum())
+
+    return {
+        'agreement': float(1 - len(mismatch) / len(X_scaled)),
+        'n_mismatch': int(len(mismatch)),
+        'n_tie_mismatch': n_tie,
+        'max_proba_diff': float(np.abs(proba_ref - proba).max())
+    }
+
+
+def main(argv=None):
+    """Bangun indeks ringkas dari model tersimpan dan cek kesesuaian pada data hold-out"""
+    from sklearn.model_selection import train_test_split
+    import pandas as pd
+    from knn_model_trainer import StuntingKNNModel
+
+    current_dir = os.path.dirname(os.path.abspath(__file__))
+    parser = argparse.ArgumentParser(description="Bangun indeks KNN hemat memori dari model tersimpan")
+    parser.add_argument('model_dir', help="Folder model (knn_model.pkl, scaler.pkl, encoders.pkl)")
+    parser.add_argument('--precision', choices=['float32', 'int16'], default='float32')
+    parser.add_argument('--data', default=os.path.join(current_dir, 'data_balita.csv'),
+                        help="Dataset untuk membentuk ulang split hold-out (test_size=0.2, random_state=42)")
+    args = parser.parse_args(argv)
+
+    knn_model = StuntingKNNModel(None)
+    knn_model.load_model(args.model_dir)
+    index = CompactKNNIndex.from_model(knn_model.model, precision=args.precision)
+    original = knn_model.model._fit_X.nbytes + knn_model.model._y.nbytes
+    print(f"📦 Indeks {args.precision}: {index.nbytes / 1024:,.0f} KB "
+          f"(data training float64: {original / 1024:,.0f} KB, {original / index.nbytes:.1f}x lebih kecil)")
+
+    # Sama dengan preprocessing notebook: hapus duplikat & missing sebelum split
+    df = pd.read_csv(args.data).drop_duplicates().dropna()
+    X = np.column_stack([df['Umur (bulan)'], knn_model.gender_encoder.transform(df['Jenis Kelamin']),
+                         df['Tinggi Badan (cm)']])
+    y = knn_model.label_encoder.transform(df['Status Gizi'])
+    _, X_test, _, _ = train_test_split(X, y, test_size=0.2, random_state=42, stratify=y)
+
+    report = check_agreement(index, knn_model.model, knn_model.scaler.transform(X_test))
+    print(f"🔍 Hold-out {len(X_test):,} sampel: kesesuaian label {report['agreement']:.4%} "
+          f"({report['n_mismatch']} beda, {report['n_tie_mismatch']} karena jarak tetangga sama)")
+    print(f"   Selisih probabilitas maks: {report['max_proba_diff']:.2e}")
+
+    path = os.path.join(args.model_dir, COMPACT_INDEX_FILE)
+    index.save(path)
+    print(f"💾 Indeks disimpan ke {path}")
+    return report
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,194 @@
+"""
+Audit Kualitas Dataset terhadap WHO Z-Score
+Menghitung Z-Score TB/U seluruh dataset dalam satu pass vektor, membandingkan
+label `Status Gizi` dengan kategori WHO, dan menandai nilai tidak masuk akal
+(|Z| > 6), data tidak valid serta baris duplikat / duplikat dengan label berbeda
+
+Contoh:
+    python dataset_audit.py data_balita.csv
+    python dataset_audit.py data_baru.csv --output audit_results --max-mismatch-rate 0.05
+"""
+
+import argparse
+import json
+import os
+import sys
+import time
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+
+from batch_screener import DEFAULT_COLUMNS, GENDER_ALIASES
+from z_score_calculator import WHOZScoreCalculator
+
+CURRENT_DIR = os.path.dirname(os.path.abspath(__file__))
+DEFAULT_OUTPUT_DIR = os.path.join(CURRENT_DIR, 'audit_results')
+
+LABEL_COLUMN = 'Status Gizi'
+
+# Batas WHO untuk Z-Score TB/U yang secara biologis tidak masuk akal
+IMPLAUSIBLE_ZSCORE = 6.0
+
+# Label dataset -> kategori classify_nutrition_status (anak)
+LABEL_TO_WHO = {
+    'severely stunted': 'Severely Stunted (Sangat Pendek)',
+    'stunted': 'Stunted (Pendek)',
+    'normal': 'Normal',
+    'tinggi': 'Tall (Tinggi)'
+}
+
+# Urutan flag di laporan dan file baris bermasalah
+FLAGS = ('missing_value', 'unknown_gender', 'invalid_age', 'unknown_label', 'age_over_table',
+         'implausible_zscore', 'label_mismatch', 'duplicate', 'conflicting_duplicate')
+
+
+def audit_dataset(df, calculator=None, columns=None, label_column=LABEL_COLUMN, z_limit=IMPLAUSIBLE_ZSCORE):
+    """
+    Audit DataFrame dengan skema data_balita.csv (tanpa loop per baris)
+
+    Returns: (report, flags)
+    - report: Dict ringkasan (crosstab label vs WHO, jumlah per flag, statistik Z per label)
+    - flags: DataFrame boolean per baris untuk setiap flag + kolom 'zscore' dan 'who_status'
+    """
+    calculator = calculator or WHOZScoreCalculator()
+    columns = {**DEFAULT_COLUMNS, **(columns or {})}
+    start = time.perf_counter()
+
+    age = pd.to_numeric(df[columns['age']], errors='coerce').to_numpy(dtype=np.float64)
+    height = pd.to_numeric(df[columns['height']], errors='coerce').to_numpy(dtype=np.float64)
+    gender = df[columns['gender']].astype(str).str.strip().str.lower().map(GENDER_ALIASES).to_numpy()
+    label = df[label_column].astype(str).str.strip().str.lower().to_numpy()
+    who_expected = pd.Series(label).map(LABEL_TO_WHO).to_numpy()
+
+    missing = np.isnan(age) | np.isnan(height) | df[label_column].isna().to_numpy()
+    unknown_gender = pd.isna(gender) & ~missing
+    invalid_age = ~np.isnan(age) & (age < 0)
+    valid = ~missing & ~unknown_gender & ~invalid_age
+
+    zscore = np.full(len(df), np.nan)
+    if valid.any():
+        zscore[valid] = calculator.calculate_indicator('hfa', age[valid], height[valid], gender[valid].astype(str))
+    max_age = max(calculator.male_data)
+    is_adult = age > max_age
+    who_status = calculator.classify_indicator('hfa', zscore, is_adult)
+
+    # Duplikat: baris identik; konflik: fitur (umur, jenis kelamin, tinggi) sama dengan label berbeda
+    records = pd.DataFrame({'age': age, 'gender': gender, 'height': height, 'label': label})
+    duplicate = records.duplicated(keep='first').to_numpy()
+    conflicting = (records.groupby(['age', 'gender', 'height'], dropna=False)['label']
+                   .transform('nunique').to_numpy() > 1)
+
+    flags = pd.DataFrame({
+        'missing_value': missing,
+        'unknown_gender': unknown_gender,
+        'invalid_age': invalid_age,
+        'unknown_label': pd.isna(who_expected) & ~missing,
+        'age_over_table': is_adult & valid,
+        'implausible_zscore': np.abs(zscore) > z_limit,
+        'label_mismatch': valid & pd.notna(who_expected) & ~is_adult & (who_status != who_expected),
+        'duplicate': duplicate,
+        'conflicting_duplicate': conflicting
+    }, index=df.index)
+    flags['zscore'] = zscore
+    flags['who_status'] = who_status
+
+    comparable = valid & pd.notna(who_expected) & ~is_adult
+    crosstab = pd.crosstab(pd.Series(label[comparable], name='label'),
+                           pd.Series(who_status[comparable], name='who_status'))
+    mismatch_by_label = (flags.loc[comparable, 'label_mismatch']
+                         .groupby(label[comparable]).mean().round(4).to_dict())
+
+    zscore_by_label = {}
+    for name, values in pd.Series(zscore[valid]).groupby(label[valid]):
+        zscore_by_label[name] = {
+            'min': float(values.min()), 'p5': float(values.quantile(0.05)), 'median': float(values.median()),
+            'p95': float(values.quantile(0.95)), 'max': float(values.max())
+        }
+
+    report = {
+        'n_rows': int(len(df)),
+        'n_valid': int(valid.sum()),
+        'z_limit': z_limit,
+        'flag_counts': {flag: int(flags[flag].sum()) for flag in FLAGS},
+        'n_conflicting_groups': int(records.loc[conflicting, ['age', 'gender', 'height']].drop_duplicates().shape[0]),
+        'label_agreement': float(1 - flags.loc[comparable, 'label_mismatch'].mean()) if comparable.any() else None,
+        'mismatch_rate_by_label': mismatch_by_label,
+        'crosstab': {row: {col: int(n) for col, n in counts.items()} for row, counts in crosstab.iterrows()},
+        'zscore_by_label': zscore_by_label,
+        'elapsed_ms': round((time.perf_counter() - start) * 1000, 1)
+    }
+    return report, flags
+
+
+def print_report(report):
+    counts = report['flag_counts']
+    print(f"\n📋 {report['n_rows']:,} baris, {report['n_valid']:,} valid ({report['elapsed_ms']:.0f} ms)")
+    print("\n🚩 Flag:")
+    for flag in FLAGS:
+        print(f"   {flag:<24}{counts[flag]:>10,}")
+    if report['label_agreement'] is not None:
+        print(f"\n🎯 Kesesuaian label dengan kategori WHO: {report['label_agreement']:.2%}")
+        for label, rate in report['mismatch_rate_by_label'].items():
+            print(f"   {label:<20} tidak sesuai {rate:.2%}")
+    print("\n📊 Label vs kategori WHO:")
+    print(pd.DataFrame(report['crosstab']).T.fillna(0).astype(int).to_string())
+
+
+def main(argv=None):
+    """Entry point command line"""
+    parser = argparse.ArgumentParser(description="Audit kualitas dataset terhadap WHO Z-Score TB/U")
+    parser.add_argument('input', nargs='?', default=os.path.join(CURRENT_DIR, 'data_balita.csv'))
+    parser.add_argument('--output', default=DEFAULT_OUTPUT_DIR, help="Folder laporan (JSON + CSV baris bermasalah)")
+    parser.add_argument('--z-limit', type=float, default=IMPLAUSIBLE_ZSCORE, help="Batas |Z| tidak masuk akal")
+    parser.add_argument('--max-mismatch-rate', type=float, default=None,
+                        help="Exit code 1 jika proporsi label tidak sesuai WHO melebihi nilai ini")
+    parser.add_argument('--max-implausible', type=int, default=None,
+                        help="Exit code 1 jika jumlah |Z| > batas melebihi nilai ini")
+    args = parser.parse_args(argv)
+
+    print("=" * 80)
+    print("🔎 AUDIT DATASET STUNTING")
+    print("=" * 80)
+    df = pd.read_csv(args.input)
+    report, flags = audit_dataset(df, z_limit=args.z_limit)
+    report['dataset'] = os.path.abspath(args.input)
+    report['timestamp'] = datetime.now().isoformat(timespec='seconds')
+    print_report(report)
+
+    os.makedirs(args.output, exist_ok=True)
+    stem = os.path.splitext(os.path.basename(args.input))[0]
+    report_path = os.path.join(args.output, f"{stem}_audit.json")
+    flagged_path = os.path.join(args.output, f"{stem}_audit_flags.csv")
+    with open(report_path, 'w', encoding='utf-8') as f:
+        json.dump(report, f, indent=2, ensure_ascii=False)
+
+    flagged = flags[list(FLAGS)].any(axis=1)
+    # Gabung nama flag per baris secara vektor (tanpa apply per baris)
+    reasons = np.full(int(flagged.sum()), '', dtype=object)
+    for flag in FLAGS:
+        reasons = reasons + np.where(flags.loc[flagged, flag].to_numpy(), flag + ';', '')
+    reasons = pd.Series(reasons, index=flags.index[flagged]).str.rstrip(';')
+    df.loc[flagged].assign(**{
+        'Z-Score TB/U': flags.loc[flagged, 'zscore'],
+        'Status WHO': flags.loc[flagged, 'who_status'],
+        'Flag': reasons
+    }).to_csv(flagged_path, index_label='baris')
+    print(f"\n💾 Laporan: {report_path}")
+    print(f"💾 Baris bermasalah ({int(flagged.sum()):,}): {flagged_path}")
+
+    failed = []
+    if args.max_mismatch_rate is not None and report['label_agreement'] is not None \
+            and 1 - report['label_agreement'] > args.max_mismatch_rate:
+        failed.append(f"label tidak sesuai {1 - report['label_agreement']:.2%} > {args.max_mismatch_rate:.2%}")
+    if args.max_implausible is not None and report['flag_counts']['implausible_zscore'] > args.max_implausible:
+        failed.append(f"{report['flag_counts']['implausible_zscore']} nilai |Z| > {args.z_limit}")
+    if failed:
+        print(f"\n❌ Audit gagal: {'; '.join(failed)}")
+        return 1
+    print("\n✅ Audit selesai")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,191 @@
+"""
+Monitor Drift Input secara Streaming
+Histogram ringkas (bin lebar tetap) untuk umur, jenis kelamin dan tinggi badan
+yang masuk ke StuntingKNNModel.predict, dibandingkan dengan histogram referensi
+dari data training yang disimpan bersama model (drift_reference.json)
+
+Tidak ada request mentah yang disimpan: setiap observasi hanya menaikkan satu
+counter per fitur (O(1)); skor drift = PSI (Population Stability Index) jendela
+terbaru terhadap referensi.
+"""
+
+import json
+import math
+import threading
+
+import numpy as np
+
+DRIFT_REFERENCE_FILE = 'drift_reference.json'
+
+# Fitur input model: (kolom X mentah, batas bawah, lebar bin, jumlah bin); di luar rentang -> bin tepi
+FEATURE_BINS = {
+    'age': (0, 0.0, 3.0, 21),         # 0-63 bulan per 3 bulan (umur 60 masih di dalam rentang)
+    'gender': (1, 0.0, 1.0, 2),       # kode gender_encoder (0/1)
+    'height': (2, 40.0, 2.5, 36)      # 40-130 cm per 2,5 cm
+}
+
+# Ambang PSI yang umum dipakai
+PSI_MODERATE = 0.1
+PSI_DRIFT = 0.25
+
+# Smoothing proporsi bin kosong agar log tidak tak terhingga
+PSI_EPSILON = 1e-4
+
+
+class DriftReference:
+    """Histogram referensi per fitur (bin 0 = di bawah rentang, bin terakhir = di atas rentang)"""
+
+    def __init__(self, features):
+        self.features = features
+
+    @classmethod
+    def from_data(cls, X_raw, feature_bins=FEATURE_BINS):
+        """Bangun referensi dari data training mentah (kolom: umur, kode gender, tinggi)"""
+        X_raw = np.asarray(X_raw, dtype=np.float64)
+        features = {}
+        for name, (column, low, width, n_bins) in feature_bins.items():
+            counts = np.zeros(n_bins + 2, dtype=np.int64)
+            np.add.at(counts, _bin_indices(X_raw[:, column], low, width, n_bins), 1)
+            features[name] = {'column': column, 'low': low, 'width': width, 'n_bins': n_bins,
+                              'counts': counts.tolist()}
+        return cls(features)
+
+    def proportions(self, name):
+        counts = np.asarray(self.features[name]['counts'], dtype=np.float64)
+        return counts / max(counts.sum(), 1.0)
+
+    def to_dict(self):
+        return {'features': self.features}
+
+    def save(self, path):
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump(self.to_dict(), f, indent=2)
+
+    @classmethod
+    def load(cls, path):
+        with open(path, 'r', encoding='utf-8') as f:
+            return cls(json.load(f)['features'])
+
+
+def _bin_indices(values, low, width, n_bins):
+    """Indeks bin vektor (NaN dibuang)"""
+    values = np.asarray(values, dtype=np.float64)
+    values = values[~np.isnan(values)]
+    return np.clip(np.floor((values - low) / width).astype(np.int64) + 1, 0, n_bins + 1)
+
+
+def population_stability_index(expected, actual, epsilon=PSI_EPSILON):
+    """PSI = Σ (a - e) · ln(a / e) pada proporsi bin"""
+    expected = np.maximum(np.asarray(expected, dtype=np.float64), epsilon)
+    actual = np.maximum(np.asarray(actual, dtype=np.float64), epsilon)
+    return float(np.sum((actual - expected) * np.log(actual / expected)))
+
+
+class DriftMonitor:
+    """
+    Monitor drift online terhadap DriftReference
+
+    Observasi masuk ke jendela berjalan berukuran `window_size`; saat penuh jendela itu
+    menjadi jendela sebelumnya dan counter baru dimulai (biaya O(jumlah bin) setiap
+    `window_size` observasi). Skor dihitung dari jendela sebelumnya + berjalan.
+    """
+
+    def __init__(self, reference, window_size=1000, min_observations=100):
+        self.reference = reference
+        self.window_size = window_size
+        self.min_observations = min_observations
+        # Spesifikasi bin sebagai tuple agar observe() tidak membaca dict
+        self._specs = [(name, spec['column'], float(spec['low']), float(spec['width']), int(spec['n_bins']))
+                       for name, spec in reference.features.items()]
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        with self._lock:
+            self._current = [[0] * (n_bins + 2) for _, _, _, _, n_bins in self._specs]
+            self._previous = None
+            self._current_count = 0
+            self.n_observed = 0
+
+    def observe(self, age_months, gender_code, height_cm):
+        """Catat satu input (dipanggil per request; biaya konstan)"""
+        values = (age_months, gender_code, height_cm)
+        with self._lock:
+            for counts, (_, column, low, width, n_bins) in zip(self._current, self._specs):
+                value = values[column]
+                if value != value:  # NaN
+                    continue
+                index = math.floor((value - low) / width) + 1
+                counts[0 if index < 0 else (n_bins + 1 if index > n_bins + 1 else index)] += 1
+            self._current_count += 1
+            self.n_observed += 1
+            if self._current_count >= self.window_size:
+                self._previous = self._current
+                self._current = [[0] * len(counts) for counts in self._current]
+                self._current_count = 0
+
+    def observe_batch(self, X_raw):
+        """Catat banyak input sekaligus (kolom: umur, kode gender, tinggi) tanpa memecah jendela"""
+        X_raw = np.asarray(X_raw, dtype=np.float64)
+        with self._lock:
+            for counts, (_, column, low, width, n_bins) in zip(self._current, self._specs):
+                batch = np.bincount(_bin_indices(X_raw[:, column], low, width, n_bins), minlength=n_bins + 2)
+                for i, n in enumerate(batch.tolist()):
+                    counts[i] += n
+            self._current_count += len(X_raw)
+            self.n_observed += len(X_raw)
+
+    def window_counts(self):
+        """Counter jendela (sebelumnya + berjalan) per fitur"""
+        with self._lock:
+            current = [list(counts) for counts in self._current]
+            previous = self._previous
+        if previous is not None:
+            current = [[a + b for a, b in zip(cur, prev)] for cur, prev in zip(current, previous)]
+        return {name: np.asarray(counts, dtype=np.float64) for (name, *_), counts in zip(self._specs, current)}
+
+    def summary(self):
+        """
+        Skor drift saat ini
+
+        Returns: Dict n_observed, n_window, psi per fitur, drift_score (PSI maksimum),
+                 status ('stabil'/'moderat'/'drift'/'data kurang') dan proporsi di luar rentang
+        """
+        counts = self.window_counts()
+        n_window = int(next(iter(counts.values())).sum()) if counts else 0
+        result = {'n_observed': self.n_observed, 'n_window': n_window, 'psi': {}, 'out_of_range': {},
+                  'drift_score': None, 'status': 'data kurang'}
+        if n_window < self.min_observations:
+            return result
+
+        for name, feature_counts in counts.items():
+            actual = feature_counts / feature_counts.sum()
+            result['psi'][name] = round(population_stability_index(self.reference.proportions(name), actual), 4)
+            result['out_of_range'][name] = round(float(actual[0] + actual[-1]), 4)
+
+        score = max(result['psi'].values())
+        result['drift_score'] = score
+        result['status'] = 'drift' if score >= PSI_DRIFT else ('moderat' if score >= PSI_MODERATE else 'stabil')
+        return result
+
+
+# Testing function
+if __name__ == "__main__":
+    import time
+
+    rng = np.random.default_rng(0)
+    age = rng.integers(0, 61, 20000)
+    train = np.column_stack([age, rng.integers(0, 2, 20000), 50 + age * 0.9 + rng.normal(0, 4, 20000)])
+    reference = DriftReference.from_data(train)
+
+    for label, age_shift in (('sama dengan training', 0), ('anak lebih tua (+24 bln)', 24)):
+        monitor = DriftMonitor(reference, window_size=1000)
+        ages = np.clip(rng.integers(0, 61, 3000) + age_shift, 0, 84)
+        heights = 50 + ages * 0.9 + rng.normal(0, 4, 3000)
+        genders = rng.integers(0, 2, 3000)
+        start = time.perf_counter()
+        for a, g, h in zip(ages.tolist(), genders.tolist(), heights.tolist()):
+            monitor.observe(a, g, h)
+        per_call_us = (time.perf_counter() - start) / 3000 * 1e6
+        summary = monitor.summary()
+        print(f"{label:<26} status={summary['status']:<8} psi={summary['psi']} ({per_call_us:.2f} µs/observe)")
@@ -1,12 +1,41 @@
 """
 Script untuk generate sample data jika data_balita.csv tidak tersedia
-Hanya untuk testing/demo purposes
+Hanya untuk testing/demo purposes (data_balita.csv yang sudah ada tidak ditimpa tanpa --force)
+
+Mode longitudinal (--longitudinal) mensimulasikan kohort anak dengan pengukuran
+bulanan berulang yang mengikuti lintasan Z-Score konsisten (termasuk onset dan
+pemulihan stunting), ditulis per chunk sehingga jutaan anak tidak perlu muat di memori:
+    python generate_sample_data.py --longitudinal 1000000 --output kohort.parquet
 """
 
+import os
+import sys
+import time
 import pandas as pd
 import numpy as np
 from datetime import datetime
 
+# Label Status Gizi dataset, urutan sama dengan kode kategori TB/U anak (HFA_LABELS)
+DATASET_STATUS = np.array(['severely stunted', 'stunted', 'normal', 'tinggi'])
+DATASET_GENDERS = np.array(['laki-laki', 'perempuan'])
+
+# Parameter default simulasi kohort (per bulan, satuan Z-Score)
+COHORT_DEFAULTS = {
+    'visits': 24,               # jumlah kunjungan bulanan berturut-turut per anak
+    'max_age': 60,              # umur maksimum pengukuran (bulan)
+    'onset_rate': 0.01,         # peluang per bulan anak sehat mulai mengalami gagal tumbuh
+    'recovery_rate': 0.04,      # peluang per bulan anak gagal tumbuh mulai pulih
+    'falter_speed': 0.12,       # penurunan Z-Score per bulan selama gagal tumbuh
+    'catchup_speed': 0.04,      # kejar tumbuh per bulan setelah pulih
+    'max_deficit': 3.0,         # batas penurunan Z-Score akibat gagal tumbuh
+    'baseline_mean': 0.0,       # sebaran Z-Score lahir
+    'baseline_sd': 1.0,
+    'tracking_sd': 0.08,        # variasi bulanan lintasan (random walk dengan mean reversion)
+    'tracking_reversion': 0.97,
+    'measurement_sd': 0.3,      # galat pengukuran tinggi (cm)
+    'missed_visit_rate': 0.1    # peluang satu kunjungan terlewat
+}
+
 def generate_sample_data(n_samples=1000):
     """
     Generate sample data untuk testing
@@ -89,8 +118,167 @@ def generate_sample_data(n_samples=1000):
     
     return df
 
-def main():
-    """Main function to generate and save sample data"""
+def simulate_cohort_chunk(n_children, rng, calculator, first_id=0, **params):
+    """
+    Simulasi lintasan pertumbuhan sekelompok anak sejak lahir
+
+    Setiap anak punya Z-Score TB/U dasar yang bergeser pelan dari bulan ke bulan.
+    Anak sehat mulai gagal tumbuh dengan peluang `onset_rate` per bulan (Z-Score turun
+    `falter_speed`/bulan) dan pulih dengan peluang `recovery_rate` per bulan (kejar
+    tumbuh `catchup_speed`/bulan). Semua anak disimulasikan bersamaan per bulan umur;
+    hanya jendela `visits` bulan per anak yang dicatat sebagai pengukuran.
+
+    Returns: (DataFrame pengukuran urut per anak lalu umur, dict jumlah transisi)
+    """
+    from z_score_calculator import classify_hfa_codes, lms_value, lms_zscore
+
+    p = {**COHORT_DEFAULTS, **params}
+    max_age, visits = p['max_age'], min(p['visits'], p['max_age'] + 1)
+    n_months = max_age + 1
+
+    sex = rng.integers(0, 2, n_children)
+    start_age = rng.integers(0, n_months - visits + 1, n_children)
+    base = rng.normal(p['baseline_mean'], p['baseline_sd'], n_children)
+
+    drift = np.zeros(n_children)
+    deficit = np.zeros(n_children)
+    faltering = np.zeros(n_children, dtype=bool)
+    zscore = np.empty((n_children, n_months))
+    stats = {'onsets': 0, 'recoveries': 0, 'months_at_risk': 0, 'months_faltering': 0}
+
+    for month in range(n_months):
+        u = rng.random(n_children)
+        onset = ~faltering & (u < p['onset_rate'])
+        recovery = faltering & (u < p['recovery_rate'])
+        stats['months_at_risk'] += int((~faltering).sum())
+        stats['months_faltering'] += int(faltering.sum())
+        stats['onsets'] += int(onset.sum())
+        stats['recoveries'] += int(recovery.sum())
+        faltering ^= onset | recovery
+
+        deficit = np.clip(deficit + np.where(faltering, p['falter_speed'], -p['catchup_speed']),
+                          0, p['max_deficit'])
+        drift = p['tracking_reversion'] * drift + rng.normal(0, p['tracking_sd'], n_children)
+        zscore[:, month] = base + drift - deficit
+
+    # Jendela kunjungan per anak, dikurangi kunjungan yang terlewat
+    ages = np.arange(n_months)
+    observed = (ages >= start_age[:, None]) & (ages < (start_age + visits)[:, None])
+    observed &= rng.random(observed.shape) >= p['missed_visit_rate']
+    child, age = np.nonzero(observed)
+
+    # Tabel LMS TB/U per jenis kelamin & umur bulat, dihitung sekali per chunk
+    lms = np.stack([np.stack(calculator.interpolate_lms_array('hfa', ages, code)) for code in range(2)])
+    L, M, S = lms[sex[child], :, age].T
+    height = lms_value(zscore[child, age], L, M, S) + rng.normal(0, p['measurement_sd'], len(child))
+    height = np.round(height, 1)
+
+    # Status dari tinggi terukur, sama seperti aplikasi (Z-Score dibulatkan 2 desimal)
+    measured_z = np.round(lms_zscore(height, L, M, S), 2)
+    codes = classify_hfa_codes(measured_z)
+
+    df = pd.DataFrame({
+        'ID Anak': first_id + child,
+        'Umur (bulan)': age,
+        'Jenis Kelamin': DATASET_GENDERS[sex[child]],
+        'Tinggi Badan (cm)': height,
+        'Status Gizi': DATASET_STATUS[codes],
+        'Z-Score TB/U': measured_z
+    })
+    return df, stats
+
+
+def iter_cohort_chunks(n_children, chunk_children=20_000, seed=42, **params):
+    """
+    Generator kohort longitudinal per chunk anak (memori sebanding ukuran chunk)
+
+    Yields: (DataFrame, dict transisi) per chunk; ID anak berlanjut antar chunk
+    """
+    from z_score_calculator import WHOZScoreCalculator
+
+    calculator = WHOZScoreCalculator()
+    rng = np.random.default_rng(seed)
+    for first_id in range(0, n_children, chunk_children):
+        yield simulate_cohort_chunk(min(chunk_children, n_children - first_id), rng, calculator,
+                                    first_id=first_id, **params)
+
+
+def generate_cohort(n_children, output_path, chunk_children=20_000, seed=42, **params):
+    """
+    Tulis kohort longitudinal ke CSV / Parquet secara streaming
+
+    Returns: Dict ringkasan (jumlah baris, distribusi status, laju onset & pemulihan teramati)
+    """
+    from batch_screener import ResultWriter
+
+    writer = ResultWriter(output_path)
+    totals = {'onsets': 0, 'recoveries': 0, 'months_at_risk': 0, 'months_faltering': 0}
+    status_counts = pd.Series(0, index=DATASET_STATUS)
+    n_rows, start = 0, time.perf_counter()
+    try:
+        for df, stats in iter_cohort_chunks(n_children, chunk_children, seed, **params):
+            writer.write(df)
+            n_rows += len(df)
+            status_counts = status_counts.add(df['Status Gizi'].value_counts(), fill_value=0)
+            for key, value in stats.items():
+                totals[key] += value
+            done = df['ID Anak'].iloc[-1] + 1 if len(df) else 0
+            print(f"   {done:,}/{n_children:,} anak | {n_rows:,} baris "
+                  f"| {n_rows / (time.perf_counter() - start):,.0f} baris/s")
+    finally:
+        writer.close()
+
+    return {
+        'children': n_children,
+        'rows': n_rows,
+        'elapsed_s': time.perf_counter() - start,
+        'status_counts': status_counts.astype(int).to_dict(),
+        'onset_rate': totals['onsets'] / max(totals['months_at_risk'], 1),
+        'recovery_rate': totals['recoveries'] / max(totals['months_faltering'], 1)
+    }
+
+
+def main_longitudinal(argv=None):
+    """Entry point mode longitudinal"""
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Generate kohort longitudinal sintetis (pengukuran bulanan)")
+    parser.add_argument('--longitudinal', type=int, required=True, metavar='N_ANAK', help="Jumlah anak")
+    parser.add_argument('--output', default='kohort_longitudinal.csv', help="Path CSV / Parquet output")
+    parser.add_argument('--chunk-children', type=int, default=20_000, help="Anak per chunk (batas memori)")
+    parser.add_argument('--seed', type=int, default=42)
+    for key in ('visits', 'max_age'):
+        parser.add_argument(f"--{key.replace('_', '-')}", type=int, default=COHORT_DEFAULTS[key])
+    for key in ('onset_rate', 'recovery_rate', 'falter_speed', 'catchup_speed', 'missed_visit_rate'):
+        parser.add_argument(f"--{key.replace('_', '-')}", type=float, default=COHORT_DEFAULTS[key])
+    args = parser.parse_args(argv)
+
+    params = {key: getattr(args, key) for key in COHORT_DEFAULTS if hasattr(args, key)}
+    print("=" * 80)
+    print("📈 LONGITUDINAL COHORT GENERATOR (SYNTHETIC)")
+    print("=" * 80)
+    summary = generate_cohort(args.longitudinal, args.output, args.chunk_children, args.seed, **params)
+
+    print(f"\n✅ {summary['children']:,} anak, {summary['rows']:,} pengukuran dalam {summary['elapsed_s']:.1f} s")
+    print(f"📊 Status Gizi: " + ", ".join(f"{k} {v / max(summary['rows'], 1):.1%}"
+                                          for k, v in summary['status_counts'].items()))
+    print(f"📉 Onset teramati {summary['onset_rate']:.4f}/bulan (target {args.onset_rate}), "
+          f"pemulihan {summary['recovery_rate']:.4f}/bulan (target {args.recovery_rate})")
+    print(f"💾 Data saved to: {args.output}")
+    return 0
+
+
+def main(output_path=None, n_samples=2000, force=False):
+    """
+    Main function to generate and save sample data
+
+    Raises: FileExistsError jika output default (data_balita.csv) sudah ada dan force=False
+    """
+    # Default: data_balita.csv di folder script ini; dataset yang sudah ada tidak ditimpa diam-diam
+    default_path = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'data_balita.csv')
+    if output_path is None and os.path.exists(default_path) and not force:
+        raise FileExistsError(f"{default_path} sudah ada; pakai --output <file> atau --force untuk menimpa")
+    output_path = output_path or default_path
     
     print("=" * 80)
     print("📊 SAMPLE DATA GENERATOR FOR STUNTING DETECTION")
@@ -99,7 +287,6 @@ def main():
     print("For real deployment, use actual clinical data.\n")
     
     # Generate data
-    n_samples = 2000
     df = generate_sample_data(n_samples)
     
     # Show statistics
@@ -119,7 +306,6 @@ def main():
     print(df['Umur (bulan)'].describe())
     
     # Save to CSV
-    output_path = r"C:\Users\muham\Project\Stunting\data_balita.csv"
     df.to_csv(output_path, index=False, encoding='utf-8')
     
     print(f"\n💾 Data saved to: {output_path}")
@@ -130,13 +316,27 @@ def main():
     
     print("\n📝 Next steps:")
     print("1. Verify the data: pandas.read_csv('data_balita.csv')")
-    print("2. Train the model: python knn_model_trainer.py")
+    print("2. Train the model: python training_pipeline.py")
     print("3. Run the app: streamlit run app.py")
     
     return df
 
 if __name__ == "__main__":
-    df = main()
+    import argparse
+    
+    if '--longitudinal' in sys.argv:
+        sys.exit(main_longitudinal())
+    
+    parser = argparse.ArgumentParser(description="Generate sample data stunting (testing/demo)")
+    parser.add_argument('--output', default=None, help="Path CSV output (default: data_balita.csv)")
+    parser.add_argument('--samples', type=int, default=2000, help="Jumlah baris")
+    parser.add_argument('--force', action='store_true', help="Timpa data_balita.csv yang sudah ada")
+    args = parser.parse_args()
+    try:
+        df = main(args.output, args.samples, args.force)
+    except FileExistsError as e:
+        print(f"❌ {e}")
+        sys.exit(1)
     
     # Display sample
     print("\n🔍 Sample data (first 10 rows):")
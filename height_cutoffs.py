@@ -0,0 +1,282 @@
+"""
+Tabel Batas Tinggi Badan (Cutoff) TB/U untuk Screening Ambang
+Tinggi badan pada -3 SD, -2 SD dan +3 SD per jenis kelamin dan umur (bulan),
+hasil inversi rumus LMS dari data WHOZScoreCalculator
+
+Klasifikasi cukup membandingkan tinggi dengan tiga cutoff (tanpa pangkat / Z-Score)
+dan identik dengan calculate_zscore + classify_nutrition_status, termasuk pembulatan
+Z-Score 2 desimal: cutoff adalah tinggi terkecil (presisi float) yang masuk kategori.
+
+Contoh:
+    python height_cutoffs.py kartu_tbu.pdf --max-age 60
+    python height_cutoffs.py cutoff_tbu.csv --max-age 228
+"""
+
+import argparse
+import math
+import os
+import sys
+
+import numpy as np
+import pandas as pd
+
+from z_score_calculator import (WHOZScoreCalculator, encode_gender, lms_value, lms_zscore,
+                                HFA_ADULT_OFFSET, HFA_UNKNOWN, hfa_labels)
+
+# Kolom cutoff: tinggi minimum agar Z-Score (dibulatkan) >= -3, >= -2 dan > +3
+CUTOFF_COLUMNS = ('sd3_neg', 'sd2_neg', 'sd3_pos')
+
+GENDERS = ('laki-laki', 'perempuan')
+
+
+def _smallest_float(predicate, lo, hi):
+    """
+    Float terkecil di (lo, hi] dengan predicate True (predicate monoton, vektor)
+
+    Bisection pada nilai float sampai lo dan hi bertetangga (selisih 1 ulp).
+    """
+    lo = np.array(lo, dtype=np.float64)
+    hi = np.array(hi, dtype=np.float64)
+    while True:
+        open_ = np.nextafter(lo, np.inf) < hi
+        if not open_.any():
+            return hi
+        mid = np.where(open_, lo + (hi - lo) / 2, lo)
+        # Midpoint bisa jatuh di lo karena pembulatan; paksa naik satu ulp
+        mid = np.where(open_ & (mid <= lo), np.nextafter(lo, np.inf), mid)
+        passed = predicate(mid)
+        hi = np.where(open_ & passed, mid, hi)
+        lo = np.where(open_ & ~passed, mid, lo)
+
+
+def rounded_zscore_thresholds(decimals=2):
+    """
+    Z-Score mentah terkecil per batas kategori setelah round(z, decimals):
+    (Z >= -3, Z >= -2, Z > +3) seperti pada classify_nutrition_status
+    """
+    checks = (
+        (-3, lambda z: np.array([round(float(v), decimals) >= -3 for v in np.atleast_1d(z)])),
+        (-2, lambda z: np.array([round(float(v), decimals) >= -2 for v in np.atleast_1d(z)])),
+        (3, lambda z: np.array([round(float(v), decimals) > 3 for v in np.atleast_1d(z)]))
+    )
+    step = 10.0 ** -decimals
+    return tuple(float(_smallest_float(check, [cut - step], [cut + step])[0]) for cut, check in checks)
+
+
+def solve_cutoffs(L, M, S, thresholds=None):
+    """
+    Tinggi cutoff untuk array L, M, S (inversi LMS lalu dipersempit ke presisi float)
+
+    Returns: Array (n, 3) tinggi minimum per batas pada CUTOFF_COLUMNS
+    """
+    thresholds = thresholds or rounded_zscore_thresholds()
+    L, M, S = (np.asarray(v, dtype=np.float64) for v in (L, M, S))
+    columns = []
+    for threshold in thresholds:
+        estimate = lms_value(threshold, L, M, S)
+        lo, hi = estimate * (1 - 1e-6), estimate * (1 + 1e-6)
+        # Kernel yang sama dengan calculate_zscore sehingga batasnya identik
+        columns.append(_smallest_float(lambda h: lms_zscore(h, L, M, S) >= threshold, lo, hi))
+    return np.column_stack(columns)
+
+
+class HeightCutoffTable:
+    """
+    Tabel cutoff TB/U per jenis kelamin dan umur bulan penuh (0 s/d akhir tabel WHO)
+
+    Pemakaian:
+        table = HeightCutoffTable()
+        codes = table.classify_codes(ages, heights, genders)   # kode HFA_LABELS
+        labels = table.classify(ages, heights, genders)
+    """
+
+    def __init__(self, calculator=None):
+        self.calculator = calculator or WHOZScoreCalculator()
+        self.max_age = int(max(self.calculator.male_data))
+        self.ages = np.arange(self.max_age + 1)
+        self.thresholds = rounded_zscore_thresholds()
+
+        self.cutoffs = np.empty((len(GENDERS), len(self.ages), len(CUTOFF_COLUMNS)))
+        for code in range(len(GENDERS)):
+            L, M, S = self.calculator.interpolate_lms_array('hfa', self.ages, code)
+            self.cutoffs[code] = solve_cutoffs(L, M, S, self.thresholds)
+        self.cutoffs.setflags(write=False)
+
+    def cutoffs_for(self, age_months, gender):
+        """
+        Cutoff untuk array umur & jenis kelamin (lookup tabel; umur pecahan dihitung langsung)
+
+        Returns: Array (n, 3)
+        """
+        age = np.atleast_1d(np.asarray(age_months, dtype=np.float64))
+        sex_code = np.broadcast_to(np.atleast_1d(encode_gender(gender)), age.shape)
+        # Di luar tabel memakai baris tepi, sama dengan interpolasi LMS yang di-clamp
+        clipped = np.clip(age, 0, self.max_age)
+        whole = clipped == np.floor(clipped)
+
+        result = np.full(age.shape + (len(CUTOFF_COLUMNS),), np.nan)
+        index = np.where(whole, clipped, 0).astype(np.intp)
+        result[whole] = self.cutoffs[sex_code[whole], index[whole]]
+        fractional = ~whole & ~np.isnan(age)
+        if fractional.any():
+            L, M, S = self.calculator.interpolate_lms_array('hfa', clipped[fractional], sex_code[fractional])
+            result[fractional] = solve_cutoffs(L, M, S, self.thresholds)
+        return result
+
+    def classify_codes(self, age_months, height_cm, gender):
+        """
+        Kode kategori TB/U (lihat HFA_LABELS) hanya dengan perbandingan tinggi
+
+        Returns: Array int8; -1 untuk tinggi/umur NaN
+        """
+        age = np.atleast_1d(np.asarray(age_months, dtype=np.float64))
+        height = np.broadcast_to(np.atleast_1d(np.asarray(height_cm, dtype=np.float64)), age.shape)
+        cutoffs = self.cutoffs_for(age, gender)
+
+        codes = (height[:, None] >= cutoffs).sum(axis=1)
+        codes = np.where(age > self.max_age, codes + HFA_ADULT_OFFSET, codes)
+        return np.where(np.isnan(height) | np.isnan(age), HFA_UNKNOWN, codes).astype(np.int8)
+
+    def classify(self, age_months, height_cm, gender):
+        """Label kategori (sama dengan classify_nutrition_status)"""
+        return hfa_labels(self.classify_codes(age_months, height_cm, gender))
+
+    def to_frame(self):
+        """Tabel cutoff presisi penuh (satu baris per jenis kelamin & umur)"""
+        frames = []
+        for code, gender in enumerate(GENDERS):
+            frame = pd.DataFrame(self.cutoffs[code], columns=list(CUTOFF_COLUMNS))
+            frame.insert(0, 'umur_bulan', self.ages)
+            frame.insert(0, 'jenis_kelamin', gender)
+            frames.append(frame)
+        return pd.concat(frames, ignore_index=True)
+
+    def card_frame(self, gender, max_age=60, resolution=0.1):
+        """
+        Isi kartu referensi untuk pengukuran dengan resolusi `resolution` cm
+
+        Nilai = kelipatan resolusi terkecil yang >= cutoff, sehingga hasil baca kartu
+        sama dengan kalkulator untuk tinggi yang dicatat pada resolusi tersebut.
+        """
+        scale = round(1 / resolution)
+        cutoffs = self.cutoffs[encode_gender(gender), :min(max_age, self.max_age) + 1]
+        steps = np.ceil(cutoffs * scale)
+        steps = np.where((steps - 1) / scale >= cutoffs, steps - 1, steps)
+        steps = np.where(steps / scale < cutoffs, steps + 1, steps)
+        card = pd.DataFrame(steps / scale, columns=list(CUTOFF_COLUMNS))
+        card.insert(0, 'umur_bulan', self.ages[:len(card)])
+        return card
+
+    def export_cards(self, output_path, max_age=60, resolution=0.1):
+        """Kartu referensi cetak: PDF (satu halaman per jenis kelamin) atau CSV"""
+        if output_path.lower().endswith('.csv'):
+            pd.concat([self.card_frame(gender, max_age, resolution).assign(jenis_kelamin=gender)
+                       for gender in GENDERS], ignore_index=True).to_csv(output_path, index=False)
+            return output_path
+
+        from reportlab.lib import colors
+        from reportlab.lib.pagesizes import A4
+        from reportlab.lib.styles import getSampleStyleSheet
+        from reportlab.lib.units import cm
+        from reportlab.platypus import PageBreak, Paragraph, SimpleDocTemplate, Spacer, Table, TableStyle
+
+        styles = getSampleStyleSheet()
+        doc = SimpleDocTemplate(output_path, pagesize=A4, topMargin=1.2*cm, bottomMargin=1.2*cm)
+        decimals = max(0, -int(math.floor(math.log10(resolution))))
+        elements = []
+        for page, gender in enumerate(GENDERS):
+            if page:
+                elements.append(PageBreak())
+            elements.append(Paragraph(f"KARTU TINGGI BADAN MENURUT UMUR - {gender.upper()}", styles['Title']))
+            elements.append(Paragraph(
+                f"Tinggi diukur dengan ketelitian {resolution:g} cm. "
+                f"<b>Sangat Pendek</b> jika TB &lt; kolom 1, <b>Pendek</b> jika TB &lt; kolom 2, "
+                f"<b>Tinggi</b> jika TB &gt;= kolom 3, selain itu Normal (Standar WHO).", styles['Normal']))
+            elements.append(Spacer(1, 0.3*cm))
+
+            card = self.card_frame(gender, max_age, resolution)
+            rows = [['Umur (bln)', 'Sangat Pendek (<)', 'Pendek (<)', 'Tinggi (>=)']]
+            rows += [[str(int(age))] + [f"{value:.{decimals}f}" for value in values]
+                     for age, *values in card.itertuples(index=False)]
+            # Dua blok berdampingan agar 0-60 bulan muat satu halaman
+            half = len(rows) // 2
+            left, right = rows[:1 + half], [rows[0]] + rows[1 + half:]
+            right += [[''] * 4] * (len(left) - len(right))
+            table = Table([l + [''] + r for l, r in zip(left, right)],
+                          colWidths=[1.6*cm, 2.8*cm, 1.7*cm, 1.7*cm, 0.3*cm, 1.6*cm, 2.8*cm, 1.7*cm, 1.7*cm],
+                          repeatRows=1)
+            table.setStyle(TableStyle([
+                ('BACKGROUND', (0, 0), (3, 0), colors.HexColor('#8FC0A9')),
+                ('BACKGROUND', (5, 0), (8, 0), colors.HexColor('#8FC0A9')),
+                ('TEXTCOLOR', (0, 0), (-1, 0), colors.whitesmoke),
+                ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
+                ('FONTSIZE', (0, 0), (-1, -1), 8),
+                ('ALIGN', (0, 0), (-1, -1), 'CENTER'),
+                ('GRID', (0, 0), (3, -1), 0.5, colors.grey),
+                ('GRID', (5, 0), (8, -1), 0.5, colors.grey),
+                ('TOPPADDING', (0, 0), (-1, -1), 1.5),
+                ('BOTTOMPADDING', (0, 0), (-1, -1), 1.5)
+            ]))
+            elements.append(table)
+        doc.build(elements)
+        return output_path
+
+
+def check_agreement(table, n_samples=20000, seed=0):
+    """
+    Bandingkan dengan calculate_zscore + classify_nutrition_status pada tinggi acak,
+    kelipatan 0,1 cm dan tepat di sekitar setiap cutoff (±1 ulp)
+
+    Returns: Jumlah kasus yang berbeda
+    """
+    calculator = table.calculator
+    rng = np.random.default_rng(seed)
+    age = rng.integers(0, table.max_age + 25, n_samples).astype(np.float64)
+    gender = np.asarray(GENDERS)[rng.integers(0, 2, n_samples)]
+    height = np.round(rng.uniform(40, 200, n_samples), 1)
+
+    # Kasus batas: setiap cutoff tabel dan tetangga float-nya
+    sex, month, column = np.meshgrid(np.arange(2), table.ages, np.arange(3), indexing='ij')
+    edges = table.cutoffs[sex, month, column].ravel()
+    for offset in (-1, 0):
+        edge_height = edges if offset == 0 else np.nextafter(edges, -np.inf)
+        age = np.concatenate([age, month.ravel().astype(np.float64)])
+        gender = np.concatenate([gender, np.asarray(GENDERS)[sex.ravel()]])
+        height = np.concatenate([height, edge_height])
+
+    expected = np.array([
+        calculator.classify_nutrition_status(*calculator.calculate_zscore(a, h, g))
+        for a, h, g in zip(age.tolist(), height.tolist(), gender.tolist())
+    ], dtype=object)
+    return int((table.classify(age, height, gender) != expected).sum())
+
+
+def main(argv=None):
+    """Entry point command line"""
+    parser = argparse.ArgumentParser(description="Tabel cutoff tinggi badan TB/U dan kartu referensi cetak")
+    parser.add_argument('output', nargs='?', default='kartu_tbu.pdf',
+                        help="File kartu (.pdf) atau tabel cutoff (.csv)")
+    parser.add_argument('--max-age', type=int, default=60, help="Umur maksimum di kartu (bulan)")
+    parser.add_argument('--resolution', type=float, default=0.1, help="Ketelitian alat ukur (cm)")
+    parser.add_argument('--full', action='store_true', help="CSV berisi cutoff presisi penuh, bukan nilai kartu")
+    parser.add_argument('--check', action='store_true', help="Verifikasi kesesuaian dengan kalkulator Z-Score")
+    args = parser.parse_args(argv)
+
+    table = HeightCutoffTable()
+    if args.check:
+        mismatches = check_agreement(table)
+        print(f"{'✅' if mismatches == 0 else '❌'} Kesesuaian dengan classify_nutrition_status: "
+              f"{mismatches} kasus berbeda")
+        if mismatches:
+            return 1
+
+    if args.full:
+        table.to_frame().to_csv(args.output, index=False)
+    else:
+        table.export_cards(args.output, max_age=args.max_age, resolution=args.resolution)
+    print(f"💾 Disimpan ke: {os.path.abspath(args.output)}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -7,11 +7,71 @@ import pandas as pd
 import numpy as np
 from sklearn.model_selection import train_test_split, cross_val_score, GridSearchCV
 from sklearn.preprocessing import LabelEncoder, StandardScaler
-from sklearn.neighbors import KNeighborsClassifier
+from sklearn.neighbors import KNeighborsClassifier, NearestNeighbors
 from sklearn.metrics import classification_report, confusion_matrix, accuracy_score
+from sklearn.base import clone
+from datetime import datetime
+from types import MappingProxyType
 import pickle
 import os
 
+from compact_knn import CompactKNNIndex, COMPACT_INDEX_DIR, COMPACT_INDEX_FILE, check_agreement, neighbor_proba
+from drift_monitor import DriftMonitor, DriftReference, DRIFT_REFERENCE_FILE
+from model_evaluation import MODEL_CARD_FILE, evaluate_predictions, load_model_card, save_model_card
+
+# Grid hyperparameter default untuk optimasi KNN
+PARAM_GRID = {
+    'n_neighbors': [3, 5, 7, 9, 11, 13, 15],
+    'weights': ['uniform', 'distance'],
+    'metric': ['euclidean', 'manhattan', 'minkowski']
+}
+
+# Ambang drift default untuk update inkremental (melewati salah satu -> optimasi ulang penuh)
+DRIFT_THRESHOLDS = {
+    'feature_shift': 0.5,   # |rata-rata fitur baru - rata-rata training| dalam satuan SD training
+    'label_shift': 0.15,    # Total variation distance distribusi label
+    'accuracy_drop': 0.05   # Penurunan akurasi model lama pada data baru vs akurasi test
+}
+
+# Input di luar distribusi: rata-rata jarak k tetangga > faktor x persentil 99 data training
+OOD_DISTANCE_FACTOR = 2.0
+
+# Jumlah titik training (acak) untuk referensi jarak tetangga leave-one-out
+DISTANCE_REFERENCE_SAMPLE = 5000
+
+# Tingkat risiko (tabel read-only bersama): batas bawah persentase risiko per level, menurun
+RISK_LEVEL_THRESHOLDS = (70, 50, 30, 0)
+RISK_LEVELS = tuple(MappingProxyType(level) for level in (
+    {
+        'level': 'SANGAT TINGGI',
+        'color': '#DC2626',
+        'message': 'Berdasarkan data training, karakteristik anak ini sangat mirip dengan anak-anak yang mengalami stunting dalam dataset.'
+    },
+    {
+        'level': 'TINGGI',
+        'color': '#F59E0B',
+        'message': 'Berdasarkan data training, anak ini memiliki karakteristik yang cukup mirip dengan anak-anak stunting dalam dataset.'
+    },
+    {
+        'level': 'SEDANG',
+        'color': '#F59E0B',
+        'message': 'Anak ini memiliki beberapa karakteristik yang perlu diperhatikan, namun masih dalam batas wajar.'
+    },
+    {
+        'level': 'RENDAH',
+        'color': '#10B981',
+        'message': 'Berdasarkan data training, karakteristik anak ini mirip dengan anak-anak yang memiliki pertumbuhan normal dalam dataset.'
+    }
+))
+
+
+def risk_level_code(risk_percentage):
+    """Indeks RISK_LEVELS untuk persentase risiko"""
+    for code, threshold in enumerate(RISK_LEVEL_THRESHOLDS):
+        if risk_percentage >= threshold:
+            return code
+    return len(RISK_LEVELS) - 1
+
 class StuntingKNNModel:
     """
     Model KNN untuk prediksi risiko stunting
@@ -24,6 +84,12 @@ class StuntingKNNModel:
         self.label_encoder = None
         self.gender_encoder = None
         self.feature_names = ['Umur (bulan)', 'Jenis Kelamin', 'Tinggi Badan (cm)']
+        self.version = None
+        self.metadata = {}
+        self.compact_index = None
+        self.search_summary = None
+        self.drift_monitor = None
+        self.model_card = None
         
     def load_and_prepare_data(self):
         """
@@ -92,22 +158,7 @@ class StuntingKNNModel:
         
         # Hyperparameter tuning
         if optimize:
-            print("\n🔍 Optimizing hyperparameters...")
-            param_grid = {
-                'n_neighbors': [3, 5, 7, 9, 11, 13, 15],
-                'weights': ['uniform', 'distance'],
-                'metric': ['euclidean', 'manhattan', 'minkowski']
-            }
-            
-            knn = KNeighborsClassifier()
-            grid_search = GridSearchCV(
-                knn, param_grid, cv=5, scoring='accuracy', n_jobs=-1, verbose=1
-            )
-            grid_search.fit(X_train_scaled, y_train)
-            
-            self.model = grid_search.best_estimator_
-            print(f"\n✅ Best parameters: {grid_search.best_params_}")
-            print(f"Best cross-validation score: {grid_search.best_score_:.4f}")
+            self.model = self._grid_search(X_train_scaled, y_train)
         else:
             # Default parameters
             self.model = KNeighborsClassifier(n_neighbors=5, weights='distance')
@@ -116,6 +167,7 @@ class StuntingKNNModel:
         # Evaluation
         y_pred = self.model.predict(X_test_scaled)
         accuracy = accuracy_score(y_test, y_pred)
+        train_accuracy = accuracy_score(y_train, self.model.predict(X_train_scaled))
         
         print(f"\n📈 Model Performance:")
         print(f"Accuracy: {accuracy:.4f}")
@@ -131,12 +183,352 @@ class StuntingKNNModel:
         print(f"\nCross-validation scores: {cv_scores}")
         print(f"Mean CV score: {cv_scores.mean():.4f} (+/- {cv_scores.std() * 2:.4f})")
         
+        self.version = self._next_version()
+        
+        # Evaluasi per kelas & kelompok umur untuk model card
+        evaluation = evaluate_predictions(y_test, y_pred, self.model.predict_proba(X_test_scaled), X_test[:, 0],
+                                          list(self.label_encoder.classes_))
+        evaluation['model_version'] = self.version
+        self.metadata = {
+            'version': self.version,
+            'train_date': datetime.now().strftime('%Y-%m-%d %H:%M:%S'),
+            'train_accuracy': float(train_accuracy),
+            'test_accuracy': float(accuracy),
+            'cv_mean': float(cv_scores.mean()),
+            'cv_std': float(cv_scores.std()),
+            'best_params': {key: self.model.get_params()[key] for key in PARAM_GRID},
+            'feature_names': ['Umur (bulan)', 'Jenis Kelamin Encoded', 'Tinggi Badan (cm)'],
+            'target_classes': list(self.label_encoder.classes_),
+            'n_train_samples': int(X_train.shape[0]),
+            'n_test_samples': int(X_test.shape[0]),
+            'search': self.search_summary if optimize else None,
+            'evaluation': evaluation,
+            'update_history': []
+        }
+        
+        # Indeks ringkas dicek terhadap model float64 pada test set
+        self.build_compact_index(X_check=X_test_scaled)
+        self.build_drift_reference(X_train)
+        self.build_distance_reference()
+        
         return {
             'accuracy': accuracy,
             'cv_mean': cv_scores.mean(),
             'cv_std': cv_scores.std()
         }
     
+    def _next_version(self):
+        """
+        Label versi model berbasis waktu (unik terhadap versi saat ini)
+        """
+        version = datetime.now().strftime('v%Y%m%d_%H%M%S')
+        suffix = 1
+        candidate = version
+        while candidate == self.version or any(
+            update.get('version') == candidate for update in self.metadata.get('update_history', [])
+        ):
+            suffix += 1
+            candidate = f"{version}_{suffix}"
+        return candidate
+    
+    def _grid_search(self, X_train_scaled, y_train, param_grid=None, cv=5):
+        """
+        Grid search hyperparameter KNN (k-fold CV), mengembalikan estimator terbaik
+        
+        Ringkasan pencarian (skor terbaik & kandidat teratas) disimpan di self.search_summary
+        """
+        print("\n🔍 Optimizing hyperparameters...")
+        knn = KNeighborsClassifier()
+        grid_search = GridSearchCV(
+            knn, param_grid or PARAM_GRID, cv=cv, scoring='accuracy', n_jobs=-1, verbose=1
+        )
+        grid_search.fit(X_train_scaled, y_train)
+        
+        results = grid_search.cv_results_
+        top = np.argsort(results['rank_test_score'], kind='stable')[:10]
+        self.search_summary = {
+            'param_grid': param_grid or PARAM_GRID,
+            'cv': cv,
+            'best_score': float(grid_search.best_score_),
+            'n_candidates': len(results['params']),
+            'top_candidates': [
+                {'params': results['params'][i], 'mean_score': float(results['mean_test_score'][i]),
+                 'std_score': float(results['std_test_score'][i])}
+                for i in top
+            ]
+        }
+        
+        print(f"\n✅ Best parameters: {grid_search.best_params_}")
+        print(f"Best cross-validation score: {grid_search.best_score_:.4f}")
+        return grid_search.best_estimator_
+    
+    def build_compact_index(self, precision='float32', X_check=None):
+        """
+        Bangun indeks KNN ringkas (float32/int16, jenis kelamin sebagai partisi)
+        
+        Parameters:
+        - precision: 'float32' atau 'int16' (fixed-point)
+        - X_check: Data scaled untuk membandingkan label dengan model float64 (opsional)
+        
+        Returns: Dict hasil pengecekan (None jika X_check tidak diberikan)
+        """
+        self.compact_index = CompactKNNIndex.from_model(self.model, precision=precision)
+        report = None
+        if X_check is not None:
+            report = check_agreement(self.compact_index, self.model, X_check)
+            print(f"\n📦 Compact index ({precision}): {self.compact_index.nbytes / 1024:,.0f} KB, "
+                  f"kesesuaian label {report['agreement']:.4%} "
+                  f"({report['n_mismatch']} beda, {report['n_tie_mismatch']} karena jarak tetangga sama)")
+        self.metadata['compact_index'] = {'precision': precision, 'nbytes': self.compact_index.nbytes,
+                                          'check': report}
+        return report
+    
+    def build_drift_reference(self, X_raw=None):
+        """
+        Histogram referensi input (umur, gender, tinggi) untuk monitor drift online
+        
+        X_raw: Data training mentah (default: diambil kembali dari model)
+        """
+        if X_raw is None:
+            X_raw, _ = self.get_training_data()
+        self.drift_monitor = DriftMonitor(DriftReference.from_data(X_raw))
+        return self.drift_monitor
+    
+    def build_distance_reference(self, sample_size=DISTANCE_REFERENCE_SAMPLE, random_state=42):
+        """
+        Sebaran rata-rata jarak ke k tetangga untuk titik training (leave-one-out, ruang scaled)
+        
+        Disimpan di metadata['neighbor_distance'] sebagai acuan skor keyakinan dan flag OOD.
+        """
+        if self.model is not None:
+            X_scaled, nn = self.model._fit_X, self.model
+            k = self.model.n_neighbors
+        else:
+            X_scaled, _ = self.compact_index.training_data()
+            k = self.compact_index.n_neighbors
+            nn = NearestNeighbors(p=self.compact_index.p).fit(X_scaled)
+        
+        rng = np.random.default_rng(random_state)
+        sample = rng.choice(len(X_scaled), min(sample_size, len(X_scaled)), replace=False)
+        # k + 1 tetangga lalu buang yang pertama (titik itu sendiri atau duplikatnya, jarak 0)
+        distances, _ = nn.kneighbors(X_scaled[sample], n_neighbors=k + 1)
+        mean_distance = distances[:, 1:].mean(axis=1)
+        
+        p50, p95, p99 = np.quantile(mean_distance, [0.5, 0.95, 0.99])
+        self.metadata['neighbor_distance'] = {
+            'k': int(k),
+            'n_sample': int(len(sample)),
+            'p50': float(p50),
+            'p95': float(p95),
+            'p99': float(p99),
+            'max': float(mean_distance.max()),
+            'ood_threshold': float(p99 * OOD_DISTANCE_FACTOR)
+        }
+        return self.metadata['neighbor_distance']
+    
+    def _kneighbors_scaled(self, X_scaled):
+        """Satu query tetangga dari indeks ringkas jika ada, selain itu dari model sklearn"""
+        if self.compact_index is not None:
+            return self.compact_index.kneighbors(X_scaled)
+        return self.model.kneighbors(X_scaled)
+    
+    def _neighbor_labels(self, indices):
+        if self.compact_index is not None:
+            return self.compact_index.labels[indices]
+        return self.model._y[indices]
+    
+    def _predict_proba_scaled(self, X_scaled):
+        """Probabilitas kelas dari indeks ringkas jika ada, selain itu dari model sklearn"""
+        if self.compact_index is not None:
+            return self.compact_index.predict_proba(X_scaled)
+        return self.model.predict_proba(X_scaled)
+    
+    def _query(self, X_scaled):
+        """
+        Probabilitas beserta jarak tetangga, skor keyakinan dan flag di luar distribusi
+        dari satu query tetangga yang sama
+        
+        Returns: (probabilities, distances, indices, confidence, out_of_distribution)
+        """
+        distances, indices = self._kneighbors_scaled(X_scaled)
+        weights = self.compact_index.weights if self.compact_index is not None else self.model.weights
+        probabilities = neighbor_proba(distances, self._neighbor_labels(indices),
+                                       len(self.label_encoder.classes_), weights)
+        
+        reference = self.metadata.get('neighbor_distance') or self.build_distance_reference()
+        mean_distance = distances.mean(axis=1)
+        # Keyakinan = suara kelas teratas, diturunkan jika tetangga lebih jauh dari biasanya (p95 training)
+        support = np.minimum(1.0, reference['p95'] / np.maximum(mean_distance, 1e-12))
+        confidence = probabilities.max(axis=1) * support
+        out_of_distribution = mean_distance > reference['ood_threshold']
+        return probabilities, distances, indices, confidence, out_of_distribution
+    
+    def neighbor_rows(self, distances, indices):
+        """
+        Data training tetangga (satuan asli) untuk panel penjelasan
+        
+        Returns: List dict age_months, gender, height_cm, label, distance
+        """
+        if self.compact_index is not None:
+            X_scaled, labels = self.compact_index.rows(indices)
+        else:
+            X_scaled, labels = self.model._fit_X[indices], self.model._y[indices]
+        X_raw = self.scaler.inverse_transform(X_scaled)
+        genders = self.gender_encoder.inverse_transform(np.rint(X_raw[:, 1]).astype(int))
+        classes = self.label_encoder.classes_
+        return [
+            {
+                'age_months': round(float(age), 1),
+                'gender': gender,
+                'height_cm': round(float(height), 1),
+                'label': classes[label],
+                'distance': round(float(distance), 4)
+            }
+            for (age, _, height), gender, label, distance in zip(X_raw, genders, labels, distances)
+        ]
+    
+    def get_training_data(self):
+        """
+        Ambil kembali data training dari model KNN yang sudah di-fit
+        
+        Returns: (X_raw, y_encoded) dengan X_raw dalam satuan asli (sebelum scaling)
+        """
+        if self.model is None:
+            X_scaled, y_index = self.compact_index.training_data()
+            return self.scaler.inverse_transform(X_scaled), self.compact_index.classes[y_index]
+        X_scaled = self.model._fit_X
+        y_encoded = self.model.classes_[self.model._y]
+        return self.scaler.inverse_transform(X_scaled), y_encoded
+    
+    def compute_drift(self, X_new, y_new):
+        """
+        Metrik drift data berlabel baru terhadap data training model saat ini
+        
+        Returns:
+        - feature_shift: Pergeseran rata-rata fitur terbesar (satuan SD training)
+        - label_shift: Total variation distance distribusi label
+        - accuracy_drop: Akurasi test saat training dikurangi akurasi model lama pada data baru
+        """
+        X_train, y_train = self.get_training_data()
+        train_std = X_train.std(axis=0)
+        train_std[train_std == 0] = 1.0
+        feature_shift = np.abs(X_new.mean(axis=0) - X_train.mean(axis=0)) / train_std
+        
+        n_classes = len(self.label_encoder.classes_)
+        p_train = np.bincount(y_train, minlength=n_classes) / len(y_train)
+        p_new = np.bincount(y_new, minlength=n_classes) / len(y_new)
+        label_shift = 0.5 * np.abs(p_train - p_new).sum()
+        
+        classes = self.model.classes_ if self.model is not None else self.compact_index.classes
+        probabilities = self._predict_proba_scaled(self.scaler.transform(X_new))
+        new_accuracy = accuracy_score(y_new, classes[probabilities.argmax(axis=1)])
+        baseline_accuracy = self.metadata.get('test_accuracy', new_accuracy)
+        
+        return {
+            'feature_shift': float(feature_shift.max()),
+            'label_shift': float(label_shift),
+            'accuracy_drop': float(baseline_accuracy - new_accuracy),
+            'new_data_accuracy': float(new_accuracy)
+        }
+    
+    def update_model(self, new_data, scaler_mode='frozen', drift_thresholds=None, reoptimize_on_drift=True):
+        """
+        Tambahkan data berlabel baru ke model yang sudah di-fit tanpa training ulang penuh
+        
+        Data training lama diambil dari model itu sendiri (tanpa membaca ulang CSV),
+        data baru di-encode dengan encoder yang sama, lalu indeks KNN dibangun ulang
+        dengan hyperparameter yang sama. Grid search hanya dijalankan ulang jika
+        metrik drift melewati ambang.
+        
+        Parameters:
+        - new_data: Path CSV atau DataFrame dengan kolom seperti data_balita.csv
+        - scaler_mode: 'frozen' (scaler tetap) atau 'streaming' (partial_fit statistik scaler)
+        - drift_thresholds: Dict ambang drift (default: DRIFT_THRESHOLDS)
+        - reoptimize_on_drift: Jalankan grid search ulang jika drift terdeteksi
+        
+        Returns: Dict metrik drift, aksi yang diambil dan versi model baru
+        """
+        if self.model is None:
+            raise ValueError("Model belum di-training atau di-load (mode compact tidak bisa di-update)")
+        if scaler_mode not in ('frozen', 'streaming'):
+            raise ValueError("scaler_mode harus 'frozen' atau 'streaming'")
+        
+        df_new = pd.read_csv(new_data) if isinstance(new_data, str) else new_data.copy()
+        df_new = df_new.dropna(subset=['Umur (bulan)', 'Jenis Kelamin', 'Tinggi Badan (cm)', 'Status Gizi'])
+        
+        # Encode dengan encoder yang sudah ada (label baru yang tidak dikenal -> ValueError)
+        X_new = np.column_stack([
+            df_new['Umur (bulan)'].to_numpy(dtype=np.float64),
+            self.gender_encoder.transform(df_new['Jenis Kelamin'].str.lower()),
+            df_new['Tinggi Badan (cm)'].to_numpy(dtype=np.float64)
+        ])
+        y_new = self.label_encoder.transform(df_new['Status Gizi'].str.lower())
+        
+        thresholds = {**DRIFT_THRESHOLDS, **(drift_thresholds or {})}
+        drift = self.compute_drift(X_new, y_new)
+        drifted = [name for name, limit in thresholds.items() if drift[name] > limit]
+        
+        print(f"\n📊 Drift metrics: {drift}")
+        
+        X_old, y_old = self.get_training_data()
+        X_all = np.vstack([X_old, X_new])
+        y_all = np.concatenate([y_old, y_new])
+        
+        if drifted and reoptimize_on_drift:
+            print(f"⚠️ Drift terdeteksi ({', '.join(drifted)}), optimasi ulang penuh...")
+            self.scaler = StandardScaler().fit(X_all)
+            self.model = self._grid_search(self.scaler.transform(X_all), y_all)
+            action = 'reoptimized'
+        else:
+            if scaler_mode == 'streaming':
+                # Statistik scaler diperbarui dengan data baru (mean/var gabungan),
+                # data lama di-scale ulang dari nilai aslinya
+                self.scaler.partial_fit(X_new)
+                X_all_scaled = self.scaler.transform(X_all)
+            else:
+                X_all_scaled = np.vstack([self.model._fit_X, self.scaler.transform(X_new)])
+            
+            self.model = clone(self.model).fit(X_all_scaled, y_all)
+            action = 'appended'
+        
+        previous_version = self.version
+        self.version = self._next_version()
+        update_info = {
+            'version': self.version,
+            'previous_version': previous_version,
+            'update_date': datetime.now().strftime('%Y-%m-%d %H:%M:%S'),
+            'n_new_samples': len(y_new),
+            'scaler_mode': scaler_mode,
+            'action': action,
+            'drift': drift,
+            'drifted_metrics': drifted
+        }
+        self.metadata.setdefault('update_history', []).append(update_info)
+        self.metadata['version'] = self.version
+        self.metadata['n_train_samples'] = len(y_all)
+        self.metadata['best_params'] = {key: self.model.get_params()[key] for key in PARAM_GRID}
+        
+        # Indeks ringkas lama tidak lagi sesuai dengan data training gabungan
+        if self.compact_index is not None:
+            self.build_compact_index(self.compact_index.precision, X_check=self.scaler.transform(X_new))
+        self.build_drift_reference(X_all)
+        self.build_distance_reference()
+        
+        print(f"✅ Model updated ({action}): {len(y_old)} + {len(y_new)} = {len(y_all)} samples, version {self.version}")
+        return update_info
+    
+    def save_model_version(self, models_root):
+        """
+        Simpan model sebagai versi baru di models_root/versions/<versi>/
+        
+        Returns: Path folder versi
+        """
+        if self.version is None:
+            self.version = self._next_version()
+        version_dir = os.path.join(models_root, 'versions', self.version)
+        self.save_model(version_dir)
+        return version_dir
+    
     def save_model(self, model_dir):
         """
         Save model, scaler, dan encoders
@@ -161,21 +553,59 @@ class StuntingKNNModel:
                 'label_encoder': self.label_encoder
             }, f)
         
+        # Save metadata
+        metadata_path = os.path.join(model_dir, 'model_metadata.pkl')
+        with open(metadata_path, 'wb') as f:
+            pickle.dump(self.metadata, f)
+        
+        # Save compact index (opsional)
+        if self.compact_index is not None:
+            self.compact_index.save(os.path.join(model_dir, COMPACT_INDEX_FILE))
+        
+        # Histogram referensi untuk monitor drift input
+        if self.drift_monitor is not None:
+            self.drift_monitor.reference.save(os.path.join(model_dir, DRIFT_REFERENCE_FILE))
+        
+        # Model card (dibaca aplikasi apa adanya, tanpa menghitung ulang)
+        card_path = save_model_card(self.metadata, model_dir)
+        if card_path:
+            self.model_card = load_model_card(model_dir)
+        
         print(f"\n💾 Model saved to {model_dir}")
         print(f"   - knn_model.pkl")
         print(f"   - scaler.pkl")
         print(f"   - encoders.pkl")
+        print(f"   - model_metadata.pkl")
+        if self.compact_index is not None:
+            print(f"   - {COMPACT_INDEX_FILE}")
+        if self.drift_monitor is not None:
+            print(f"   - {DRIFT_REFERENCE_FILE}")
+        if card_path:
+            print(f"   - {MODEL_CARD_FILE}")
     
-    def load_model(self, model_dir):
+    def load_model(self, model_dir, compact=False):
         """
         Load saved model
+        
+        compact=True: pakai indeks ringkas tanpa memuat model sklearn float64; folder
+        compact_index/ (array di-mmap, dibagi antar proses) didahulukan dari compact_index.npz
         """
         model_path = os.path.join(model_dir, 'knn_model.pkl')
         scaler_path = os.path.join(model_dir, 'scaler.pkl')
         encoders_path = os.path.join(model_dir, 'encoders.pkl')
-        
-        with open(model_path, 'rb') as f:
-            self.model = pickle.load(f)
+        compact_path = os.path.join(model_dir, COMPACT_INDEX_FILE)
+        compact_dir = os.path.join(model_dir, COMPACT_INDEX_DIR)
+        
+        if compact and os.path.isdir(compact_dir):
+            self.compact_index = CompactKNNIndex.load_mapped(compact_dir)
+            self.model = None
+        elif compact and os.path.exists(compact_path):
+            self.compact_index = CompactKNNIndex.load(compact_path)
+            self.model = None
+        else:
+            self.compact_index = None
+            with open(model_path, 'rb') as f:
+                self.model = pickle.load(f)
         
         with open(scaler_path, 'rb') as f:
             self.scaler = pickle.load(f)
@@ -185,9 +615,30 @@ class StuntingKNNModel:
             self.gender_encoder = encoders['gender_encoder']
             self.label_encoder = encoders['label_encoder']
         
+        # Metadata opsional (model lama mungkin belum punya)
+        metadata_path = os.path.join(model_dir, 'model_metadata.pkl')
+        if os.path.exists(metadata_path):
+            with open(metadata_path, 'rb') as f:
+                self.metadata = pickle.load(f)
+            self.version = self.metadata.get('version', self.metadata.get('train_date'))
+        
+        # Referensi drift: file dari training, atau dibangun dari data training model lama
+        reference_path = os.path.join(model_dir, DRIFT_REFERENCE_FILE)
+        if os.path.exists(reference_path):
+            self.drift_monitor = DriftMonitor(DriftReference.load(reference_path))
+        else:
+            self.build_drift_reference()
+        
+        self.model_card = load_model_card(model_dir)
+        
+        # Referensi jarak tetangga (model lama belum menyimpannya di metadata): dihitung di
+        # memori saja, file model tidak diubah saat load
+        if 'neighbor_distance' not in self.metadata:
+            self.build_distance_reference()
+        
         print("✅ Model loaded successfully")
     
-    def predict(self, age_months, gender, height_cm):
+    def predict(self, age_months, gender, height_cm, return_neighbors=False):
         """
         Prediksi status gizi untuk input baru
         
@@ -195,6 +646,11 @@ class StuntingKNNModel:
         - prediction: Status gizi prediksi
         - probability: Probabilitas untuk setiap kelas
         - risk_percentage: Persentase risiko stunting
+        - neighbor_distances: Jarak (ruang scaled) ke k tetangga, terurut
+        - confidence: Skor keyakinan 0-1 (suara kelas teratas x kedekatan tetangga)
+        - out_of_distribution: True jika tetangga terdekat terlalu jauh dari data training
+        - neighbor_indices: Indeks baris training tetangga (untuk neighbor_rows)
+        - neighbors: Data tetangga (hanya jika return_neighbors=True)
         """
         # Normalize gender to lowercase to match dataset format
         gender = gender.lower()
@@ -206,81 +662,86 @@ class StuntingKNNModel:
         X_input = np.array([[age_months, gender_encoded, height_cm]])
         X_input_scaled = self.scaler.transform(X_input)
         
-        # Predict
-        prediction_encoded = self.model.predict(X_input_scaled)[0]
-        prediction = self.label_encoder.inverse_transform([prediction_encoded])[0]
+        # Monitor drift input (hanya counter histogram, tanpa menyimpan input)
+        if self.drift_monitor is not None:
+            self.drift_monitor.observe(age_months, gender_encoded, height_cm)
+        
+        # Predict (probabilitas & reliabilitas dari satu query tetangga)
+        probabilities, distances, indices, confidence, out_of_distribution = self._query(X_input_scaled)
+        probabilities = probabilities[0]
+        prediction = self.label_encoder.classes_[probabilities.argmax()]
         
         # Get probabilities
-        probabilities = self.model.predict_proba(X_input_scaled)[0]
         prob_dict = dict(zip(self.label_encoder.classes_, probabilities))
         
         # Calculate stunting risk (severely stunted + stunted)
         risk_classes = ['severely stunted', 'stunted']
         risk_percentage = sum([prob_dict.get(cls, 0) for cls in risk_classes]) * 100
         
-        return {
+        result = {
             'prediction': prediction,
             'probabilities': prob_dict,
-            'risk_percentage': round(risk_percentage, 2)
+            'risk_percentage': round(risk_percentage, 2),
+            'neighbor_distances': [round(float(d), 4) for d in distances[0]],
+            'confidence': round(float(confidence[0]), 4),
+            'out_of_distribution': bool(out_of_distribution[0]),
+            'neighbor_indices': indices[0]
+        }
+        if return_neighbors:
+            result['neighbors'] = self.neighbor_rows(distances[0], indices[0])
+        return result
+    
+    def predict_batch(self, age_months, gender, height_cm):
+        """
+        Prediksi status gizi untuk banyak anak sekaligus (satu query KNN vektor)
+        
+        Parameters:
+        - age_months, gender, height_cm: Array dengan panjang sama
+        
+        Returns:
+        - prediction: Array status gizi prediksi
+        - probabilities: Array (n_sampel, n_kelas) sesuai urutan label_encoder.classes_
+        - risk_percentage: Array persentase risiko stunting
+        - mean_distance: Array rata-rata jarak ke k tetangga
+        - confidence: Array skor keyakinan 0-1
+        - out_of_distribution: Array boolean input di luar distribusi data training
+        """
+        gender = np.char.lower(np.asarray(gender, dtype=str))
+        gender_encoded = self.gender_encoder.transform(gender)
+        
+        X_input = np.column_stack([
+            np.asarray(age_months, dtype=np.float64),
+            gender_encoded,
+            np.asarray(height_cm, dtype=np.float64)
+        ])
+        X_input_scaled = self.scaler.transform(X_input)
+        
+        probabilities, distances, _, confidence, out_of_distribution = self._query(X_input_scaled)
+        prediction = self.label_encoder.classes_[probabilities.argmax(axis=1)]
+        
+        # Calculate stunting risk (severely stunted + stunted)
+        risk_mask = np.isin(self.label_encoder.classes_, ['severely stunted', 'stunted'])
+        risk_percentage = np.round(probabilities[:, risk_mask].sum(axis=1) * 100, 2)
+        
+        return {
+            'prediction': prediction,
+            'probabilities': probabilities,
+            'risk_percentage': risk_percentage,
+            'mean_distance': distances.mean(axis=1),
+            'confidence': np.round(confidence, 4),
+            'out_of_distribution': out_of_distribution
         }
     
     def get_risk_interpretation(self, risk_percentage):
         """
-        Interpretasi persentase risiko
+        Interpretasi persentase risiko (dict read-only dari RISK_LEVELS)
         """
-        if risk_percentage >= 70:
-            return {
-                'level': 'SANGAT TINGGI',
-                'color': '#DC2626',
-                'message': 'Berdasarkan data training, karakteristik anak ini sangat mirip dengan anak-anak yang mengalami stunting dalam dataset.'
-            }
-        elif risk_percentage >= 50:
-            return {
-                'level': 'TINGGI',
-                'color': '#F59E0B',
-                'message': 'Berdasarkan data training, anak ini memiliki karakteristik yang cukup mirip dengan anak-anak stunting dalam dataset.'
-            }
-        elif risk_percentage >= 30:
-            return {
-                'level': 'SEDANG',
-                'color': '#F59E0B',
-                'message': 'Anak ini memiliki beberapa karakteristik yang perlu diperhatikan, namun masih dalam batas wajar.'
-            }
-        else:
-            return {
-                'level': 'RENDAH',
-                'color': '#10B981',
-                'message': 'Berdasarkan data training, karakteristik anak ini mirip dengan anak-anak yang memiliki pertumbuhan normal dalam dataset.'
-            }
+        return RISK_LEVELS[risk_level_code(risk_percentage)]
 
 
-# Main execution
+# Main execution: pipeline training dengan cache per tahap (lihat training_pipeline.py)
 if __name__ == "__main__":
-    # Path configuration
-    DATA_PATH = r"C:\Users\muham\Project\Stunting\data_balita.csv"
-    MODEL_DIR = r"C:\Users\muham\Project\Stunting\models"
-    
-    # Initialize and train model
-    print("=" * 80)
-    print("🚀 TRAINING KNN MODEL UNTUK DETEKSI STUNTING")
-    print("=" * 80)
-    
-    knn_model = StuntingKNNModel(DATA_PATH)
-    
-    # Train with optimization
-    metrics = knn_model.train_model(optimize=True)
-    
-    # Save model
-    knn_model.save_model(MODEL_DIR)
-    
-    print("\n" + "=" * 80)
-    print("✅ TRAINING COMPLETED")
-    print("=" * 80)
+    import sys
+    from training_pipeline import main
     
-    # Test prediction
-    print("\n📝 Testing prediction...")
-    result = knn_model.predict(24, 'laki-laki', 80)
-    print(f"\nTest Input: Umur=24 bulan, Gender=laki-laki, TB=80cm")
-    print(f"Prediction: {result['prediction']}")
-    print(f"Risk Percentage: {result['risk_percentage']}%")
-    print(f"Probabilities: {result['probabilities']}")
\ No newline at end of file
+    sys.exit(main())
@@ -0,0 +1,283 @@
+"""
+Load Test Sesi Streamlit Bersamaan
+Menjalankan app.py secara headless dengan streamlit.testing (AppTest): setiap sesi
+virtual menjalankan alur nyata petugas (dashboard -> halaman deteksi -> isi data &
+analisis -> download PDF) berulang kali, N sesi sekaligus dalam satu proses seperti
+server Streamlit (satu thread script per sesi, cache_resource dipakai bersama)
+
+Melaporkan throughput, latensi p50/p95/p99 per langkah dan pertumbuhan RSS proses.
+Semua berjalan lokal tanpa layanan eksternal.
+
+Contoh:
+    python load_test.py --sessions 1,4,8,16 --iterations 5
+    python load_test.py --sessions 8 --duration 60 --trace
+"""
+
+import argparse
+import json
+import os
+import sys
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date, datetime, timedelta
+
+import numpy as np
+
+from benchmark import DEFAULT_RESULTS_DIR, summarize
+from metrics import process_rss_bytes
+
+CURRENT_DIR = os.path.dirname(os.path.abspath(__file__))
+APP_PATH = os.path.join(CURRENT_DIR, 'app.py')
+
+# Langkah satu alur petugas (urutan eksekusi)
+STEPS = ('dashboard', 'open_detection', 'analyze', 'download_pdf')
+
+
+class RSSSampler:
+    """Sampling RSS proses di background thread"""
+
+    def __init__(self, interval=0.1):
+        self.interval = interval
+        self.samples = []
+        self._stop_event = threading.Event()
+        self._thread = None
+
+    def __enter__(self):
+        self.samples.append(process_rss_bytes() or 0)
+        self._thread = threading.Thread(target=self._run, name='rss-sampler', daemon=True)
+        self._thread.start()
+        return self
+
+    def _run(self):
+        while not self._stop_event.wait(self.interval):
+            self.samples.append(process_rss_bytes() or 0)
+
+    def __exit__(self, *exc):
+        self._stop_event.set()
+        self._thread.join()
+        self.samples.append(process_rss_bytes() or 0)
+        return False
+
+    def summary(self):
+        mb = np.asarray(self.samples, dtype=np.float64) / (1024 * 1024)
+        return {
+            'start_mb': float(mb[0]),
+            'end_mb': float(mb[-1]),
+            'peak_mb': float(mb.max()),
+            'growth_mb': float(mb[-1] - mb[0])
+        }
+
+
+def _button(at, label):
+    for button in list(at.sidebar.button) + list(at.button):
+        if label in button.label:
+            return button
+    raise LookupError(f"Tombol '{label}' tidak ditemukan")
+
+
+def _check(at, step):
+    if at.exception:
+        raise RuntimeError(f"{step}: {at.exception[0].value}")
+
+
+def _pdf_ready(at):
+    return any('Download Laporan PDF' in button.label for button in at.get('download_button'))
+
+
+def _wait_pdf(at, pdf_timeout, poll_interval=0.25):
+    """Rerun (seperti polling fragment di browser) sampai tombol download PDF muncul"""
+    deadline = time.perf_counter() + pdf_timeout
+    at.run()
+    while not _pdf_ready(at):
+        _check(at, 'download_pdf')
+        if time.perf_counter() >= deadline:
+            raise RuntimeError(f"download_pdf: laporan PDF tidak tersedia dalam {pdf_timeout:g} detik")
+        time.sleep(poll_interval)
+        at.run()
+
+
+def run_flow(at, rng, child_id=None, first=False, pdf_timeout=30):
+    """
+    Satu alur petugas pada sesi AppTest
+
+    Returns: Dict durasi (ms) per langkah
+    """
+    timings = {}
+
+    def timed(step, action):
+        start = time.perf_counter()
+        action()
+        timings[step] = (time.perf_counter() - start) * 1000
+        _check(at, step)
+
+    # 1. Dashboard (buka aplikasi pertama kali / navigasi ulang dari sidebar)
+    if first:
+        timed('dashboard', at.run)
+    else:
+        timed('dashboard', lambda: _button(at, 'Dashboard').click().run())
+
+    # 2. Buka halaman deteksi dari sidebar
+    timed('open_detection', lambda: _button(at, 'Deteksi Stunting').click().run())
+
+    # 3. Isi data anak lalu analisis
+    age_days = int(rng.integers(30, 60 * 30))
+    at.radio[0].set_value('laki-laki' if rng.random() < 0.5 else 'perempuan')
+    at.date_input[0].set_value(date.today() - timedelta(days=age_days))
+    at.number_input[0].set_value(round(float(np.clip(rng.normal(45 + age_days / 30 * 1.1, 4), 40, 200)), 1))
+    at.number_input[1].set_value(round(float(np.clip(rng.normal(3 + age_days / 30 * 0.2, 1), 2, 50)), 1))
+    if child_id:
+        at.text_input[1].set_value(child_id)
+    timed('analyze', lambda: _button(at, 'Analisis Sekarang').click().run())
+    if at.session_state['detection_result'] is None:
+        raise RuntimeError("analyze: hasil deteksi kosong")
+
+    # 4. Tunggu laporan PDF dari antrean tugas background sampai tombol download muncul
+    timed('download_pdf', lambda: _wait_pdf(at, pdf_timeout))
+    return timings
+
+
+def run_session(session_index, iterations, deadline, seed, use_registry, timeout, pdf_timeout=30):
+    """Sesi virtual: alur berulang sampai `iterations` atau `deadline` tercapai"""
+    from streamlit.testing.v1 import AppTest
+
+    rng = np.random.default_rng(seed + session_index)
+    at = AppTest.from_file(APP_PATH, default_timeout=timeout)
+    flows, errors = [], []
+    n, first = 0, True
+    while (iterations is None or n < iterations) and (deadline is None or time.perf_counter() < deadline):
+        child_id = f"LOAD-{session_index:03d}-{n:04d}" if use_registry else None
+        start = time.perf_counter()
+        try:
+            timings = run_flow(at, rng, child_id, first, pdf_timeout)
+            first = False
+            timings['flow'] = (time.perf_counter() - start) * 1000
+            flows.append(timings)
+        except Exception as e:
+            errors.append(f"sesi {session_index}: {e}")
+            # Sesi baru agar error tidak terbawa ke alur berikutnya
+            at = AppTest.from_file(APP_PATH, default_timeout=timeout)
+            first = True
+        n += 1
+    return flows, errors
+
+
+def run_load(n_sessions, iterations=None, duration=None, seed=42, use_registry=True, timeout=60,
+             pdf_timeout=30):
+    """
+    Jalankan N sesi bersamaan
+
+    Returns: Dict ringkasan (throughput, latensi per langkah, RSS, error)
+    """
+    deadline = time.perf_counter() + duration if duration else None
+    with RSSSampler() as rss, ThreadPoolExecutor(max_workers=n_sessions, thread_name_prefix='session') as pool:
+        start = time.perf_counter()
+        futures = [
+            pool.submit(run_session, i, iterations, deadline, seed, use_registry, timeout, pdf_timeout)
+            for i in range(n_sessions)
+        ]
+        results = [future.result() for future in futures]
+        elapsed = time.perf_counter() - start
+
+    flows = [timings for session_flows, _ in results for timings in session_flows]
+    errors = [error for _, session_errors in results for error in session_errors]
+    latency = {
+        step: summarize([timings[step] for timings in flows])
+        for step in STEPS + ('flow',) if flows
+    }
+    n_runs = len(flows) * len(STEPS)
+    return {
+        'sessions': n_sessions,
+        'elapsed_s': elapsed,
+        'flows': len(flows),
+        'errors': len(errors),
+        'error_samples': errors[:5],
+        'flows_per_sec': len(flows) / elapsed,
+        'script_runs_per_sec': n_runs / elapsed,
+        'latency': latency,
+        'rss': rss.summary()
+    }
+
+
+def print_summary(summary):
+    print(f"\n👥 {summary['sessions']} sesi | {summary['flows']} alur dalam {summary['elapsed_s']:.1f} s "
+          f"| {summary['flows_per_sec']:.2f} alur/s ({summary['script_runs_per_sec']:.1f} script run/s) "
+          f"| error: {summary['errors']}")
+    print(f"   {'Langkah':<18}{'p50 (ms)':>11}{'p95 (ms)':>11}{'p99 (ms)':>11}{'max (ms)':>11}")
+    for step, stats in summary['latency'].items():
+        print(f"   {step:<18}{stats['p50_ms']:>11.1f}{stats['p95_ms']:>11.1f}"
+              f"{stats['p99_ms']:>11.1f}{stats['max_ms']:>11.1f}")
+    rss = summary['rss']
+    print(f"   RSS: {rss['start_mb']:.1f} MB -> {rss['end_mb']:.1f} MB "
+          f"(puncak {rss['peak_mb']:.1f} MB, {rss['growth_mb']:+.1f} MB)")
+    for error in summary['error_samples']:
+        print(f"   ⚠️ {error}")
+
+
+def main(argv=None):
+    """Entry point command line"""
+    parser = argparse.ArgumentParser(description="Load test sesi bersamaan untuk app.py (headless)")
+    parser.add_argument('--sessions', default='1,4,8',
+                        help="Jumlah sesi bersamaan; beberapa nilai dipisah koma untuk sweep")
+    parser.add_argument('--iterations', type=int, default=3, help="Alur per sesi (diabaikan jika --duration)")
+    parser.add_argument('--duration', type=float, default=None, help="Durasi per level beban (detik)")
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--timeout', type=float, default=60, help="Timeout satu script run (detik)")
+    parser.add_argument('--pdf-timeout', type=float, default=30,
+                        help="Batas tunggu laporan PDF dari antrean background (detik)")
+    parser.add_argument('--no-registry', action='store_true', help="Jangan isi ID anak (tanpa tulis SQLite)")
+    parser.add_argument('--trace', action='store_true', help="Aktifkan tracing dan sertakan latensi per tahap")
+    parser.add_argument('--output', default=None, help="File JSON hasil (default: benchmark_results/load_test_<waktu>.json)")
+    args = parser.parse_args(argv)
+
+    levels = [int(value) for value in args.sessions.split(',') if value.strip()]
+
+    # Registry & model terisolasi; watcher model tidak perlu polling selama load test
+    tmp_dir = tempfile.mkdtemp(prefix='stunting_load_')
+    os.environ.setdefault('STUNTING_REGISTRY_DB', os.path.join(tmp_dir, 'load_registry.db'))
+    os.environ.setdefault('STUNTING_MODEL_POLL_SECONDS', '0')
+    os.environ.setdefault('STUNTING_SCREENING_LOG_DIR', os.path.join(tmp_dir, 'screening_log'))
+
+    import streamlit.logger
+    streamlit.logger.set_log_level('error')
+    from tracing import TRACER
+    TRACER.enabled = args.trace
+
+    print("=" * 80)
+    print("👥 LOAD TEST SESI STREAMLIT")
+    print("=" * 80)
+
+    # Pemanasan: cache_resource (model, registry) dimuat sekali seperti server yang sudah berjalan
+    run_load(1, iterations=1, seed=args.seed, use_registry=False, timeout=args.timeout,
+             pdf_timeout=args.pdf_timeout)
+    TRACER.reset()
+
+    report = {'timestamp': datetime.now().isoformat(timespec='seconds'), 'levels': []}
+    for n_sessions in levels:
+        summary = run_load(n_sessions, None if args.duration else args.iterations, args.duration,
+                           args.seed, not args.no_registry, args.timeout, args.pdf_timeout)
+        if args.trace:
+            summary['stages'] = TRACER.summary()
+            TRACER.reset()
+        report['levels'].append(summary)
+        print_summary(summary)
+        if args.trace:
+            slowest = sorted(summary['stages'].items(), key=lambda item: -(item[1]['p95_ms'] or 0))[:6]
+            print("   Tahap paling lambat (p95): " +
+                  ", ".join(f"{name} {stats['p95_ms']:.1f} ms" for name, stats in slowest))
+
+    output_path = args.output or os.path.join(
+        DEFAULT_RESULTS_DIR, f"load_test_{datetime.now():%Y%m%d_%H%M%S}.json"
+    )
+    os.makedirs(os.path.dirname(os.path.abspath(output_path)), exist_ok=True)
+    with open(output_path, 'w', encoding='utf-8') as f:
+        json.dump(report, f, indent=2)
+    print(f"\n💾 Hasil disimpan ke: {output_path}")
+
+    failed = sum(level['errors'] for level in report['levels'])
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
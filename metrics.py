@@ -0,0 +1,278 @@
+"""
+Metrik Operasional Layanan Skrining
+Counter request/error, histogram latensi per tahap (dari tracing.TRACER),
+versi & memori model, diekspor dalam format teks Prometheus
+
+Ekspor diaktifkan dengan environment variable:
+    STUNTING_METRICS_PORT=9464             # endpoint http://<host>:9464/metrics
+    STUNTING_METRICS_FILE=metrics.prom     # atau file yang ditulis ulang berkala
+    STUNTING_METRICS_INTERVAL=15           # interval flush file (detik)
+
+Saat ekspor aktif, tracing ikut diaktifkan karena histogram latensi
+per tahap diambil dari span tracing.
+"""
+
+import os
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from tracing import TRACER
+
+CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+STAGE_METRIC = 'stunting_stage_duration_seconds'
+
+COUNTER_HELP = {
+    'stunting_requests_total': 'Script run halaman Streamlit per halaman',
+    'stunting_detections_total': 'Analisis deteksi selesai per status WHO',
+    'stunting_knn_errors_total': 'Kegagalan prediksi KNN per jenis',
+    'stunting_knn_out_of_distribution_total': 'Input di luar cakupan data training KNN (prediksi tidak dipakai)',
+    'stunting_registry_errors_total': 'Kegagalan simpan riwayat pertumbuhan',
+    'stunting_pdf_reports_total': 'Laporan PDF yang dibuat'
+}
+
+
+def process_rss_bytes():
+    """RSS proses saat ini (Linux /proc), fallback ke puncak RSS dari getrusage"""
+    try:
+        with open('/proc/self/statm', 'r') as f:
+            return int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE')
+    except (OSError, ValueError, IndexError):
+        pass
+    try:
+        import resource
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        # Linux melaporkan KB, macOS byte
+        return peak if os.uname().sysname == 'Darwin' else peak * 1024
+    except (ImportError, AttributeError):
+        return None
+
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('\n', '\\n').replace('"', '\\"')
+
+
+def _format_labels(labels):
+    if not labels:
+        return ''
+    return '{' + ','.join(f'{key}="{_escape(value)}"' for key, value in labels) + '}'
+
+
+def _format_value(value):
+    if isinstance(value, float):
+        return repr(value) if value == value and abs(value) != float('inf') else ('+Inf' if value > 0 else 'NaN')
+    return str(value)
+
+
+class Metrics:
+    """
+    Registry metrik proses
+
+    Pemakaian:
+        METRICS.inc('stunting_knn_errors_total', kind='predict')
+        METRICS.register_collector(lambda: [('stunting_model_info', 'gauge', 'Model aktif',
+                                             [({'version': 'v1'}, 1)])])
+        print(METRICS.render())
+    """
+
+    def __init__(self, tracer=TRACER):
+        self.tracer = tracer
+        self._counters = {}
+        self._collectors = []
+        self._lock = threading.Lock()
+        self._server = None
+        self._flusher = None
+        self._stop_event = threading.Event()
+        self.started_at = time.time()
+
+    def inc(self, name, amount=1, **labels):
+        """Tambah counter (label sebagai keyword argument)"""
+        key = (name, tuple(sorted(labels.items())))
+        with self._lock:
+            self._counters[key] = self._counters.get(key, 0) + amount
+
+    def counter_value(self, name, **labels):
+        return self._counters.get((name, tuple(sorted(labels.items()))), 0)
+
+    def register_collector(self, collector):
+        """
+        Collector dipanggil saat render; mengembalikan list
+        (nama, tipe, help, [(labels_dict, nilai), ...])
+        """
+        with self._lock:
+            self._collectors.append(collector)
+
+    # -------------------------------------------------
+    # Format teks Prometheus
+    # -------------------------------------------------
+
+    def _render_counters(self, lines):
+        with self._lock:
+            counters = sorted(self._counters.items())
+        by_name = {}
+        for (name, labels), value in counters:
+            by_name.setdefault(name, []).append((labels, value))
+        for name, samples in by_name.items():
+            lines.append(f"# HELP {name} {COUNTER_HELP.get(name, name)}")
+            lines.append(f"# TYPE {name} counter")
+            for labels, value in samples:
+                lines.append(f"{name}{_format_labels(labels)} {_format_value(value)}")
+
+    def _render_stage_histograms(self, lines):
+        snapshots = self.tracer.histogram_snapshots()
+        if not snapshots:
+            return
+        lines.append(f"# HELP {STAGE_METRIC} Latensi per tahap dari span tracing")
+        lines.append(f"# TYPE {STAGE_METRIC} histogram")
+        for stage, (buckets, count, total_ms) in snapshots.items():
+            for bound_ms, cumulative in buckets:
+                labels = (('stage', stage), ('le', f"{bound_ms / 1000:g}"))
+                lines.append(f"{STAGE_METRIC}_bucket{_format_labels(labels)} {cumulative}")
+            lines.append(f"{STAGE_METRIC}_bucket{_format_labels((('stage', stage), ('le', '+Inf')))} {count}")
+            lines.append(f"{STAGE_METRIC}_sum{_format_labels((('stage', stage),))} {total_ms / 1000!r}")
+            lines.append(f"{STAGE_METRIC}_count{_format_labels((('stage', stage),))} {count}")
+
+    def _render_collectors(self, lines):
+        with self._lock:
+            collectors = list(self._collectors)
+        for collector in collectors:
+            try:
+                families = collector()
+            except Exception as e:
+                lines.append(f"# collector gagal: {_escape(e)}")
+                continue
+            for name, metric_type, help_text, samples in families:
+                lines.append(f"# HELP {name} {help_text}")
+                lines.append(f"# TYPE {name} {metric_type}")
+                for labels, value in samples:
+                    if value is None:
+                        continue
+                    lines.append(f"{name}{_format_labels(sorted(labels.items()))} {_format_value(value)}")
+
+    def render(self):
+        """Semua metrik dalam format teks Prometheus (exposition format 0.0.4)"""
+        lines = [
+            "# HELP stunting_process_resident_memory_bytes RSS proses aplikasi",
+            "# TYPE stunting_process_resident_memory_bytes gauge",
+            f"stunting_process_resident_memory_bytes {process_rss_bytes() or 0}",
+            "# HELP stunting_process_uptime_seconds Lama proses berjalan",
+            "# TYPE stunting_process_uptime_seconds gauge",
+            f"stunting_process_uptime_seconds {time.time() - self.started_at:.3f}",
+        ]
+        self._render_counters(lines)
+        self._render_stage_histograms(lines)
+        self._render_collectors(lines)
+        return "\n".join(lines) + "\n"
+
+    # -------------------------------------------------
+    # Ekspor
+    # -------------------------------------------------
+
+    def write_file(self, path):
+        """Tulis metrik ke file sementara lalu rename (pembaca tidak pernah melihat file setengah jadi)"""
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            f.write(self.render())
+        os.replace(tmp_path, path)
+        return path
+
+    def start_file_flusher(self, path, interval=15.0):
+        """Tulis ulang file metrik setiap `interval` detik di background thread"""
+        if self._flusher is not None:
+            return self
+
+        def flush_loop():
+            while True:
+                try:
+                    self.write_file(path)
+                except OSError as e:
+                    print(f"⚠️ Gagal menulis metrik ke {path}: {e}")
+                if self._stop_event.wait(interval):
+                    break
+
+        self._flusher = threading.Thread(target=flush_loop, name='metrics-flusher', daemon=True)
+        self._flusher.start()
+        return self
+
+    def start_http_server(self, port, host='127.0.0.1'):
+        """
+        Endpoint GET /metrics di thread terpisah (stdlib, tanpa dependency tambahan)
+
+        Tanpa autentikasi: default hanya loopback untuk scraper lokal
+        """
+        if self._server is not None:
+            return self
+        metrics = self
+
+        class MetricsHandler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                if self.path.split('?')[0] not in ('/metrics', '/'):
+                    self.send_error(404)
+                    return
+                body = metrics.render().encode('utf-8')
+                self.send_response(200)
+                self.send_header('Content-Type', CONTENT_TYPE)
+                self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                pass
+
+        self._server = ThreadingHTTPServer((host, port), MetricsHandler)
+        self._server.daemon_threads = True
+        threading.Thread(target=self._server.serve_forever, name='metrics-http', daemon=True).start()
+        print(f"📈 Endpoint metrik: http://{host}:{self._server.server_address[1]}/metrics")
+        return self
+
+    def start_from_env(self):
+        """Aktifkan ekspor sesuai STUNTING_METRICS_PORT / STUNTING_METRICS_FILE"""
+        port = os.environ.get('STUNTING_METRICS_PORT')
+        path = os.environ.get('STUNTING_METRICS_FILE')
+        if not port and not path:
+            return self
+        # Histogram latensi per tahap berasal dari span tracing
+        self.tracer.enabled = True
+        if port:
+            try:
+                self.start_http_server(int(port), os.environ.get('STUNTING_METRICS_HOST', '127.0.0.1'))
+            except OSError as e:
+                print(f"⚠️ Endpoint metrik gagal dijalankan di port {port}: {e}")
+        if path:
+            self.start_file_flusher(path, float(os.environ.get('STUNTING_METRICS_INTERVAL', '15')))
+        return self
+
+    def stop(self):
+        self._stop_event.set()
+        if self._server is not None:
+            self._server.shutdown()
+            self._server.server_close()
+            self._server = None
+
+
+# Registry metrik global aplikasi (satu per proses)
+METRICS = Metrics()
+
+
+# Testing function
+if __name__ == "__main__":
+    import urllib.request
+
+    TRACER.enabled = True
+    for status in ('Normal', 'Normal', 'Stunted'):
+        with TRACER.trace('page.detection'):
+            with TRACER.span('analysis.knn_predict'):
+                time.sleep(0.002)
+        METRICS.inc('stunting_requests_total', page='detection')
+        METRICS.inc('stunting_detections_total', who_status=status)
+    METRICS.inc('stunting_knn_errors_total', kind='predict')
+    METRICS.register_collector(lambda: [
+        ('stunting_model_info', 'gauge', 'Versi model KNN aktif', [({'region': 'default', 'version': 'demo'}, 1)])
+    ])
+
+    METRICS.start_http_server(0, host='127.0.0.1')
+    port = METRICS._server.server_address[1]
+    with urllib.request.urlopen(f"http://127.0.0.1:{port}/metrics") as response:
+        text = response.read().decode('utf-8')
+    METRICS.stop()
+    print(text)
@@ -0,0 +1,259 @@
+"""
+Evaluasi Model KNN dan Model Card
+Metrik per kelas, per kelompok umur dan deteksi stunting (biner) dihitung sekali saat
+training dari satu tensor confusion matrix (bincount, tanpa loop per baris), lalu
+disimpan sebagai model_card.json di folder model. Aplikasi hanya membaca file ini.
+
+Contoh:
+    python model_evaluation.py --model-dir models                 # evaluasi model tersimpan pada split test pipeline
+    python model_evaluation.py --model-dir models --data data_baru.csv --test-size 1.0
+"""
+
+import argparse
+import json
+import os
+import sys
+from datetime import datetime
+
+import numpy as np
+
+MODEL_CARD_FILE = 'model_card.json'
+
+# Kelas yang dihitung sebagai "stunting" untuk metrik biner (sama dengan risk_percentage)
+RISK_CLASSES = ('severely stunted', 'stunted')
+
+# Kelompok umur evaluasi (bulan): (batas bawah, batas atas eksklusif, label)
+AGE_BANDS = [
+    (0, 6, '0-5 bln'),
+    (6, 12, '6-11 bln'),
+    (12, 24, '12-23 bln'),
+    (24, 36, '24-35 bln'),
+    (36, 48, '36-47 bln'),
+    (48, 60, '48-59 bln'),
+    (60, None, '60+ bln')
+]
+
+
+def _divide(numerator, denominator):
+    """Pembagian vektor; NaN jika penyebut 0"""
+    numerator = np.asarray(numerator, dtype=np.float64)
+    denominator = np.asarray(denominator, dtype=np.float64)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        return np.where(denominator > 0, numerator / denominator, np.nan)
+
+
+def _value(x, decimals=4):
+    """Nilai JSON: float dibulatkan, NaN -> None"""
+    x = float(x)
+    return None if np.isnan(x) else round(x, decimals)
+
+
+def age_band_index(age_months):
+    """Indeks AGE_BANDS untuk array umur (bulan)"""
+    lows = np.array([low for low, _, _ in AGE_BANDS], dtype=np.float64)
+    return np.clip(np.searchsorted(lows, np.asarray(age_months, dtype=np.float64), side='right') - 1,
+                   0, len(AGE_BANDS) - 1)
+
+
+def class_metrics(cm):
+    """
+    Precision, recall, F1 dan support per kelas dari confusion matrix (..., K, K)
+    (baris = label sebenarnya, kolom = prediksi); dimensi depan ikut divektorkan
+    """
+    tp = np.diagonal(cm, axis1=-2, axis2=-1)
+    support = cm.sum(axis=-1)
+    precision = _divide(tp, cm.sum(axis=-2))
+    recall = _divide(tp, support)
+    f1 = _divide(2 * precision * recall, precision + recall)
+    return {'precision': precision, 'recall': recall, 'f1': f1, 'support': support}
+
+
+def binary_metrics(cm, positive):
+    """Sensitivitas, spesifisitas, PPV, NPV untuk kelas positif (mask) dari confusion matrix (..., K, K)"""
+    positive = np.asarray(positive, dtype=bool)
+    true_pos_rows = cm[..., positive, :]
+    true_neg_rows = cm[..., ~positive, :]
+    tp = true_pos_rows[..., positive].sum(axis=(-2, -1))
+    fn = true_pos_rows[..., ~positive].sum(axis=(-2, -1))
+    fp = true_neg_rows[..., positive].sum(axis=(-2, -1))
+    tn = true_neg_rows[..., ~positive].sum(axis=(-2, -1))
+    return {
+        'sensitivity': _divide(tp, tp + fn),
+        'specificity': _divide(tn, tn + fp),
+        'ppv': _divide(tp, tp + fp),
+        'npv': _divide(tn, tn + fn),
+        'prevalence': _divide(tp + fn, tp + fn + fp + tn)
+    }
+
+
+def evaluate_predictions(y_true, y_pred, probabilities, age_months, class_names, risk_classes=RISK_CLASSES):
+    """
+    Evaluasi lengkap prediksi test set
+
+    Parameters:
+    - y_true, y_pred: Array indeks kelas (urutan class_names)
+    - probabilities: Array (n, K) probabilitas kelas
+    - age_months: Array umur (bulan) baris test
+    - class_names: Nama kelas (label_encoder.classes_)
+
+    Returns: Dict siap JSON (overall, per kelas, confusion matrix, stunting biner, per kelompok umur)
+    """
+    y_true = np.asarray(y_true, dtype=np.int64)
+    y_pred = np.asarray(y_pred, dtype=np.int64)
+    probabilities = np.asarray(probabilities, dtype=np.float64)
+    n_classes, n_bands = len(class_names), len(AGE_BANDS)
+    band = age_band_index(age_months)
+
+    # Satu tensor (kelompok umur, label, prediksi); total = jumlah semua kelompok
+    cm_band = np.bincount((band * n_classes + y_true) * n_classes + y_pred,
+                          minlength=n_bands * n_classes * n_classes).reshape(n_bands, n_classes, n_classes)
+    cm = cm_band.sum(axis=0)
+
+    overall = class_metrics(cm)
+    by_band = class_metrics(cm_band)
+    risk = np.isin(np.asarray(class_names), risk_classes)
+    stunting = binary_metrics(cm, risk)
+    stunting_band = binary_metrics(cm_band, risk)
+
+    n_band = cm_band.sum(axis=(1, 2))
+    accuracy_band = _divide(np.trace(cm_band, axis1=1, axis2=2), n_band)
+    # Rata-rata F1 hanya untuk kelas yang ada di kelompok itu
+    macro_f1_band = _divide(np.nansum(np.where(by_band['support'] > 0, by_band['f1'], 0), axis=1),
+                            (by_band['support'] > 0).sum(axis=1))
+    predicted_risk = probabilities[:, risk].sum(axis=1)
+    mean_risk_band = _divide(np.bincount(band, weights=predicted_risk, minlength=n_bands), n_band)
+
+    support = overall['support']
+    f1 = np.nan_to_num(overall['f1'])
+    return {
+        'n_test': int(cm.sum()),
+        'accuracy': _value(_divide(np.trace(cm), cm.sum())),
+        'macro_f1': _value(f1[support > 0].mean() if (support > 0).any() else np.nan),
+        'weighted_f1': _value(_divide((f1 * support).sum(), support.sum())),
+        'classes': [
+            {'class': name, 'precision': _value(overall['precision'][k]), 'recall': _value(overall['recall'][k]),
+             'f1': _value(overall['f1'][k]), 'support': int(support[k])}
+            for k, name in enumerate(class_names)
+        ],
+        'confusion_matrix': cm.tolist(),
+        'stunting': {'classes': list(risk_classes), **{key: _value(value) for key, value in stunting.items()}},
+        'age_bands': [
+            {'band': label, 'n': int(n_band[b]), 'accuracy': _value(accuracy_band[b]),
+             'macro_f1': _value(macro_f1_band[b]),
+             'stunting_sensitivity': _value(stunting_band['sensitivity'][b]),
+             'stunting_specificity': _value(stunting_band['specificity'][b]),
+             'observed_stunting_rate': _value(stunting_band['prevalence'][b]),
+             'mean_predicted_risk': _value(mean_risk_band[b])}
+            for b, (_, _, label) in enumerate(AGE_BANDS)
+        ]
+    }
+
+
+def build_model_card(metadata):
+    """Model card dari metadata model (evaluasi + ringkasan training)"""
+    data = metadata.get('data') or {}
+    return {
+        'created_at': datetime.now().isoformat(timespec='seconds'),
+        'model': {
+            'version': metadata.get('version', metadata.get('train_date')),
+            'train_date': metadata.get('train_date'),
+            'params': metadata.get('best_params'),
+            'target_classes': metadata.get('target_classes'),
+            'n_train_samples': metadata.get('n_train_samples'),
+            'n_test_samples': metadata.get('n_test_samples'),
+            'train_accuracy': metadata.get('train_accuracy'),
+            'cv_mean': metadata.get('cv_mean'),
+            'cv_std': metadata.get('cv_std'),
+            'data_sha256': data.get('sha256'),
+            'n_updates': len(metadata.get('update_history') or [])
+        },
+        'evaluation': metadata.get('evaluation')
+    }
+
+
+def save_model_card(metadata, model_dir):
+    """Tulis model_card.json (tidak ditulis jika metadata belum punya evaluasi)"""
+    if not metadata.get('evaluation'):
+        return None
+    path = os.path.join(model_dir, MODEL_CARD_FILE)
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump(build_model_card(metadata), f, indent=2, ensure_ascii=False)
+    return path
+
+
+def load_model_card(model_dir):
+    """Model card tersimpan; None jika model belum punya"""
+    path = os.path.join(model_dir, MODEL_CARD_FILE)
+    if not os.path.exists(path):
+        return None
+    with open(path, 'r', encoding='utf-8') as f:
+        return json.load(f)
+
+
+def _format(value):
+    return f"{value:.4f}" if value is not None else "-"
+
+
+def print_evaluation(evaluation):
+    print(f"\n🎯 Akurasi {_format(evaluation['accuracy'])} | macro F1 {_format(evaluation['macro_f1'])} "
+          f"| n test {evaluation['n_test']:,}")
+    stunting = evaluation['stunting']
+    print(f"   Stunting (biner): sensitivitas {_format(stunting['sensitivity'])}, "
+          f"spesifisitas {_format(stunting['specificity'])}, PPV {_format(stunting['ppv'])}")
+    print(f"   {'Kelompok umur':<14}{'n':>7}{'akurasi':>10}{'sens.':>10}{'spes.':>10}")
+    for band in evaluation['age_bands']:
+        if band['n']:
+            print(f"   {band['band']:<14}{band['n']:>7,}{_format(band['accuracy']):>10}"
+                  f"{_format(band['stunting_sensitivity']):>10}{_format(band['stunting_specificity']):>10}")
+
+
+def main(argv=None):
+    """Entry point command line: evaluasi model tersimpan dan tulis model_card.json"""
+    parser = argparse.ArgumentParser(description="Evaluasi model KNN tersimpan dan buat model card")
+    parser.add_argument('--model-dir', default=os.path.join(os.path.dirname(os.path.abspath(__file__)), 'models'))
+    parser.add_argument('--data', default=None, help="CSV evaluasi (default: data training di metadata)")
+    parser.add_argument('--test-size', type=float, default=None,
+                        help="Proporsi test split seperti pipeline (1.0 = seluruh file); default dari metadata")
+    parser.add_argument('--random-state', type=int, default=None)
+    args = parser.parse_args(argv)
+
+    from sklearn.model_selection import train_test_split
+    from knn_model_trainer import StuntingKNNModel
+    from training_pipeline import DEFAULT_DATA, stage_load
+
+    knn_model = StuntingKNNModel(None)
+    knn_model.load_model(args.model_dir)
+    metadata = knn_model.metadata
+    pipeline = metadata.get('pipeline') or {}
+    data_path = args.data or (metadata.get('data') or {}).get('path') or DEFAULT_DATA
+    test_size = args.test_size if args.test_size is not None else pipeline.get('test_size', 0.2)
+    random_state = args.random_state if args.random_state is not None else pipeline.get('random_state', 42)
+
+    # Split sama dengan pipeline (encoder dari model, sehingga urutan kelas konsisten)
+    df = stage_load(data_path, pipeline.get('drop_duplicates', True))['df']
+    X = np.column_stack([
+        df['Umur (bulan)'].to_numpy(dtype=np.float64),
+        knn_model.gender_encoder.transform(df['Jenis Kelamin']),
+        df['Tinggi Badan (cm)'].to_numpy(dtype=np.float64)
+    ])
+    y = knn_model.label_encoder.transform(df['Status Gizi'])
+    if test_size < 1.0:
+        _, X, _, y = train_test_split(X, y, test_size=test_size, random_state=random_state, stratify=y)
+
+    probabilities = knn_model._predict_proba_scaled(knn_model.scaler.transform(X))
+    evaluation = evaluate_predictions(y, probabilities.argmax(axis=1), probabilities, X[:, 0],
+                                      list(knn_model.label_encoder.classes_))
+    evaluation['model_version'] = knn_model.version
+    # Path relatif terhadap folder project agar model card bisa ikut di-commit bersama model
+    evaluation['data'] = {'path': os.path.relpath(os.path.abspath(data_path), os.path.dirname(os.path.abspath(__file__))),
+                          'test_size': test_size, 'random_state': random_state}
+    print_evaluation(evaluation)
+
+    metadata['evaluation'] = evaluation
+    path = save_model_card(metadata, args.model_dir)
+    print(f"\n💾 Model card: {path}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,283 @@
+"""
+Model Manager untuk Hot Reload Model KNN
+Memantau folder models/ (atau manifest versi, atau model di memori bersama), memuat
+versi baru di background, memvalidasi dengan smoke test, lalu menukar model secara atomik
+"""
+
+import json
+import os
+import threading
+import time
+from collections import namedtuple
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+
+from compact_knn import COMPACT_INDEX_DIR, COMPACT_INDEX_FILE, INDEX_PARAMS_FILE
+from drift_monitor import DRIFT_REFERENCE_FILE
+from knn_model_trainer import StuntingKNNModel
+from model_evaluation import MODEL_CARD_FILE
+
+
+MANIFEST_FILE = 'manifest.json'
+
+# File yang dibaca load_model() pada layout lama: perubahan salah satunya memicu reload
+LEGACY_MODEL_FILES = (
+    'knn_model.pkl', 'scaler.pkl', 'encoders.pkl', 'model_metadata.pkl',
+    DRIFT_REFERENCE_FILE, MODEL_CARD_FILE, COMPACT_INDEX_FILE,
+    os.path.join(COMPACT_INDEX_DIR, INDEX_PARAMS_FILE),
+)
+
+# Model aktif yang dipakai satu request: referensi tetap valid walau model ditukar
+ModelHandle = namedtuple('ModelHandle', ['version', 'model', 'model_dir', 'loaded_at'])
+
+
+def load_smoke_test_set(data_path, n_samples=500, random_state=0):
+    """
+    Smoke test berlabel: sampel tetap dari dataset (data_balita.csv)
+
+    Returns: (age_months, gender, height_cm, expected_label) array, atau None jika dataset tidak ada
+    """
+    if not data_path or not os.path.exists(data_path):
+        return None
+
+    df = pd.read_csv(data_path).dropna()
+    df = df.sample(min(n_samples, len(df)), random_state=random_state)
+    return (df['Umur (bulan)'].to_numpy(dtype=np.float64),
+            df['Jenis Kelamin'].str.lower().to_numpy(),
+            df['Tinggi Badan (cm)'].to_numpy(dtype=np.float64),
+            df['Status Gizi'].str.lower().to_numpy())
+
+
+def smoke_test(knn_model, smoke_set=None, min_accuracy=0.9):
+    """
+    Validasi model sebelum dipakai: prediksi berjalan, probabilitas valid,
+    dan (jika ada smoke set berlabel) akurasi memenuhi ambang
+
+    Returns: (lolos, pesan)
+    """
+    if smoke_set is None:
+        # Tanpa data berlabel: cukup pastikan prediksi berjalan untuk input standar
+        age = np.array([0.0, 12.0, 24.0, 48.0, 60.0])
+        smoke_set = (age, np.array(['laki-laki', 'perempuan'] * 2 + ['laki-laki']),
+                     np.array([50.0, 74.0, 86.0, 103.0, 110.0]), None)
+
+    age, gender, height, expected = smoke_set
+    try:
+        result = knn_model.predict_batch(age, gender, height)
+    except Exception as e:
+        return False, f"prediksi gagal: {e}"
+
+    probabilities = result['probabilities']
+    if not np.allclose(probabilities.sum(axis=1), 1.0):
+        return False, "probabilitas tidak berjumlah 1"
+
+    if expected is None:
+        return True, "prediksi valid (tanpa data berlabel)"
+
+    accuracy = float(np.mean(result['prediction'] == expected))
+    if accuracy < min_accuracy:
+        return False, f"akurasi smoke test {accuracy:.2f} < {min_accuracy:.2f}"
+    return True, f"akurasi smoke test {accuracy:.2f}"
+
+
+class ModelManager:
+    """
+    Pengelola model KNN aktif dengan hot reload
+
+    Layout yang didukung:
+    - models/manifest.json berisi {"current": "<versi>"} -> models/versions/<versi>/
+    - Tanpa manifest: file model langsung di models/ (layout lama)
+    - shared_dir: slot yang dipublikasikan loader shared_model.py (indeks di-mmap, dibagi antar proses)
+
+    Request mengambil `current` sekali di awal lalu memakai handle itu sampai
+    selesai; penukaran model hanya mengganti referensi, sehingga request yang
+    sedang berjalan tetap memakai model lama.
+    """
+
+    def __init__(self, models_root, poll_interval=30.0, smoke_data_path=None, min_smoke_accuracy=0.9,
+                 compact=False, shared_dir=None):
+        self.models_root = models_root
+        self.shared_dir = shared_dir
+        # Model bersama selalu memakai indeks ringkas yang di-mmap
+        self.compact = compact or shared_dir is not None
+        self.poll_interval = poll_interval
+        self.min_smoke_accuracy = min_smoke_accuracy
+        self.smoke_set = load_smoke_test_set(smoke_data_path)
+
+        self._current = None
+        self._fingerprint = None
+        self._lock = threading.Lock()
+        self._stop_event = threading.Event()
+        self._thread = None
+        self.last_check = None
+        self.last_error = None
+        self.stats = {'reloads': 0, 'reload_failures': 0, 'last_load_seconds': None}
+
+    @property
+    def current(self):
+        """ModelHandle aktif (None jika belum ada model valid)"""
+        return self._current
+
+    def _resolve(self):
+        """
+        Tentukan folder model yang seharusnya aktif beserta sidik jarinya
+
+        Returns: (model_dir, version_hint, fingerprint)
+        """
+        if self.shared_dir is not None:
+            from shared_model import read_manifest, slot_path, verify_slot
+
+            manifest = read_manifest(self.shared_dir)
+            if manifest is None:
+                raise FileNotFoundError(f"Belum ada model yang dipublikasikan di {self.shared_dir}")
+            verify_slot(self.shared_dir, manifest)
+            return (slot_path(self.shared_dir, manifest['slot']), manifest['version'],
+                    ('shared', manifest['slot']))
+
+        manifest_path = os.path.join(self.models_root, MANIFEST_FILE)
+        if os.path.exists(manifest_path):
+            with open(manifest_path, 'r', encoding='utf-8') as f:
+                manifest = json.load(f)
+            version = manifest['current']
+            return os.path.join(self.models_root, 'versions', version), version, ('manifest', version)
+
+        # knn_model.pkl wajib ada; file lain opsional (None jika tidak ada)
+        os.stat(os.path.join(self.models_root, 'knn_model.pkl'))
+        return self.models_root, None, ('legacy',) + tuple(
+            self._file_stat(os.path.join(self.models_root, name)) for name in LEGACY_MODEL_FILES
+        )
+
+    @staticmethod
+    def _file_stat(path):
+        try:
+            stat = os.stat(path)
+        except FileNotFoundError:
+            return None
+        return (stat.st_mtime_ns, stat.st_size)
+
+    def _load(self, model_dir, version_hint):
+        knn_model = StuntingKNNModel(None)
+        knn_model.load_model(model_dir, compact=self.compact)
+
+        passed, message = smoke_test(knn_model, self.smoke_set, self.min_smoke_accuracy)
+        if not passed:
+            raise ValueError(f"Model {model_dir} gagal smoke test: {message}")
+
+        version = version_hint or knn_model.version or datetime.now().strftime('v%Y%m%d_%H%M%S')
+        return ModelHandle(version, knn_model, model_dir, datetime.now())
+
+    def check_for_update(self):
+        """
+        Periksa manifest/folder model; muat dan tukar jika ada versi baru yang valid
+
+        Returns: True jika model ditukar
+        """
+        with self._lock:
+            self.last_check = datetime.now()
+            try:
+                model_dir, version_hint, fingerprint = self._resolve()
+                if fingerprint == self._fingerprint:
+                    return False
+                # Sidik jari dicatat walau gagal agar file rusak tidak dimuat berulang;
+                # penulisan ulang file akan mengubah sidik jari dan memicu percobaan baru
+                self._fingerprint = fingerprint
+
+                start = time.perf_counter()
+                handle = self._load(model_dir, version_hint)
+                self.stats['last_load_seconds'] = time.perf_counter() - start
+            except Exception as e:
+                self.stats['reload_failures'] += 1
+                self.last_error = f"{datetime.now():%Y-%m-%d %H:%M:%S} {e}"
+                print(f"⚠️ Model reload gagal, tetap memakai versi lama: {e}")
+                return False
+
+            # Penukaran atomik: satu assignment referensi
+            self._current = handle
+            self.last_error = None
+            self.stats['reloads'] += 1
+            if self.shared_dir is not None:
+                # Handshake: publisher tidak menghapus slot yang masih dipakai proses ini
+                from shared_model import register_reader
+                register_reader(self.shared_dir, {'slot': fingerprint[1], 'version': handle.version})
+            print(f"✅ Model aktif: {handle.version} ({handle.model_dir})")
+            return True
+
+    def start(self):
+        """Muat model awal lalu jalankan watcher di background thread"""
+        self.check_for_update()
+        if self._thread is None and self.poll_interval > 0:
+            self._thread = threading.Thread(target=self._watch, name='model-watcher', daemon=True)
+            self._thread.start()
+        return self
+
+    def stop(self):
+        self._stop_event.set()
+        if self._thread is not None:
+            self._thread.join(timeout=self.poll_interval + 1)
+            self._thread = None
+
+    def _watch(self):
+        while not self._stop_event.wait(self.poll_interval):
+            self.check_for_update()
+
+    def predict(self, age_months, gender, height_cm):
+        """Prediksi dengan model aktif; hasil ditandai versi model yang memprosesnya"""
+        handle = self._current
+        if handle is None:
+            raise RuntimeError("Tidak ada model KNN yang aktif")
+        result = handle.model.predict(age_months, gender, height_cm)
+        result['model_version'] = handle.version
+        return result
+
+    def status(self):
+        """Ringkasan status untuk ditampilkan di UI"""
+        handle = self._current
+        return {
+            'version': handle.version if handle else None,
+            'model_dir': handle.model_dir if handle else None,
+            'loaded_at': handle.loaded_at if handle else None,
+            'shared': self.shared_dir is not None,
+            'last_check': self.last_check,
+            'last_error': self.last_error
+        }
+
+    @staticmethod
+    def publish(knn_model, models_root):
+        """
+        Simpan model sebagai versi baru lalu arahkan manifest ke versi itu
+        (manifest ditulis ke file sementara lalu di-rename agar atomik)
+
+        Returns: Versi yang dipublikasikan
+        """
+        knn_model.save_model_version(models_root)
+
+        manifest_path = os.path.join(models_root, MANIFEST_FILE)
+        tmp_path = f"{manifest_path}.{os.getpid()}.tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump({
+                'current': knn_model.version,
+                'published_at': datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+            }, f, indent=2)
+        os.replace(tmp_path, manifest_path)
+
+        print(f"📦 Versi {knn_model.version} dipublikasikan ke {manifest_path}")
+        return knn_model.version
+
+
+# Testing function
+if __name__ == "__main__":
+    import sys
+
+    current_dir = os.path.dirname(os.path.abspath(__file__))
+    models_root = sys.argv[1] if len(sys.argv) > 1 else os.path.join(current_dir, 'models')
+    manager = ModelManager(models_root, poll_interval=0,
+                           smoke_data_path=os.path.join(current_dir, 'data_balita.csv')).start()
+    print(manager.status())
+
+    if manager.current is not None:
+        start = time.perf_counter()
+        result = manager.predict(24, 'laki-laki', 80)
+        print(f"Prediction: {result['prediction']} (versi {result['model_version']}, "
+              f"{(time.perf_counter() - start) * 1000:.1f} ms)")
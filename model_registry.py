@@ -0,0 +1,258 @@
+"""
+Registry Model KNN per Wilayah
+Banyak versi model per kode wilayah di disk, hanya yang terakhir dipakai
+yang tinggal di memori (LRU dengan batas byte)
+
+Layout disk:
+    models/regions/<kode_wilayah>/manifest.json
+    models/regions/<kode_wilayah>/versions/<versi>/knn_model.pkl, ...
+"""
+
+import json
+import os
+import re
+import threading
+import time
+from collections import OrderedDict
+from datetime import datetime
+
+import numpy as np
+
+from knn_model_trainer import StuntingKNNModel
+from model_manager import MANIFEST_FILE, ModelHandle, ModelManager
+
+# Kode wilayah BPS: hanya digit (provinsi 2, kabupaten 4, kecamatan 7, desa 10)
+REGION_CODE_PATTERN = re.compile(r'\d{1,10}')
+
+
+def valid_region_code(region_code):
+    """True jika kode wilayah aman dipakai sebagai nama folder (kode numerik BPS)"""
+    return REGION_CODE_PATTERN.fullmatch(str(region_code or '')) is not None
+
+
+def valid_version(version):
+    """True jika nama versi berupa satu komponen path (tanpa separator / '..')"""
+    version = str(version or '')
+    return version not in ('', '.', '..') and os.path.basename(version) == version and '\\' not in version
+
+
+def estimate_model_bytes(knn_model):
+    """
+    Perkiraan memori model: array data training, label dan struktur pohon KNN
+    (atau ukuran indeks ringkas jika model di-load dengan compact=True; indeks yang di-mmap
+    dari memori bersama tidak dihitung karena bukan memori privat proses)
+    """
+    if knn_model.model is None:
+        index = knn_model.compact_index
+        return 0 if index.mapped_from else index.nbytes
+    model = knn_model.model
+    total = 0
+    for value in vars(model).values():
+        if isinstance(value, np.ndarray):
+            total += value.nbytes
+    tree = getattr(model, '_tree', None)
+    if tree is not None:
+        total += sum(array.nbytes for array in tree.get_arrays() if isinstance(array, np.ndarray))
+    return total
+
+
+class RegionModelRegistry:
+    """
+    Registry model per wilayah dengan lazy loading dan eviction LRU
+
+    Parameters:
+    - root: Folder dasar (berisi subfolder regions/)
+    - max_bytes: Batas memori total model yang resident
+    - default_manager: ModelManager untuk wilayah tanpa model khusus (opsional)
+    - compact: Muat indeks KNN ringkas (compact_index.npz) jika tersedia
+    """
+
+    def __init__(self, root, max_bytes=256 * 1024 * 1024, default_manager=None, compact=False):
+        self.root = root
+        self.compact = compact
+        self.regions_dir = os.path.join(root, 'regions')
+        self.max_bytes = max_bytes
+        self.default_manager = default_manager
+
+        self._cache = OrderedDict()          # (wilayah, versi) -> (ModelHandle, bytes)
+        self._resident_bytes = 0
+        self._manifests = {}                 # wilayah -> (mtime_ns, versi)
+        self._lock = threading.Lock()
+        self._load_locks = {}
+        self.stats = {'hits': 0, 'misses': 0, 'evictions': 0, 'load_seconds': 0.0}
+
+    # -------------------------------------------------
+    # Disk
+    # -------------------------------------------------
+
+    def region_dir(self, region_code):
+        """
+        Folder model wilayah
+
+        Raises: ValueError jika kode wilayah bukan kode numerik BPS
+        (mencegah path absolut / '..' keluar dari folder regions)
+        """
+        if not valid_region_code(region_code):
+            raise ValueError(f"Kode wilayah tidak valid: '{region_code}' (harus angka, maks. 10 digit)")
+        return os.path.join(self.regions_dir, str(region_code))
+
+    def register(self, region_code, knn_model):
+        """Simpan model sebagai versi baru wilayah dan jadikan versi aktif"""
+        region_dir = self.region_dir(region_code)
+        os.makedirs(region_dir, exist_ok=True)
+        return ModelManager.publish(knn_model, region_dir)
+
+    def list_regions(self):
+        if not os.path.isdir(self.regions_dir):
+            return []
+        return sorted(name for name in os.listdir(self.regions_dir)
+                      if os.path.exists(os.path.join(self.regions_dir, name, MANIFEST_FILE)))
+
+    def list_versions(self, region_code):
+        versions_dir = os.path.join(self.region_dir(region_code), 'versions')
+        if not os.path.isdir(versions_dir):
+            return []
+        return sorted(os.listdir(versions_dir))
+
+    def current_version(self, region_code):
+        """Versi aktif wilayah dari manifest (di-cache per mtime), None jika tidak ada"""
+        manifest_path = os.path.join(self.region_dir(region_code), MANIFEST_FILE)
+        try:
+            mtime = os.stat(manifest_path).st_mtime_ns
+        except FileNotFoundError:
+            return None
+
+        cached = self._manifests.get(region_code)
+        if cached and cached[0] == mtime:
+            return cached[1]
+        with open(manifest_path, 'r', encoding='utf-8') as f:
+            version = json.load(f)['current']
+        self._manifests[region_code] = (mtime, version)
+        return version
+
+    # -------------------------------------------------
+    # Cache LRU
+    # -------------------------------------------------
+
+    def get(self, region_code, version=None):
+        """
+        ModelHandle untuk wilayah & versi (default: versi aktif), dimuat jika belum resident
+
+        Raises: KeyError jika wilayah/versi tidak ada
+        """
+        region_code = str(region_code)
+        if not valid_region_code(region_code):
+            raise KeyError(f"Kode wilayah tidak valid: '{region_code}'")
+        version = version or self.current_version(region_code)
+        if version is None:
+            raise KeyError(f"Tidak ada model untuk wilayah '{region_code}'")
+        if not valid_version(version):
+            raise KeyError(f"Versi model tidak valid: '{version}'")
+        key = (region_code, version)
+
+        with self._lock:
+            entry = self._cache.get(key)
+            if entry is not None:
+                self._cache.move_to_end(key)
+                self.stats['hits'] += 1
+                return entry[0]
+            self.stats['misses'] += 1
+            load_lock = self._load_locks.setdefault(key, threading.Lock())
+
+        # Muat di luar lock global agar wilayah lain tidak ikut menunggu
+        with load_lock:
+            with self._lock:
+                entry = self._cache.get(key)
+                if entry is not None:
+                    return entry[0]
+
+            try:
+                model_dir = os.path.join(self.region_dir(region_code), 'versions', version)
+                if not os.path.isdir(model_dir):
+                    raise KeyError(f"Versi '{version}' untuk wilayah '{region_code}' tidak ditemukan")
+                start = time.perf_counter()
+                knn_model = StuntingKNNModel(None)
+                knn_model.load_model(model_dir, compact=self.compact)
+                handle = ModelHandle(version, knn_model, model_dir, datetime.now())
+                size = estimate_model_bytes(knn_model)
+
+                with self._lock:
+                    self.stats['load_seconds'] += time.perf_counter() - start
+                    self._cache[key] = (handle, size)
+                    self._resident_bytes += size
+                    self._evict()
+            finally:
+                # Lepas lock muat juga saat gagal agar tidak menumpuk per kunci
+                with self._lock:
+                    self._load_locks.pop(key, None)
+        return handle
+
+    def _evict(self):
+        """Buang model yang paling lama tidak dipakai sampai di bawah batas (minimal sisa satu)"""
+        while self._resident_bytes > self.max_bytes and len(self._cache) > 1:
+            _, (_, size) = self._cache.popitem(last=False)
+            self._resident_bytes -= size
+            self.stats['evictions'] += 1
+
+    def resident(self):
+        """Daftar model resident (urutan LRU -> MRU) beserta ukurannya"""
+        with self._lock:
+            return [(key, size) for key, (_, size) in self._cache.items()]
+
+    @property
+    def resident_bytes(self):
+        return self._resident_bytes
+
+    # -------------------------------------------------
+    # Routing
+    # -------------------------------------------------
+
+    def route(self, region_code):
+        """
+        Pilih model untuk kode wilayah: cocokkan prefix terpanjang
+        (mis. kabupaten '3201' -> provinsi '32'), lalu model default.
+        Kode yang bukan kode numerik BPS langsung memakai model default.
+
+        Returns: (kode_wilayah_terpakai, ModelHandle) atau (None, None)
+        """
+        code = str(region_code or '').strip()
+        if not valid_region_code(code):
+            code = ''
+        while code:
+            if self.current_version(code) is not None:
+                return code, self.get(code)
+            code = code[:-1]
+
+        if self.default_manager is not None and self.default_manager.current is not None:
+            return None, self.default_manager.current
+        return None, None
+
+    def predict(self, region_code, age_months, gender, height_cm):
+        """Prediksi dengan model wilayah yang sesuai; hasil ditandai wilayah & versi model"""
+        used_region, handle = self.route(region_code)
+        if handle is None:
+            raise RuntimeError(f"Tidak ada model KNN untuk wilayah '{region_code}'")
+        result = handle.model.predict(age_months, gender, height_cm)
+        result['model_version'] = handle.version
+        result['model_region'] = used_region
+        return result
+
+
+# Testing function
+if __name__ == "__main__":
+    import sys
+
+    current_dir = os.path.dirname(os.path.abspath(__file__))
+    models_root = sys.argv[1] if len(sys.argv) > 1 else os.path.join(current_dir, 'models')
+    region_code = sys.argv[2] if len(sys.argv) > 2 else '3201'
+
+    default_manager = ModelManager(models_root, poll_interval=0).start()
+    registry = RegionModelRegistry(models_root, default_manager=default_manager)
+    print(f"Wilayah terdaftar: {registry.list_regions()}")
+
+    start = time.perf_counter()
+    result = registry.predict(region_code, 24, 'laki-laki', 80)
+    print(f"Prediction ({region_code}): {result['prediction']} "
+          f"(wilayah model {result['model_region']}, versi {result['model_version']}, "
+          f"{(time.perf_counter() - start) * 1000:.1f} ms)")
+    print(f"Resident: {registry.resident()} | {registry.stats}")
@@ -0,0 +1,234 @@
+"""
+Agregat Prevalensi Stunting untuk Dashboard Kabupaten/Desa
+Hitungan per periode (bulan), desa, kelompok umur dan jenis kelamin yang
+diperbarui inkremental setiap kali pengukuran disimpan ke registry
+
+Contoh:
+    python prevalence_aggregates.py child_registry.db --rebuild
+    python prevalence_aggregates.py child_registry.db --show --rolling 12
+"""
+
+import argparse
+from datetime import date
+
+import numpy as np
+import pandas as pd
+
+from child_registry import ChildRegistry
+
+
+# Kelompok umur (bulan): (batas bawah, batas atas eksklusif, label)
+AGE_BANDS = [
+    (0, 6, '0-5 bln'),
+    (6, 12, '6-11 bln'),
+    (12, 24, '12-23 bln'),
+    (24, 36, '24-35 bln'),
+    (36, 48, '36-47 bln'),
+    (48, 60, '48-59 bln'),
+    (60, None, '60+ bln')
+]
+
+# Batas Z-Score TB/U: stunting (< -2 SD, termasuk sangat pendek) dan sangat pendek (< -3 SD)
+STUNTED_CUTOFF = -2
+SEVERELY_STUNTED_CUTOFF = -3
+
+GROUP_COLUMNS = ['period', 'village', 'age_band', 'gender']
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS prevalence_counts (
+    period TEXT NOT NULL,
+    village TEXT NOT NULL,
+    age_band TEXT NOT NULL,
+    gender TEXT NOT NULL,
+    n_screened INTEGER NOT NULL DEFAULT 0,
+    n_stunted INTEGER NOT NULL DEFAULT 0,
+    n_severely_stunted INTEGER NOT NULL DEFAULT 0,
+    PRIMARY KEY (period, village, age_band, gender)
+) WITHOUT ROWID;
+"""
+
+UPSERT_SQL = """
+INSERT INTO prevalence_counts (period, village, age_band, gender, n_screened, n_stunted, n_severely_stunted)
+VALUES (?, ?, ?, ?, ?, ?, ?)
+ON CONFLICT (period, village, age_band, gender) DO UPDATE SET
+    n_screened = n_screened + excluded.n_screened,
+    n_stunted = n_stunted + excluded.n_stunted,
+    n_severely_stunted = n_severely_stunted + excluded.n_severely_stunted
+"""
+
+# Label untuk pengukuran tanpa desa
+UNKNOWN_VILLAGE = '(tidak diketahui)'
+
+
+def age_band_labels(age_months):
+    """Label kelompok umur untuk array umur (bulan), vektor"""
+    edges = np.array([band[0] for band in AGE_BANDS[1:]], dtype=np.float64)
+    labels = np.array([band[2] for band in AGE_BANDS], dtype=object)
+    return labels[np.searchsorted(edges, np.asarray(age_months, dtype=np.float64), side='right')]
+
+
+def _age_band_sql(column):
+    """Ekspresi CASE SQL yang setara dengan age_band_labels"""
+    cases = [f"WHEN {column} < {upper} THEN '{label}'" for _, upper, label in AGE_BANDS if upper is not None]
+    return f"CASE {' '.join(cases)} ELSE '{AGE_BANDS[-1][2]}' END"
+
+
+def _age_band_order_sql(column):
+    """Ekspresi CASE SQL posisi kelompok umur di AGE_BANDS (label teks tidak terurut secara leksikal)"""
+    cases = [f"WHEN '{label}' THEN {position}" for position, (_, _, label) in enumerate(AGE_BANDS)]
+    return f"CASE {column} {' '.join(cases)} ELSE {len(AGE_BANDS)} END"
+
+
+def shift_period(period, months):
+    """Geser periode 'YYYY-MM' sebanyak n bulan"""
+    year, month = map(int, period.split('-'))
+    index = year * 12 + (month - 1) + months
+    return f"{index // 12:04d}-{index % 12 + 1:02d}"
+
+
+class PrevalenceAggregates:
+    """
+    Lapisan agregasi prevalensi di atas ChildRegistry
+
+    Hitungan disimpan di tabel prevalence_counts pada database registry yang sama
+    dan diperbarui di dalam transaksi penyimpanan pengukuran, sehingga dashboard
+    hanya membaca baris agregat (jumlahnya bergantung pada desa x kelompok umur x
+    jenis kelamin x periode, bukan pada jumlah screening).
+    """
+
+    def __init__(self, registry):
+        self.registry = registry
+        self.registry.connection.executescript(SCHEMA)
+        self.registry.add_listener(self)
+
+    def on_measurements(self, conn, df):
+        """Update hitungan untuk pengukuran baru (dipanggil oleh registry)"""
+        counts = self._count(df)
+        conn.executemany(UPSERT_SQL, counts.itertuples(index=False, name=None))
+
+    def _count(self, df):
+        """Hitung agregat dari DataFrame pengukuran secara vektor"""
+        zscore = pd.to_numeric(df['zscore_hfa'], errors='coerce')
+        frame = pd.DataFrame({
+            'period': df['measured_at'].astype(str).str[:7],
+            'village': df['village'].fillna(UNKNOWN_VILLAGE).astype(str),
+            'age_band': age_band_labels(df['age_months']),
+            'gender': df['gender'].astype(str),
+            'n_screened': zscore.notna().astype(int),
+            'n_stunted': (zscore < STUNTED_CUTOFF).astype(int),
+            'n_severely_stunted': (zscore < SEVERELY_STUNTED_CUTOFF).astype(int)
+        })
+        counts = frame.groupby(GROUP_COLUMNS, sort=False, as_index=False).sum()
+        return counts.astype({col: int for col in ('n_screened', 'n_stunted', 'n_severely_stunted')})
+
+    def rebuild(self):
+        """
+        Hitung ulang seluruh agregat dari data mentah registry (satu query GROUP BY)
+
+        Returns: Jumlah baris agregat
+        """
+        with self.registry._write_lock, self.registry.connection as conn:
+            conn.execute("DELETE FROM prevalence_counts")
+            conn.execute(
+                f"""
+                INSERT INTO prevalence_counts
+                    (period, village, age_band, gender, n_screened, n_stunted, n_severely_stunted)
+                SELECT substr(m.measured_at, 1, 7),
+                       COALESCE(m.village, '{UNKNOWN_VILLAGE}'),
+                       {_age_band_sql('m.age_months')},
+                       c.gender,
+                       SUM(m.zscore_hfa IS NOT NULL),
+                       SUM(m.zscore_hfa < {STUNTED_CUTOFF}),
+                       SUM(m.zscore_hfa < {SEVERELY_STUNTED_CUTOFF})
+                FROM measurements m JOIN children c ON c.child_id = m.child_id
+                GROUP BY 1, 2, 3, 4
+                """
+            )
+            return conn.execute("SELECT COUNT(*) FROM prevalence_counts").fetchone()[0]
+
+    def list_periods(self):
+        """Daftar periode (YYYY-MM) yang tersedia, terbaru di akhir"""
+        rows = self.registry.connection.execute(
+            "SELECT DISTINCT period FROM prevalence_counts ORDER BY period"
+        ).fetchall()
+        return [row[0] for row in rows]
+
+    def list_villages(self):
+        """Daftar desa yang punya agregat"""
+        rows = self.registry.connection.execute(
+            "SELECT DISTINCT village FROM prevalence_counts ORDER BY village"
+        ).fetchall()
+        return [row[0] for row in rows]
+
+    def get_prevalence(self, start_period=None, end_period=None, by=('age_band', 'gender'), village=None):
+        """
+        Prevalensi stunting dari agregat
+
+        Parameters:
+        - start_period, end_period: Rentang periode 'YYYY-MM' (inklusif), None = semua
+        - by: Dimensi pengelompokan ('period', 'village', 'age_band', 'gender')
+        - village: Filter satu desa (opsional)
+
+        Returns: DataFrame n_screened, n_stunted, n_severely_stunted dan prevalensi (%)
+        """
+        by = [col for col in by if col in GROUP_COLUMNS]
+        conditions = ["period BETWEEN ? AND ?"]
+        params = [start_period or '0000-00', end_period or '9999-99']
+        if village is not None:
+            conditions.append("village = ?")
+            params.append(village)
+
+        select_by = ', '.join(by)
+        order_by = ', '.join(_age_band_order_sql(col) if col == 'age_band' else col for col in by)
+        df = pd.read_sql_query(
+            f"""
+            SELECT {select_by + ',' if by else ''}
+                   SUM(n_screened) AS n_screened,
+                   SUM(n_stunted) AS n_stunted,
+                   SUM(n_severely_stunted) AS n_severely_stunted
+            FROM prevalence_counts
+            WHERE {' AND '.join(conditions)}
+            {'GROUP BY ' + select_by if by else ''}
+            {'ORDER BY ' + order_by if by else ''}
+            """,
+            self.registry.connection, params=params
+        )
+        df[['n_screened', 'n_stunted', 'n_severely_stunted']] = (
+            df[['n_screened', 'n_stunted', 'n_severely_stunted']].fillna(0).astype(int)
+        )
+        with np.errstate(divide='ignore', invalid='ignore'):
+            df['prevalensi_stunting (%)'] = np.round(df['n_stunted'] / df['n_screened'] * 100, 1)
+            df['prevalensi_sangat_pendek (%)'] = np.round(df['n_severely_stunted'] / df['n_screened'] * 100, 1)
+        return df
+
+    def get_rolling_prevalence(self, months=12, end_period=None, by=('age_band', 'gender'), village=None):
+        """Prevalensi jendela bergulir n bulan terakhir sampai end_period (default: bulan ini)"""
+        end_period = end_period or date.today().strftime('%Y-%m')
+        start_period = shift_period(end_period, -(months - 1))
+        return self.get_prevalence(start_period, end_period, by=by, village=village)
+
+
+def main(argv=None):
+    """Entry point command line (rebuild / tampilkan agregat)"""
+    parser = argparse.ArgumentParser(description="Agregat prevalensi stunting dari registry anak")
+    parser.add_argument('db_path', help="File database registry (SQLite)")
+    parser.add_argument('--rebuild', action='store_true', help="Hitung ulang agregat dari data mentah")
+    parser.add_argument('--show', action='store_true', help="Tampilkan prevalensi per kelompok umur & jenis kelamin")
+    parser.add_argument('--rolling', type=int, default=12, help="Jendela bergulir (bulan) untuk --show")
+    args = parser.parse_args(argv)
+
+    aggregates = PrevalenceAggregates(ChildRegistry(args.db_path))
+
+    if args.rebuild:
+        n_rows = aggregates.rebuild()
+        print(f"✅ Agregat dibangun ulang: {n_rows} baris")
+
+    if args.show:
+        periods = aggregates.list_periods()
+        end_period = periods[-1] if periods else None
+        print(f"\n📊 Prevalensi {args.rolling} bulan terakhir (s.d. {end_period}):")
+        print(aggregates.get_rolling_prevalence(args.rolling, end_period=end_period).to_string(index=False))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,307 @@
+"""
+Penyimpanan Hasil Deteksi Hemat Memori
+Dengan ratusan sesi bersamaan, memori worker harus bisa diperkirakan:
+
+- CompactResult: record hasil di session_state hanya berisi ID dan angka; teks status,
+  interpretasi, rekomendasi dan tingkat risiko diambil dari tabel bersama saat render
+- PDFStore: byte laporan PDF dipakai bersama antar rerun & sesi dengan batas byte (LRU)
+- SessionMemory: akuntansi ukuran session_state per sesi
+
+Perkiraan memori worker = jumlah byte semua sesi + batas PDFStore + model resident.
+"""
+
+import sys
+import threading
+import time
+from collections import OrderedDict, namedtuple
+
+import numpy as np
+
+from z_score_calculator import (HFA_ADULT_OFFSET, HFA_INTERPRETATIONS, HFA_LABELS, HFA_NORMAL,
+                                HFA_RECOMMENDATIONS, HFA_UNKNOWN, classify_hfa_codes, encode_gender)
+from knn_model_trainer import RISK_LEVELS, risk_level_code
+
+GENDERS = ('laki-laki', 'perempuan')
+
+# Urutan indikator berat badan di CompactResult.weight_zscores
+WEIGHT_INDICATORS = ('wfa', 'wfh', 'bfa')
+
+# Nama default jika nama anak tidak diisi (tidak disimpan di record)
+DEFAULT_CHILD_NAME = "Anak"
+
+CompactResult = namedtuple('CompactResult', [
+    'audit_id', 'analyzed_at', 'child_id', 'child_name', 'age_months', 'sex_code', 'height_cm', 'weight_kg',
+    'zscore', 'hfa_code', 'weight_zscores', 'knn', 'age_days'
+], defaults=(None,))
+
+# Hasil KNN ringkas (juga untuk input di luar distribusi, agar jarak & versi model tetap tercatat)
+CompactKNN = namedtuple('CompactKNN', [
+    'model_region', 'model_version', 'classes', 'probabilities', 'risk_percentage', 'confidence',
+    'neighbor_indices', 'neighbor_distances', 'ood_threshold'
+])
+
+_CLASS_TABLES = {}
+_CLASS_TABLES_LOCK = threading.Lock()
+
+
+def shared_classes(classes):
+    """Tuple nama kelas bersama: semua sesi dengan model sejenis memakai objek yang sama"""
+    key = tuple(str(name) for name in classes)
+    with _CLASS_TABLES_LOCK:
+        return _CLASS_TABLES.setdefault(key, key)
+
+
+# -------------------------------------------------
+# Record hasil ringkas
+# -------------------------------------------------
+
+def compact_result(age_months, gender, height_cm, weight_kg, zscore, is_adult, weight_zscores=None,
+                   knn_prediction=None, ood_threshold=None, child_id=None, child_name=None,
+                   audit_id=None, analyzed_at=None, age_days=None):
+    """
+    Susun CompactResult dari hasil analisis
+
+    Parameters:
+    - weight_zscores: Dict {'wfa'|'wfh'|'bfa': Z-Score} atau None (usia > 60 bulan)
+    - knn_prediction: Dict hasil StuntingKNNModel.predict + model_version/model_region, atau None
+    - ood_threshold: Ambang jarak OOD jika prediksi di luar distribusi (knn tidak ditampilkan)
+    """
+    knn = None
+    if knn_prediction is not None:
+        knn = CompactKNN(
+            model_region=knn_prediction.get('model_region'),
+            model_version=knn_prediction.get('model_version'),
+            classes=shared_classes(knn_prediction['probabilities'].keys()),
+            probabilities=np.fromiter(knn_prediction['probabilities'].values(), dtype=np.float32),
+            risk_percentage=float(knn_prediction['risk_percentage']),
+            confidence=float(knn_prediction['confidence']),
+            neighbor_indices=np.asarray(knn_prediction['neighbor_indices'], dtype=np.int32),
+            neighbor_distances=np.asarray(knn_prediction['neighbor_distances'], dtype=np.float32),
+            ood_threshold=float(ood_threshold) if knn_prediction['out_of_distribution'] else None
+        )
+
+    return CompactResult(
+        audit_id=audit_id,
+        analyzed_at=analyzed_at or time.time(),
+        child_id=child_id or None,
+        child_name=child_name or None,
+        age_months=int(age_months),
+        sex_code=int(encode_gender(gender)),
+        height_cm=float(height_cm),
+        weight_kg=float(weight_kg),
+        zscore=float(zscore),
+        hfa_code=int(classify_hfa_codes(zscore, is_adult)),
+        weight_zscores=(tuple(float(weight_zscores.get(code, np.nan)) for code in WEIGHT_INDICATORS)
+                        if weight_zscores is not None else None),
+        knn=knn,
+        age_days=int(age_days) if age_days is not None else None
+    )
+
+
+def expand_result(record, calculator, resolve_model=None):
+    """
+    Dict hasil lengkap untuk render/PDF/log audit (dibuat ulang tiap script run, tidak disimpan)
+
+    Teks berasal dari tabel read-only bersama, bukan salinan per sesi.
+
+    Parameters:
+    - calculator: WHOZScoreCalculator (label kategori indikator berat badan)
+    - resolve_model: Fungsi (model_region, model_version) -> ModelHandle atau None;
+                     dipakai untuk tetangga terdekat dan kartu model (dilewati jika None)
+    """
+    code = record.hfa_code
+    status = HFA_LABELS[code] if code != HFA_UNKNOWN else None
+
+    weight_indicators = None
+    if record.weight_zscores is not None:
+        weight_indicators = {}
+        for indicator, value in zip(WEIGHT_INDICATORS, record.weight_zscores):
+            if np.isnan(value):
+                continue
+            indicator_code = int(calculator.indicator_codes(indicator, value))
+            weight_indicators[indicator] = {
+                'zscore': value,
+                'status': calculator.indicators[indicator]['labels'][indicator_code]
+            }
+
+    knn_result = knn_out_of_distribution = risk_interpretation = model_card = None
+    knn = record.knn
+    if knn is not None:
+        handle = resolve_model(knn.model_region, knn.model_version) if resolve_model else None
+        model_card = handle.model.model_card if handle is not None else None
+        if knn.ood_threshold is not None:
+            knn_out_of_distribution = {
+                'mean_distance': float(knn.neighbor_distances.mean()),
+                'threshold': knn.ood_threshold
+            }
+        else:
+            knn_result = {
+                'prediction': knn.classes[int(knn.probabilities.argmax())],
+                'probabilities': dict(zip(knn.classes, knn.probabilities.tolist())),
+                'risk_percentage': knn.risk_percentage,
+                'neighbor_distances': [round(d, 4) for d in knn.neighbor_distances.tolist()],
+                'confidence': knn.confidence,
+                'out_of_distribution': False,
+                'model_version': knn.model_version,
+                'model_region': knn.model_region
+            }
+            if handle is not None:
+                knn_result['neighbors'] = handle.model.neighbor_rows(knn.neighbor_distances, knn.neighbor_indices)
+            risk_interpretation = RISK_LEVELS[risk_level_code(knn.risk_percentage)]
+
+    return {
+        'audit_id': record.audit_id,
+        'analyzed_at': record.analyzed_at,
+        'child_id': record.child_id,
+        'child_name': record.child_name or DEFAULT_CHILD_NAME,
+        'age_months': record.age_months,
+        'age_days': record.age_days,
+        'gender': GENDERS[record.sex_code],
+        'height_cm': record.height_cm,
+        'weight_kg': record.weight_kg,
+        'zscore': record.zscore,
+        'is_adult': code >= HFA_ADULT_OFFSET,
+        'who_status': status,
+        'who_interpretation': HFA_INTERPRETATIONS[code] if code != HFA_UNKNOWN else None,
+        'who_recommendation': HFA_RECOMMENDATIONS[code if code != HFA_UNKNOWN else HFA_NORMAL],
+        'weight_indicators': weight_indicators,
+        'knn_result': knn_result,
+        'knn_out_of_distribution': knn_out_of_distribution,
+        'knn_model_card': model_card,
+        'risk_interpretation': risk_interpretation
+    }
+
+
+# -------------------------------------------------
+# Store PDF bersama
+# -------------------------------------------------
+
+class PDFStore:
+    """
+    Cache byte laporan PDF per hasil (key = audit_id) dengan batas total byte, LRU
+
+    Laporan yang ter-evict dibuat ulang saat diminta lagi (isi deterministik dari record).
+    """
+
+    def __init__(self, max_bytes=32 * 1024 * 1024):
+        self.max_bytes = max_bytes
+        self._cache = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self.stats = {'hits': 0, 'misses': 0, 'evictions': 0}
+
+    def get(self, key):
+        """Byte PDF untuk key; None jika belum dibuat atau sudah ter-evict"""
+        with self._lock:
+            data = self._cache.get(key)
+            if data is not None:
+                self._cache.move_to_end(key)
+                self.stats['hits'] += 1
+            return data
+
+    def get_or_create(self, key, build):
+        """Byte PDF untuk key; `build()` (-> bytes) dipanggil di luar lock jika belum ada"""
+        with self._lock:
+            data = self._cache.get(key)
+            if data is not None:
+                self._cache.move_to_end(key)
+                self.stats['hits'] += 1
+                return data
+            self.stats['misses'] += 1
+
+        data = build()
+        with self._lock:
+            # Satu laporan yang melebihi batas tidak disimpan
+            if key not in self._cache and len(data) <= self.max_bytes:
+                self._cache[key] = data
+                self._bytes += len(data)
+                self._evict()
+        return data
+
+    def _evict(self):
+        while self._bytes > self.max_bytes:
+            _, data = self._cache.popitem(last=False)
+            self._bytes -= len(data)
+            self.stats['evictions'] += 1
+
+    @property
+    def nbytes(self):
+        return self._bytes
+
+    def __len__(self):
+        return len(self._cache)
+
+
+# -------------------------------------------------
+# Akuntansi memori sesi
+# -------------------------------------------------
+
+def deep_sizeof(obj, _seen=None):
+    """
+    Perkiraan byte objek beserta isinya (dict, list, tuple, set, array NumPy)
+
+    Objek bersama (tabel kelas dari shared_classes) tidak dihitung karena bukan milik sesi.
+    """
+    if _seen is None:
+        with _CLASS_TABLES_LOCK:
+            _seen = {id(table) for table in _CLASS_TABLES.values()}
+    if id(obj) in _seen:
+        return 0
+    _seen.add(id(obj))
+
+    if isinstance(obj, np.ndarray):
+        return sys.getsizeof(obj) + (obj.nbytes if obj.base is not None else 0)
+    size = sys.getsizeof(obj)
+    if isinstance(obj, dict):
+        size += sum(deep_sizeof(key, _seen) + deep_sizeof(value, _seen) for key, value in obj.items())
+    elif isinstance(obj, (list, tuple, set, frozenset)):
+        size += sum(deep_sizeof(item, _seen) for item in obj)
+    elif hasattr(obj, 'getbuffer'):
+        size += obj.getbuffer().nbytes
+    return size
+
+
+class SessionMemory:
+    """
+    Ukuran session_state per sesi, diperbarui setiap script run
+
+    Sesi yang tidak aktif lebih dari `ttl` detik dibuang dari tabel (Streamlit tidak
+    memberi tahu saat sesi berakhir).
+    """
+
+    def __init__(self, ttl=3600):
+        self.ttl = ttl
+        self._sessions = {}
+        self._lock = threading.Lock()
+
+    def update(self, session_id, state):
+        """Hitung ukuran tiap key session_state untuk satu sesi"""
+        sizes = {str(key): deep_sizeof(value) for key, value in state.items()}
+        now = time.time()
+        with self._lock:
+            self._sessions[session_id] = (now, sizes)
+            expired = [sid for sid, (seen, _) in self._sessions.items() if now - seen > self.ttl]
+            for sid in expired:
+                del self._sessions[sid]
+        return sum(sizes.values())
+
+    def sessions(self):
+        """Daftar sesi (terbesar dulu): byte total dan key terbesar"""
+        with self._lock:
+            items = list(self._sessions.items())
+        rows = []
+        for session_id, (seen, sizes) in items:
+            largest = max(sizes, key=sizes.get) if sizes else None
+            rows.append({'session': session_id, 'last_seen': seen, 'bytes': sum(sizes.values()),
+                         'keys': len(sizes), 'largest_key': largest,
+                         'largest_bytes': sizes[largest] if largest else 0})
+        return sorted(rows, key=lambda row: -row['bytes'])
+
+    def summary(self):
+        totals = [row['bytes'] for row in self.sessions()]
+        return {
+            'sessions': len(totals),
+            'total_bytes': int(sum(totals)),
+            'max_bytes': int(max(totals)) if totals else 0,
+            'mean_bytes': float(np.mean(totals)) if totals else 0.0
+        }
@@ -0,0 +1,418 @@
+"""
+Log Audit Screening (Append-Only)
+Mencatat setiap analisis (input, Z-Score, status WHO, probabilitas KNN, versi model,
+waktu) ke file JSON lines melalui writer di background thread
+
+- Thread request hanya memasukkan record ke antrean (tidak pernah menunggu disk)
+- Writer menulis per batch lalu fsync setiap `flush_interval` detik, sehingga crash
+  kehilangan paling banyak satu interval
+- Setiap proses menulis segmen aktifnya sendiri (host-pid), sehingga beberapa proses
+  Streamlit aman memakai folder log yang sama
+- Segmen aktif dirotasi saat melewati `max_bytes`; segmen tertutup dikompaksi menjadi
+  arsip gzip harian (record tidak pernah diubah, hanya dipindah). Kompaksi diserialkan
+  antar proses dengan file lock dan tidak pernah menyentuh segmen aktif
+
+Layout:
+    logs/screening/active/screening-<host>-<pid>.jsonl               # segmen aktif per proses
+    logs/screening/screening-20261019T101500-<host>-<pid>-000003.jsonl  # segmen tertutup
+    logs/screening/screening-20261019.jsonl.gz                       # arsip harian hasil kompaksi
+
+Contoh:
+    python screening_log.py export hasil_audit.csv --since 2026-10-01
+    python screening_log.py compact
+"""
+
+import argparse
+import atexit
+import glob
+import gzip
+import json
+import os
+import queue
+import shutil
+import socket
+import sys
+import threading
+import uuid
+from contextlib import contextmanager
+from datetime import datetime
+
+import numpy as np
+
+try:
+    import fcntl
+except ImportError:  # Windows: tanpa lock antar proses (deployment satu proses)
+    fcntl = None
+
+CURRENT_DIR = os.path.dirname(os.path.abspath(__file__))
+DEFAULT_LOG_DIR = os.path.join(CURRENT_DIR, 'logs', 'screening')
+
+ACTIVE_DIR = 'active'
+LEGACY_ACTIVE_FILE = 'screening.jsonl'     # segmen aktif bersama (versi lama), hanya dibaca
+SEGMENT_PREFIX = 'screening-'
+LOCK_FILE = '.compact.lock'
+
+
+def writer_id():
+    return f"{socket.gethostname()}-{os.getpid()}"
+
+
+def _pid_alive(pid):
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+
+def _to_json(value):
+    """Konversi nilai NumPy ke tipe JSON"""
+    if isinstance(value, np.generic):
+        return value.item()
+    if isinstance(value, np.ndarray):
+        return value.tolist()
+    return str(value)
+
+
+def screening_record(result):
+    """
+    Record audit dari dict hasil deteksi (st.session_state.detection_result)
+
+    Hanya field yang relevan untuk audit; rekomendasi teks tidak disimpan.
+    """
+    knn_result = result.get('knn_result') or {}
+    return {
+        'child_id': result.get('child_id'),
+        'inputs': {
+            'age_months': result.get('age_months'),
+            'age_days': result.get('age_days'),
+            'gender': result.get('gender'),
+            'height_cm': result.get('height_cm'),
+            'weight_kg': result.get('weight_kg'),
+            'region_code': knn_result.get('model_region')
+        },
+        'zscore': result.get('zscore'),
+        'is_adult': result.get('is_adult'),
+        'who_status': result.get('who_status'),
+        'weight_indicators': result.get('weight_indicators'),
+        'knn': {
+            'prediction': knn_result.get('prediction'),
+            'probabilities': knn_result.get('probabilities'),
+            'risk_percentage': knn_result.get('risk_percentage'),
+            'confidence': knn_result.get('confidence'),
+            'model_version': knn_result.get('model_version'),
+            'model_region': knn_result.get('model_region')
+        } if knn_result else None,
+        'knn_out_of_distribution': result.get('knn_out_of_distribution')
+    }
+
+
+class ScreeningLog:
+    """
+    Log audit append-only dengan writer background
+
+    Pemakaian:
+        log = ScreeningLog('logs/screening').start()
+        log.append(screening_record(result))   # tidak blocking
+        log.close()                             # flush sisa antrean
+    """
+
+    def __init__(self, log_dir=DEFAULT_LOG_DIR, flush_interval=1.0, max_batch=500,
+                 max_bytes=64 * 1024 * 1024, compact_after=2):
+        self.log_dir = log_dir
+        self.flush_interval = flush_interval
+        self.max_batch = max_batch
+        self.max_bytes = max_bytes
+        self.compact_after = compact_after
+        self._queue = queue.SimpleQueue()
+        self._stop_event = threading.Event()
+        self._thread = None
+        self._file = None
+        self._segment_seq = 0
+        self.writer = writer_id()
+        self.stats = {'written': 0, 'flushes': 0, 'rotations': 0, 'compactions': 0,
+                      'write_errors': 0, 'last_flush': None}
+
+    @property
+    def active_dir(self):
+        return os.path.join(self.log_dir, ACTIVE_DIR)
+
+    @property
+    def active_path(self):
+        """Segmen aktif milik proses ini (tidak pernah ditulis proses lain)"""
+        return os.path.join(self.active_dir, f"{SEGMENT_PREFIX}{self.writer}.jsonl")
+
+    def active_segments(self):
+        """Segmen aktif semua proses (termasuk file bersama versi lama)"""
+        paths = sorted(glob.glob(os.path.join(self.active_dir, f"{SEGMENT_PREFIX}*.jsonl")))
+        return paths + [os.path.join(self.log_dir, LEGACY_ACTIVE_FILE)]
+
+    def start(self):
+        if self._thread is None:
+            os.makedirs(self.active_dir, exist_ok=True)
+            self._thread = threading.Thread(target=self._run, name='screening-log-writer', daemon=True)
+            self._thread.start()
+            atexit.register(self.close)
+        return self
+
+    # -------------------------------------------------
+    # Sisi request (tidak pernah menyentuh disk)
+    # -------------------------------------------------
+
+    def append(self, record):
+        """Masukkan record ke antrean; id & timestamp ditambahkan di sini (waktu analisis)"""
+        record = {
+            'id': uuid.uuid4().hex,
+            'timestamp': datetime.now().isoformat(timespec='milliseconds'),
+            **record
+        }
+        self._queue.put(record)
+        return record['id']
+
+    @property
+    def pending(self):
+        return self._queue.qsize()
+
+    # -------------------------------------------------
+    # Writer background
+    # -------------------------------------------------
+
+    def _drain(self):
+        batch = []
+        while len(batch) < self.max_batch:
+            try:
+                batch.append(self._queue.get_nowait())
+            except queue.Empty:
+                break
+        return batch
+
+    def _run(self):
+        while not self._stop_event.wait(self.flush_interval):
+            self._flush_pending()
+        self._flush_pending()
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+    def _flush_pending(self):
+        """Tulis semua record di antrean per batch; fsync sekali per interval (dan sebelum rotasi)"""
+        wrote = False
+        while True:
+            batch = self._drain()
+            if not batch:
+                break
+            try:
+                self._write_batch(batch)
+                wrote = True
+                if self._file.tell() >= self.max_bytes:
+                    self._sync()
+                    wrote = False
+                    self.rotate()
+            except OSError as e:
+                # Record dikembalikan ke antrean dan dicoba lagi di interval berikutnya
+                self.stats['write_errors'] += 1
+                print(f"⚠️ Gagal menulis log screening: {e}")
+                for record in batch:
+                    self._queue.put(record)
+                return
+        if wrote:
+            self._sync()
+
+    def _write_batch(self, batch):
+        if self._file is None:
+            self._file = open(self.active_path, 'a', encoding='utf-8')
+        self._file.write(''.join(json.dumps(record, default=_to_json, ensure_ascii=False) + '\n'
+                                 for record in batch))
+        self.stats['written'] += len(batch)
+
+    def _sync(self):
+        self._file.flush()
+        os.fsync(self._file.fileno())
+        self.stats['flushes'] += 1
+        self.stats['last_flush'] = datetime.now().isoformat(timespec='seconds')
+
+    # -------------------------------------------------
+    # Rotasi & kompaksi
+    # -------------------------------------------------
+
+    def rotate(self):
+        """Tutup segmen aktif dan ganti nama menjadi segmen bertanggal (dipanggil dari writer)"""
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+        segment = self._close_segment(self.active_path, self.writer)
+        if segment is None:
+            return None
+        self.stats['rotations'] += 1
+        # Writer tidak menunggu: jika proses lain sedang kompaksi, segmen ikut di kompaksi berikutnya
+        self.compact(wait=False)
+        return segment
+
+    def _close_segment(self, active_path, writer):
+        """Ganti nama segmen aktif (yang sudah tidak ditulis) menjadi segmen tertutup"""
+        if not os.path.exists(active_path) or os.path.getsize(active_path) == 0:
+            return None
+        # Nama unik walau proses di-restart pada detik yang sama (segmen lama tidak boleh tertimpa)
+        while True:
+            self._segment_seq += 1
+            segment = os.path.join(
+                self.log_dir,
+                f"{SEGMENT_PREFIX}{datetime.now():%Y%m%dT%H%M%S}-{writer}-{self._segment_seq:06d}.jsonl"
+            )
+            if not os.path.exists(segment):
+                break
+        try:
+            os.replace(active_path, segment)
+        except FileNotFoundError:
+            # Segmen yatim sudah diambil alih proses lain
+            return None
+        return segment
+
+    def adopt_orphans(self):
+        """
+        Tutup segmen aktif milik proses yang sudah mati di host ini (crash / restart)
+
+        Segmen proses di host lain tidak disentuh karena statusnya tidak bisa dicek;
+        record di dalamnya tetap terbaca oleh iter_records.
+        """
+        host_prefix = f"{SEGMENT_PREFIX}{socket.gethostname()}-"
+        adopted = 0
+        for path in glob.glob(os.path.join(self.active_dir, f"{host_prefix}*.jsonl")):
+            pid = os.path.basename(path)[len(host_prefix):-len('.jsonl')]
+            if not pid.isdigit() or int(pid) == os.getpid() or _pid_alive(int(pid)):
+                continue
+            if self._close_segment(path, f"{socket.gethostname()}-{pid}") is not None:
+                adopted += 1
+        return adopted
+
+    @contextmanager
+    def _compact_lock(self, wait=True):
+        """File lock antar proses untuk kompaksi; menghasilkan False jika sedang dipegang proses lain"""
+        with open(os.path.join(self.log_dir, LOCK_FILE), 'a') as lock_file:
+            if fcntl is None:
+                yield True
+                return
+            try:
+                fcntl.flock(lock_file, fcntl.LOCK_EX | (0 if wait else fcntl.LOCK_NB))
+            except BlockingIOError:
+                yield False
+                return
+            try:
+                yield True
+            finally:
+                fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+    def closed_segments(self):
+        return sorted(glob.glob(os.path.join(self.log_dir, f"{SEGMENT_PREFIX}*T*.jsonl")))
+
+    def compact(self, keep=None, wait=True):
+        """
+        Pindahkan segmen tertutup (kecuali `keep` terbaru) ke arsip gzip harian
+
+        Hanya segmen tertutup yang dikompaksi (tidak ada writer yang masih membukanya).
+        Arsip ditambah sebagai member gzip baru lalu di-fsync sebelum segmen dihapus;
+        jika proses mati di antaranya, record duplikat dibuang saat dibaca (id unik).
+
+        wait=False: lewati jika proses lain sedang kompaksi (dipakai writer)
+        """
+        if not os.path.isdir(self.log_dir):
+            return 0
+        keep = self.compact_after if keep is None else keep
+        with self._compact_lock(wait) as locked:
+            if not locked:
+                return 0
+            self.adopt_orphans()
+            segments = self.closed_segments()
+            segments = segments[:len(segments) - keep] if keep else segments
+            for segment in segments:
+                day = os.path.basename(segment)[len(SEGMENT_PREFIX):len(SEGMENT_PREFIX) + 8]
+                archive = os.path.join(self.log_dir, f"{SEGMENT_PREFIX}{day}.jsonl.gz")
+                with open(segment, 'rb') as source, open(archive, 'ab') as raw:
+                    with gzip.GzipFile(fileobj=raw, mode='ab') as target:
+                        shutil.copyfileobj(source, target)
+                    raw.flush()
+                    os.fsync(raw.fileno())
+                os.remove(segment)
+                self.stats['compactions'] += 1
+        return len(segments)
+
+    def close(self):
+        """Hentikan writer setelah semua record di antrean ditulis"""
+        if self._thread is not None:
+            self._stop_event.set()
+            self._thread.join()
+            self._thread = None
+
+    # -------------------------------------------------
+    # Pembacaan
+    # -------------------------------------------------
+
+    def iter_records(self, since=None, until=None):
+        """Semua record (arsip, segmen tertutup, segmen aktif semua proses), tanpa duplikat"""
+        archives = sorted(glob.glob(os.path.join(self.log_dir, f"{SEGMENT_PREFIX}*.jsonl.gz")))
+        paths = archives + self.closed_segments() + self.active_segments()
+        seen = set()
+        for path in paths:
+            if not os.path.exists(path):
+                continue
+            opener = gzip.open if path.endswith('.gz') else open
+            with opener(path, 'rt', encoding='utf-8') as f:
+                for line in f:
+                    try:
+                        record = json.loads(line)
+                    except json.JSONDecodeError:
+                        # Baris terakhir yang terpotong saat crash
+                        continue
+                    if record['id'] in seen:
+                        continue
+                    seen.add(record['id'])
+                    if since and record['timestamp'] < since:
+                        continue
+                    if until and record['timestamp'] >= until:
+                        continue
+                    yield record
+
+
+def export_records(records, output_path):
+    """Ekspor record ke CSV (kolom bersarang diratakan) atau JSON lines"""
+    import pandas as pd
+
+    records = list(records)
+    if output_path.endswith('.jsonl'):
+        with open(output_path, 'w', encoding='utf-8') as f:
+            for record in records:
+                f.write(json.dumps(record, ensure_ascii=False) + '\n')
+    else:
+        pd.json_normalize(records).to_csv(output_path, index=False)
+    return len(records)
+
+
+def main(argv=None):
+    """Entry point command line"""
+    parser = argparse.ArgumentParser(description="Log audit screening stunting")
+    parser.add_argument('--log-dir', default=os.environ.get('STUNTING_SCREENING_LOG_DIR', DEFAULT_LOG_DIR))
+    subparsers = parser.add_subparsers(dest='command', required=True)
+
+    export_parser = subparsers.add_parser('export', help="Ekspor record ke CSV / JSONL")
+    export_parser.add_argument('output')
+    export_parser.add_argument('--since', default=None, help="Mulai tanggal (ISO, mis. 2026-10-01)")
+    export_parser.add_argument('--until', default=None, help="Sebelum tanggal (ISO)")
+
+    compact_parser = subparsers.add_parser('compact', help="Kompaksi semua segmen tertutup ke arsip harian")
+    compact_parser.add_argument('--keep', type=int, default=0, help="Jumlah segmen terbaru yang tidak dikompaksi")
+    args = parser.parse_args(argv)
+
+    log = ScreeningLog(args.log_dir)
+    if args.command == 'export':
+        n = export_records(log.iter_records(args.since, args.until), args.output)
+        print(f"💾 {n} record diekspor ke {args.output}")
+    else:
+        n = log.compact(keep=args.keep)
+        print(f"🗜️ {n} segmen dikompaksi")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,313 @@
+"""
+Serving Model KNN Lewat Memori Bersama
+Saat beberapa proses Streamlit dijalankan (satu per core), setiap proses biasanya memuat
+salinan data training/indeks KNN sendiri. Mode ini memisahkan pemuatan dan pemakaian:
+
+- Satu proses loader mempublikasikan indeks ringkas sebagai array .npy mentah ke folder
+  bersama (default tmpfs /dev/shm), beserta file model kecil (scaler, encoder, metadata)
+- Setiap proses app memetakan array itu read-only (mmap): halaman memorinya dibagi oleh
+  semua proses, sehingga menambah worker hampir tidak menambah memori model
+- Handshake berversi: CURRENT.json (format + versi + slot + shape/dtype array) ditulis
+  atomik; ModelManager di tiap proses mendeteksi slot baru, memvalidasi, smoke test, lalu
+  menukar model tanpa restart dan mencatat slot yang dipakainya di readers/
+- Slot lama dihapus hanya jika tidak lagi dipakai proses yang masih hidup
+
+Layout:
+    /dev/shm/stunting-models/CURRENT.json
+    /dev/shm/stunting-models/slots/<versi>-<token>/compact_index/*.npy
+    /dev/shm/stunting-models/readers/<host>-<pid>.json
+
+Contoh:
+    python shared_model.py publish --models models     # publikasikan model aktif sekali
+    python shared_model.py serve --models models       # loader: publikasi ulang setiap ada versi baru
+    python shared_model.py status
+    STUNTING_SHARED_MODEL_DIR=/dev/shm/stunting-models streamlit run app.py --server.port 8501
+"""
+
+import argparse
+import json
+import os
+import pickle
+import re
+import shutil
+import socket
+import sys
+import time
+import uuid
+from datetime import datetime
+
+from compact_knn import COMPACT_INDEX_DIR, INDEX_PARAMS_FILE, CompactKNNIndex
+from drift_monitor import DRIFT_REFERENCE_FILE
+from model_evaluation import MODEL_CARD_FILE
+
+CURRENT_DIR = os.path.dirname(os.path.abspath(__file__))
+
+# Versi layout/handshake; proses app menolak manifest dengan format lain
+SHARED_FORMAT = 1
+
+CURRENT_FILE = 'CURRENT.json'
+SLOTS_DIR = 'slots'
+READERS_DIR = 'readers'
+
+# File model kecil yang disalin ke slot (dimuat biasa oleh setiap proses); metadata dan
+# referensi drift ditulis dari model yang sudah dimuat loader agar tidak dihitung ulang per proses
+MODEL_FILES = ('scaler.pkl', 'encoders.pkl', MODEL_CARD_FILE)
+
+
+def default_shared_dir():
+    """Folder bersama default: tmpfs /dev/shm jika ada (tanpa I/O disk), selain itu models/shared"""
+    if os.path.isdir('/dev/shm'):
+        return '/dev/shm/stunting-models'
+    return os.path.join(CURRENT_DIR, 'models', 'shared')
+
+
+def _write_json_atomic(path, data):
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump(data, f, indent=2, ensure_ascii=False)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp_path, path)
+
+
+# -------------------------------------------------
+# Sisi proses app (reader)
+# -------------------------------------------------
+
+def read_manifest(shared_dir):
+    """
+    Manifest versi aktif
+
+    Returns: Dict manifest, atau None jika belum ada yang dipublikasikan
+    Raises: ValueError jika format manifest tidak didukung proses ini
+    """
+    path = os.path.join(shared_dir, CURRENT_FILE)
+    if not os.path.exists(path):
+        return None
+    with open(path, 'r', encoding='utf-8') as f:
+        manifest = json.load(f)
+    if manifest.get('format') != SHARED_FORMAT:
+        raise ValueError(f"Format model bersama {manifest.get('format')} tidak didukung (butuh {SHARED_FORMAT})")
+    return manifest
+
+
+def slot_path(shared_dir, slot):
+    return os.path.join(shared_dir, SLOTS_DIR, slot)
+
+
+def verify_slot(shared_dir, manifest):
+    """
+    Cocokkan spesifikasi array di slot dengan manifest (mencegah memakai slot yang tertukar)
+
+    Raises: ValueError jika tidak cocok
+    """
+    with open(os.path.join(slot_path(shared_dir, manifest['slot']), COMPACT_INDEX_DIR, INDEX_PARAMS_FILE),
+              'r', encoding='utf-8') as f:
+        arrays = json.load(f)['arrays']
+    if arrays != manifest['arrays']:
+        raise ValueError(f"Slot {manifest['slot']} tidak sesuai manifest")
+
+
+def reader_id():
+    return f"{socket.gethostname()}-{os.getpid()}"
+
+
+def register_reader(shared_dir, manifest):
+    """Catat slot yang sedang dipakai proses ini (dibaca publisher sebelum menghapus slot lama)"""
+    readers_dir = os.path.join(shared_dir, READERS_DIR)
+    os.makedirs(readers_dir, exist_ok=True)
+    _write_json_atomic(os.path.join(readers_dir, f"{reader_id()}.json"), {
+        'host': socket.gethostname(),
+        'pid': os.getpid(),
+        'slot': manifest['slot'],
+        'version': manifest['version'],
+        'attached_at': datetime.now().isoformat(timespec='seconds')
+    })
+
+
+def _pid_alive(pid):
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+
+def live_readers(shared_dir, prune=False):
+    """
+    Proses app yang terdaftar dan masih hidup (proses di host lain dianggap hidup)
+
+    prune=True: hapus file reader milik proses yang sudah mati
+    """
+    readers_dir = os.path.join(shared_dir, READERS_DIR)
+    if not os.path.isdir(readers_dir):
+        return []
+    host = socket.gethostname()
+    readers = []
+    for name in sorted(os.listdir(readers_dir)):
+        path = os.path.join(readers_dir, name)
+        if not name.endswith('.json'):
+            continue
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                reader = json.load(f)
+        except (OSError, ValueError):
+            continue
+        if reader['host'] == host and not _pid_alive(reader['pid']):
+            if prune:
+                os.remove(path)
+            continue
+        readers.append(reader)
+    return readers
+
+
+# -------------------------------------------------
+# Sisi loader (publisher)
+# -------------------------------------------------
+
+def publish(handle, shared_dir, keep=2):
+    """
+    Publikasikan model (ModelHandle dari ModelManager) sebagai slot baru lalu arahkan CURRENT.json
+
+    Slot ditulis lengkap (fsync) di folder sementara lalu di-rename sebelum manifest diganti,
+    sehingga proses app tidak pernah melihat slot setengah jadi.
+
+    Returns: Dict manifest yang dipublikasikan
+    """
+    knn_model = handle.model
+    index = knn_model.compact_index
+    if index is None:
+        index = CompactKNNIndex.from_model(knn_model.model)
+
+    slots_dir = os.path.join(shared_dir, SLOTS_DIR)
+    os.makedirs(slots_dir, exist_ok=True)
+    slot = f"{re.sub(r'[^0-9A-Za-z]+', '', str(handle.version))}-{uuid.uuid4().hex[:8]}"
+    tmp_dir = os.path.join(slots_dir, f".tmp-{slot}")
+    os.makedirs(tmp_dir)
+    for name in MODEL_FILES:
+        source = os.path.join(handle.model_dir, name)
+        if os.path.exists(source):
+            shutil.copy2(source, os.path.join(tmp_dir, name))
+    with open(os.path.join(tmp_dir, 'model_metadata.pkl'), 'wb') as f:
+        pickle.dump(knn_model.metadata, f)
+    if knn_model.drift_monitor is not None:
+        knn_model.drift_monitor.reference.save(os.path.join(tmp_dir, DRIFT_REFERENCE_FILE))
+    arrays = index.save_arrays(os.path.join(tmp_dir, COMPACT_INDEX_DIR))
+    os.rename(tmp_dir, slot_path(shared_dir, slot))
+
+    manifest = {
+        'format': SHARED_FORMAT,
+        'version': handle.version,
+        'slot': slot,
+        'published_at': datetime.now().isoformat(timespec='seconds'),
+        'source': os.path.abspath(handle.model_dir),
+        'nbytes': int(index.nbytes),
+        'arrays': arrays
+    }
+    _write_json_atomic(os.path.join(shared_dir, CURRENT_FILE), manifest)
+    print(f"📦 Versi {handle.version} dipublikasikan ke memori bersama: {slot_path(shared_dir, slot)}")
+    collect_garbage(shared_dir, keep=keep)
+    return manifest
+
+
+def collect_garbage(shared_dir, keep=2):
+    """
+    Hapus slot lama yang tidak dipakai proses hidup mana pun (`keep` slot terbaru selalu disimpan)
+
+    Proses yang masih memetakan file slot yang terhapus tetap aman (POSIX: data dilepas
+    setelah mapping terakhir ditutup). Returns: Daftar slot yang dihapus
+    """
+    slots_dir = os.path.join(shared_dir, SLOTS_DIR)
+    if not os.path.isdir(slots_dir):
+        return []
+    manifest = read_manifest(shared_dir)
+    in_use = {reader['slot'] for reader in live_readers(shared_dir, prune=True)}
+    if manifest:
+        in_use.add(manifest['slot'])
+
+    slots = sorted((name for name in os.listdir(slots_dir) if not name.startswith('.tmp-')),
+                   key=lambda name: os.path.getmtime(os.path.join(slots_dir, name)), reverse=True)
+    removed = [slot for slot in slots[keep:] if slot not in in_use]
+    for slot in removed:
+        shutil.rmtree(slot_path(shared_dir, slot), ignore_errors=True)
+    # Sisa publikasi yang terputus
+    for name in os.listdir(slots_dir):
+        path = os.path.join(slots_dir, name)
+        if name.startswith('.tmp-') and time.time() - os.path.getmtime(path) > 3600:
+            shutil.rmtree(path, ignore_errors=True)
+    return removed
+
+
+def serve(models_root, shared_dir, poll_interval=30.0, smoke_data_path=None, keep=2):
+    """Proses loader: pantau folder model (manifest/legacy) dan publikasikan setiap versi baru yang lolos smoke test"""
+    from model_manager import ModelManager
+
+    manager = ModelManager(models_root, poll_interval=0, smoke_data_path=smoke_data_path, compact=True)
+    print(f"👀 Memantau {models_root} setiap {poll_interval:.0f} detik -> {shared_dir}")
+    try:
+        while True:
+            if manager.check_for_update():
+                publish(manager.current, shared_dir, keep=keep)
+            else:
+                collect_garbage(shared_dir, keep=keep)
+            time.sleep(poll_interval)
+    except KeyboardInterrupt:
+        print("\n👋 Loader dihentikan (model yang sudah dipublikasikan tetap tersedia)")
+
+
+def print_status(shared_dir):
+    manifest = read_manifest(shared_dir)
+    if manifest is None:
+        print(f"ℹ️ Belum ada model di {shared_dir}")
+        return
+    print(f"📦 Versi aktif: {manifest['version']} (slot {manifest['slot']}, "
+          f"{manifest['nbytes'] / 1024 / 1024:.1f} MB, {manifest['published_at']})")
+    slots_dir = os.path.join(shared_dir, SLOTS_DIR)
+    print(f"   Slot tersimpan: {', '.join(sorted(os.listdir(slots_dir)))}")
+    readers = live_readers(shared_dir)
+    print(f"   {len(readers)} proses app terhubung:")
+    for reader in readers:
+        marker = "✅" if reader['slot'] == manifest['slot'] else "⏳"
+        print(f"   {marker} {reader['host']}:{reader['pid']} -> {reader['version']} (sejak {reader['attached_at']})")
+
+
+def main(argv=None):
+    """Entry point command line"""
+    parser = argparse.ArgumentParser(description="Publikasikan model KNN ke memori bersama untuk banyak proses app")
+    parser.add_argument('--shared-dir', default=os.environ.get('STUNTING_SHARED_MODEL_DIR') or default_shared_dir())
+    subparsers = parser.add_subparsers(dest='command', required=True)
+    for command, help_text in (('publish', "Publikasikan model aktif sekali"),
+                               ('serve', "Loader: publikasikan ulang setiap ada versi baru")):
+        sub = subparsers.add_parser(command, help=help_text)
+        sub.add_argument('--models', default=os.path.join(CURRENT_DIR, 'models'), help="Folder model sumber")
+        sub.add_argument('--data', default=os.path.join(CURRENT_DIR, 'data_balita.csv'), help="Data smoke test")
+        sub.add_argument('--keep', type=int, default=2, help="Jumlah slot terbaru yang selalu disimpan")
+        if command == 'serve':
+            sub.add_argument('--poll', type=float, default=30.0, help="Interval cek versi baru (detik)")
+    subparsers.add_parser('status', help="Versi aktif, slot dan proses app yang terhubung")
+    gc_parser = subparsers.add_parser('gc', help="Hapus slot lama yang tidak dipakai")
+    gc_parser.add_argument('--keep', type=int, default=2)
+    args = parser.parse_args(argv)
+
+    if args.command == 'publish':
+        from model_manager import ModelManager
+
+        manager = ModelManager(args.models, poll_interval=0, smoke_data_path=args.data, compact=True)
+        if not manager.check_for_update():
+            print(f"❌ Model di {args.models} tidak bisa dimuat: {manager.last_error}")
+            return 1
+        publish(manager.current, args.shared_dir, keep=args.keep)
+    elif args.command == 'serve':
+        serve(args.models, args.shared_dir, args.poll, args.data, args.keep)
+    elif args.command == 'status':
+        print_status(args.shared_dir)
+    else:
+        removed = collect_garbage(args.shared_dir, keep=args.keep)
+        print(f"🗑️ {len(removed)} slot dihapus")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
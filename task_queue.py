@@ -0,0 +1,341 @@
+"""
+Antrean Tugas Lokal untuk Pekerjaan Berat
+Pekerjaan berat dari aplikasi (laporan PDF, screening file register) dijalankan di
+thread pool milik proses, bukan di thread script Streamlit, sehingga halaman tetap
+responsif dan bisa menampilkan progress
+
+- Batas global: jumlah worker (tugas yang berjalan bersamaan di seluruh proses)
+- Batas per pengguna: tugas berjalan bersamaan per sesi/pengguna; sisanya menunggu
+  tanpa menghalangi pengguna lain, dan antrean per pengguna juga dibatasi
+- Hasil disimpan sampai diambil (collect) atau kedaluwarsa setelah `result_ttl` detik
+- Tanpa broker eksternal: cukup satu proses di VM offline
+
+Thread (bukan proses) dipakai karena tugas memakai objek yang sudah resident di proses
+(kalkulator Z-Score, model KNN, store PDF); bagian numerik NumPy melepas GIL.
+
+Pemakaian:
+    tasks = TaskQueue(max_workers=2, max_per_user=1).start()
+    task_id = tasks.submit('sesi-1', 'pdf', build, key=audit_id)
+    tasks.status(task_id)    # {'state': 'running', 'progress': 0.4, ...}
+    tasks.collect(task_id)   # hasil, lalu dihapus dari cache
+"""
+
+import itertools
+import sys
+import threading
+import time
+import traceback
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+
+TASK_QUEUED = 'queued'
+TASK_RUNNING = 'running'
+TASK_DONE = 'done'
+TASK_FAILED = 'failed'
+TASK_CANCELLED = 'cancelled'
+
+FINISHED_STATES = (TASK_DONE, TASK_FAILED, TASK_CANCELLED)
+
+
+class Task:
+    """State satu tugas (hanya diubah di bawah lock TaskQueue, kecuali progress)"""
+
+    __slots__ = ('id', 'owner', 'kind', 'key', 'seq', 'fn', 'args', 'kwargs', 'state', 'progress',
+                 'message', 'result', 'error', 'submitted_at', 'started_at', 'finished_at', 'cancel_event')
+
+    def __init__(self, owner, kind, key, seq, fn, args, kwargs):
+        self.id = uuid.uuid4().hex
+        self.owner = owner
+        self.kind = kind
+        self.key = key
+        self.seq = seq
+        self.fn = fn
+        self.args = args
+        self.kwargs = kwargs
+        self.state = TASK_QUEUED
+        self.progress = 0.0
+        self.message = None
+        self.result = None
+        self.error = None
+        self.submitted_at = time.time()
+        self.started_at = None
+        self.finished_at = None
+        self.cancel_event = threading.Event()
+
+    def snapshot(self, position=None):
+        now = time.time()
+        return {
+            'id': self.id,
+            'owner': self.owner,
+            'kind': self.kind,
+            'key': self.key,
+            'state': self.state,
+            'progress': self.progress,
+            'message': self.message,
+            'error': self.error,
+            'position': position,
+            'submitted_at': self.submitted_at,
+            'wait_seconds': (self.started_at or now) - self.submitted_at,
+            'run_seconds': (self.finished_at or now) - self.started_at if self.started_at else None
+        }
+
+
+class TaskProgress:
+    """
+    Handle yang diterima fungsi tugas sebagai argumen pertama
+
+    - report(fraction, message): perbarui progress (0-1) dan pesan status
+    - cancelled: True jika pengguna membatalkan; tugas sebaiknya berhenti di titik aman
+    """
+
+    def __init__(self, task):
+        self._task = task
+
+    def report(self, fraction, message=None):
+        self._task.progress = min(max(float(fraction), 0.0), 1.0)
+        if message is not None:
+            self._task.message = message
+
+    @property
+    def cancelled(self):
+        return self._task.cancel_event.is_set()
+
+
+class TaskQueue:
+    """
+    Thread pool dengan penjadwalan adil per pengguna
+
+    Tugas hanya diserahkan ke executor saat ada slot global dan pemiliknya belum mencapai
+    `max_per_user` tugas berjalan; tugas menunggu dipilih FIFO di antara pengguna yang eligible.
+    """
+
+    def __init__(self, max_workers=2, max_per_user=1, max_queued_per_user=4, max_queued=64,
+                 result_ttl=600):
+        self.max_workers = max_workers
+        self.max_per_user = max_per_user
+        self.max_queued_per_user = max_queued_per_user
+        self.max_queued = max_queued
+        self.result_ttl = result_ttl
+        self._executor = None
+        self._lock = threading.Lock()
+        self._seq = itertools.count()
+        self._tasks = {}          # id -> Task (belum di-collect)
+        self._keys = {}           # (owner, key) -> id, untuk dedup
+        self._queued = []         # Task menunggu, urut seq
+        self._running = {}        # owner -> jumlah tugas berjalan
+        self.stats = {'submitted': 0, 'deduplicated': 0, 'rejected': 0, 'completed': 0, 'failed': 0,
+                      'cancelled': 0, 'expired': 0, 'collected': 0, 'wait_seconds': 0.0, 'run_seconds': 0.0}
+
+    def start(self):
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix='task')
+        return self
+
+    # -------------------------------------------------
+    # Sisi aplikasi
+    # -------------------------------------------------
+
+    def submit(self, owner, kind, fn, *args, key=None, **kwargs):
+        """
+        Antrekan `fn(progress, *args, **kwargs)` untuk pengguna `owner`
+
+        Jika `key` diisi dan tugas dengan key yang sama dari pengguna ini masih ada (menunggu,
+        berjalan, atau hasil belum diambil), ID tugas itu dikembalikan tanpa membuat tugas baru.
+        Tugas gagal/dibatalkan dengan key yang sama diganti tugas baru.
+
+        Raises: RuntimeError jika antrean pengguna atau antrean global penuh
+        """
+        with self._lock:
+            self._expire()
+            if key is not None:
+                existing = self._tasks.get(self._keys.get((owner, key)))
+                if existing is not None and existing.state not in (TASK_FAILED, TASK_CANCELLED):
+                    self.stats['deduplicated'] += 1
+                    return existing.id
+
+            user_queued = sum(1 for task in self._queued if task.owner == owner)
+            if user_queued >= self.max_queued_per_user or len(self._queued) >= self.max_queued:
+                self.stats['rejected'] += 1
+                raise RuntimeError(
+                    f"Antrean tugas penuh ({user_queued} tugas menunggu untuk pengguna ini, "
+                    f"{len(self._queued)} total). Coba lagi setelah tugas sebelumnya selesai."
+                )
+
+            task = Task(owner, kind, key, next(self._seq), fn, args, kwargs)
+            self._tasks[task.id] = task
+            if key is not None:
+                self._keys[(owner, key)] = task.id
+            self._queued.append(task)
+            self.stats['submitted'] += 1
+            self._dispatch()
+            return task.id
+
+    def status(self, task_id):
+        """Snapshot tugas (dict) atau None jika tidak dikenal/sudah di-collect/kedaluwarsa"""
+        with self._lock:
+            task = self._tasks.get(task_id)
+            if task is None:
+                return None
+            return task.snapshot(self._position(task))
+
+    def find(self, owner, key):
+        """ID tugas pengguna dengan key tertentu (None jika tidak ada)"""
+        with self._lock:
+            task_id = self._keys.get((owner, key))
+            return task_id if task_id in self._tasks else None
+
+    def collect(self, task_id, keep=False):
+        """
+        Hasil tugas yang sudah selesai; dihapus dari cache kecuali `keep`
+
+        Raises: KeyError jika tugas tidak dikenal, RuntimeError jika belum selesai/gagal/dibatalkan
+        """
+        with self._lock:
+            task = self._tasks.get(task_id)
+            if task is None:
+                raise KeyError(f"Tugas '{task_id}' tidak ditemukan atau sudah kedaluwarsa")
+            if task.state != TASK_DONE:
+                raise RuntimeError(task.error if task.state == TASK_FAILED
+                                   else f"Tugas '{task_id}' belum selesai ({task.state})")
+            if not keep:
+                self._forget(task)
+                self.stats['collected'] += 1
+            return task.result
+
+    def discard(self, task_id):
+        """Buang tugas yang sudah selesai dari cache (mis. tugas gagal yang sudah ditampilkan)"""
+        with self._lock:
+            task = self._tasks.get(task_id)
+            if task is not None and task.state in FINISHED_STATES:
+                self._forget(task)
+
+    def cancel(self, task_id):
+        """
+        Batalkan tugas: tugas menunggu langsung dibatalkan, tugas berjalan diberi sinyal
+        (TaskProgress.cancelled) dan berhenti di titik aman berikutnya
+        """
+        with self._lock:
+            task = self._tasks.get(task_id)
+            if task is None or task.state in FINISHED_STATES:
+                return False
+            task.cancel_event.set()
+            if task.state == TASK_QUEUED:
+                self._queued.remove(task)
+                self._finish(task, TASK_CANCELLED)
+            return True
+
+    def tasks(self, owner=None):
+        """Snapshot semua tugas (opsional hanya milik `owner`), terbaru dulu"""
+        with self._lock:
+            self._expire()
+            items = [task for task in self._tasks.values() if owner is None or task.owner == owner]
+            return [task.snapshot(self._position(task)) for task in sorted(items, key=lambda t: -t.seq)]
+
+    def summary(self):
+        with self._lock:
+            states = {state: 0 for state in (TASK_QUEUED, TASK_RUNNING) + FINISHED_STATES}
+            for task in self._tasks.values():
+                states[task.state] += 1
+            return {'states': states, 'users_running': len(self._running), **self.stats}
+
+    def close(self, wait=True):
+        """Batalkan tugas menunggu lalu hentikan executor"""
+        with self._lock:
+            for task in list(self._queued):
+                task.cancel_event.set()
+                self._finish(task, TASK_CANCELLED)
+            self._queued.clear()
+        if self._executor is not None:
+            self._executor.shutdown(wait=wait)
+            self._executor = None
+
+    # -------------------------------------------------
+    # Penjadwalan (dipanggil di bawah lock)
+    # -------------------------------------------------
+
+    def _position(self, task):
+        return self._queued.index(task) + 1 if task.state == TASK_QUEUED else None
+
+    def _dispatch(self):
+        if self._executor is None:
+            return
+        running = sum(self._running.values())
+        while running < self.max_workers:
+            task = next((t for t in self._queued if self._running.get(t.owner, 0) < self.max_per_user), None)
+            if task is None:
+                break
+            self._queued.remove(task)
+            task.state = TASK_RUNNING
+            task.started_at = time.time()
+            self._running[task.owner] = self._running.get(task.owner, 0) + 1
+            running += 1
+            self.stats['wait_seconds'] += task.started_at - task.submitted_at
+            self._executor.submit(self._run, task)
+
+    def _finish(self, task, state):
+        task.state = state
+        task.finished_at = time.time()
+        task.fn = task.args = task.kwargs = None
+        self.stats[{TASK_DONE: 'completed', TASK_FAILED: 'failed', TASK_CANCELLED: 'cancelled'}[state]] += 1
+
+    def _forget(self, task):
+        del self._tasks[task.id]
+        if task.key is not None and self._keys.get((task.owner, task.key)) == task.id:
+            del self._keys[(task.owner, task.key)]
+
+    def _expire(self):
+        """Buang hasil yang tidak diambil lebih dari result_ttl detik"""
+        now = time.time()
+        for task in [t for t in self._tasks.values()
+                     if t.state in FINISHED_STATES and now - t.finished_at > self.result_ttl]:
+            self._forget(task)
+            self.stats['expired'] += 1
+
+    # -------------------------------------------------
+    # Worker
+    # -------------------------------------------------
+
+    def _run(self, task):
+        try:
+            result, state, error = task.fn(TaskProgress(task), *task.args, **task.kwargs), TASK_DONE, None
+            if task.cancel_event.is_set():
+                result, state = None, TASK_CANCELLED
+        except Exception as e:
+            print(f"⚠️ Tugas {task.kind} gagal:\n{traceback.format_exc()}", file=sys.stderr)
+            result, state, error = None, TASK_FAILED, f"{type(e).__name__}: {e}"
+        with self._lock:
+            task.result = result
+            task.error = error
+            if state == TASK_DONE:
+                task.progress = 1.0
+            self._finish(task, state)
+            self.stats['run_seconds'] += task.finished_at - task.started_at
+            self._running[task.owner] -= 1
+            if not self._running[task.owner]:
+                del self._running[task.owner]
+            self._dispatch()
+
+
+if __name__ == "__main__":
+    # Smoke test: 3 pengguna x 3 tugas, 2 worker, 1 tugas berjalan per pengguna
+    def job(progress, seconds):
+        for step in range(10):
+            if progress.cancelled:
+                return None
+            time.sleep(seconds / 10)
+            progress.report((step + 1) / 10, f"langkah {step + 1}/10")
+        return threading.current_thread().name
+
+    tasks = TaskQueue(max_workers=2, max_per_user=1, max_queued_per_user=3).start()
+    ids = [tasks.submit(f"user-{u}", 'demo', job, 0.2) for _ in range(3) for u in range(3)]
+    print(f"📋 {len(ids)} tugas diantrekan; dedup key: "
+          f"{tasks.submit('user-0', 'demo', job, 0.2, key='x') == tasks.submit('user-0', 'demo', job, 0.2, key='x')}")
+    try:
+        tasks.submit('user-0', 'demo', job, 0.2)
+    except RuntimeError as e:
+        print(f"🚫 {e}")
+    while any(tasks.status(i)['state'] not in FINISHED_STATES for i in ids):
+        time.sleep(0.05)
+    print(f"✅ Hasil: {[tasks.collect(i) for i in ids]}")
+    print(f"📊 {tasks.summary()}")
+    tasks.close()
@@ -0,0 +1,284 @@
+"""
+Tracing Ringan untuk Alur Deteksi
+Span per tahap (Z-Score, KNN, chart, PDF, render Streamlit) per request,
+diagregasi ke histogram latensi dan bisa diekspor sebagai JSON lines
+
+Tracing nonaktif secara default; saat nonaktif span() hanya mengembalikan
+context manager kosong yang sama (tanpa alokasi, tanpa timer).
+
+Aktifkan dengan environment variable:
+    STUNTING_TRACING=1                     # rekam trace
+    STUNTING_TRACE_FILE=traces.jsonl       # (opsional) tulis setiap trace ke file
+"""
+
+import bisect
+import functools
+import json
+import os
+import threading
+import time
+from collections import deque
+from contextvars import ContextVar
+from datetime import datetime
+
+# Batas atas bucket histogram latensi (ms); bucket terakhir tak terbatas
+HISTOGRAM_BUCKETS_MS = (0.1, 0.25, 0.5, 1, 2.5, 5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000, 10000)
+
+
+class _NoopSpan:
+    """Context manager kosong untuk tracing nonaktif"""
+
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+
+_NOOP = _NoopSpan()
+
+# Trace yang sedang berjalan di thread/session Streamlit ini
+_current_trace = ContextVar('stunting_current_trace', default=None)
+
+
+class Histogram:
+    """Histogram latensi dengan bucket tetap (ms)"""
+
+    def __init__(self, buckets=HISTOGRAM_BUCKETS_MS):
+        self.buckets = tuple(buckets)
+        self.counts = [0] * (len(self.buckets) + 1)
+        self.count = 0
+        self.total = 0.0
+        self.min = float('inf')
+        self.max = 0.0
+
+    def observe(self, value_ms):
+        self.counts[bisect.bisect_left(self.buckets, value_ms)] += 1
+        self.count += 1
+        self.total += value_ms
+        self.min = min(self.min, value_ms)
+        self.max = max(self.max, value_ms)
+
+    def percentile(self, q):
+        """Perkiraan persentil (0-100) dengan interpolasi linear di dalam bucket"""
+        if self.count == 0:
+            return None
+        rank = q / 100 * self.count
+        cumulative = 0
+        for i, bucket_count in enumerate(self.counts):
+            if bucket_count and cumulative + bucket_count >= rank:
+                lower = self.buckets[i - 1] if i > 0 else 0.0
+                upper = self.buckets[i] if i < len(self.buckets) else self.max
+                lower, upper = max(lower, self.min), min(upper, self.max)
+                return lower + (upper - lower) * (rank - cumulative) / bucket_count
+            cumulative += bucket_count
+        return self.max
+
+    def snapshot(self):
+        """Salinan bucket kumulatif untuk eksporter: ([(batas_ms, count_kumulatif), ...], count, total_ms)"""
+        cumulative, buckets = 0, []
+        for bound, bucket_count in zip(self.buckets, self.counts):
+            cumulative += bucket_count
+            buckets.append((bound, cumulative))
+        return buckets, self.count, self.total
+
+    def summary(self):
+        return {
+            'count': self.count,
+            'mean_ms': self.total / self.count if self.count else None,
+            'p50_ms': self.percentile(50),
+            'p95_ms': self.percentile(95),
+            'p99_ms': self.percentile(99),
+            'max_ms': self.max if self.count else None
+        }
+
+
+class _Span:
+    __slots__ = ('tracer', 'name', 'trace', 'start', 'depth')
+
+    def __init__(self, tracer, name, trace):
+        self.tracer = tracer
+        self.name = name
+        self.trace = trace
+
+    def __enter__(self):
+        if self.trace is not None:
+            self.depth = self.trace['_depth']
+            self.trace['_depth'] += 1
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        duration_ms = (time.perf_counter() - self.start) * 1000
+        if self.trace is not None:
+            self.trace['_depth'] -= 1
+            self.trace['spans'].append({
+                'name': self.name,
+                'depth': self.depth,
+                'offset_ms': round((self.start - self.trace['_start']) * 1000, 3),
+                'duration_ms': round(duration_ms, 3),
+                'error': exc_type.__name__ if exc_type else None
+            })
+        self.tracer._observe(self.name, duration_ms)
+        return False
+
+
+class _Trace:
+    __slots__ = ('tracer', 'name', 'attrs', 'record', 'token')
+
+    def __init__(self, tracer, name, attrs):
+        self.tracer = tracer
+        self.name = name
+        self.attrs = attrs
+
+    def __enter__(self):
+        self.record = {
+            'trace': self.name,
+            'timestamp': datetime.now().isoformat(timespec='milliseconds'),
+            'attrs': self.attrs,
+            'spans': [],
+            '_start': time.perf_counter(),
+            '_depth': 1
+        }
+        self.token = _current_trace.set(self.record)
+        return self.record
+
+    def __exit__(self, exc_type, exc, tb):
+        _current_trace.reset(self.token)
+        record = self.record
+        duration_ms = (time.perf_counter() - record.pop('_start')) * 1000
+        record.pop('_depth')
+        record['duration_ms'] = round(duration_ms, 3)
+        record['error'] = exc_type.__name__ if exc_type else None
+        # Span diurutkan menurut waktu mulai (span dalam selesai lebih dulu)
+        record['spans'].sort(key=lambda span: span['offset_ms'])
+        self.tracer._finish(record, duration_ms)
+        return False
+
+
+class Tracer:
+    """
+    Pengumpul span per request
+
+    Pemakaian:
+        with TRACER.trace('render_detection'):
+            with TRACER.span('who_zscore'):
+                ...
+
+        @TRACER.traced('chart.gauge')
+        def create_gauge_chart(...): ...
+    """
+
+    def __init__(self, enabled=False, max_traces=200, export_path=None):
+        self.enabled = enabled
+        self.export_path = export_path
+        self._histograms = {}
+        self._traces = deque(maxlen=max_traces)
+        self._lock = threading.Lock()
+
+    def trace(self, name, **attrs):
+        """Trace satu request; span di dalamnya dicatat sebagai bagian trace ini"""
+        if not self.enabled:
+            return _NOOP
+        return _Trace(self, name, attrs)
+
+    def span(self, name):
+        """Span satu tahap (tetap masuk histogram walau di luar trace)"""
+        if not self.enabled:
+            return _NOOP
+        return _Span(self, name, _current_trace.get())
+
+    def traced(self, name):
+        """Decorator: bungkus fungsi dengan span"""
+        def decorator(func):
+            @functools.wraps(func)
+            def wrapper(*args, **kwargs):
+                if not self.enabled:
+                    return func(*args, **kwargs)
+                with _Span(self, name, _current_trace.get()):
+                    return func(*args, **kwargs)
+            return wrapper
+        return decorator
+
+    def _observe(self, name, duration_ms):
+        with self._lock:
+            histogram = self._histograms.get(name)
+            if histogram is None:
+                histogram = self._histograms[name] = Histogram()
+            histogram.observe(duration_ms)
+
+    def _finish(self, record, duration_ms):
+        self._observe(record['trace'], duration_ms)
+        with self._lock:
+            self._traces.append(record)
+            if self.export_path:
+                with open(self.export_path, 'a', encoding='utf-8') as f:
+                    f.write(json.dumps(record, default=str) + "\n")
+
+    # -------------------------------------------------
+    # Laporan
+    # -------------------------------------------------
+
+    def summary(self):
+        """Ringkasan histogram per nama span: {nama: {count, mean_ms, p50_ms, ...}}"""
+        with self._lock:
+            return {name: histogram.summary() for name, histogram in sorted(self._histograms.items())}
+
+    def histogram_snapshots(self):
+        """Snapshot histogram per nama span (lihat Histogram.snapshot)"""
+        with self._lock:
+            return {name: histogram.snapshot() for name, histogram in sorted(self._histograms.items())}
+
+    def recent_traces(self, name=None, limit=None):
+        """Trace terbaru (terbaru di akhir), opsional difilter nama"""
+        with self._lock:
+            traces = [t for t in self._traces if name is None or t['trace'] == name]
+        return traces[-limit:] if limit else traces
+
+    def to_jsonl(self):
+        """Trace terbaru sebagai teks JSON lines"""
+        return "".join(json.dumps(record, default=str) + "\n" for record in self.recent_traces())
+
+    def export_jsonl(self, path):
+        with open(path, 'w', encoding='utf-8') as f:
+            f.write(self.to_jsonl())
+        return path
+
+    def reset(self):
+        with self._lock:
+            self._histograms.clear()
+            self._traces.clear()
+
+
+# Tracer global aplikasi (satu per proses)
+TRACER = Tracer(
+    enabled=os.environ.get('STUNTING_TRACING', '0') == '1',
+    export_path=os.environ.get('STUNTING_TRACE_FILE') or None
+)
+
+
+# Testing function
+if __name__ == "__main__":
+    tracer = Tracer(enabled=True)
+
+    @tracer.traced('tahap.lambat')
+    def slow_stage():
+        time.sleep(0.005)
+
+    for _ in range(20):
+        with tracer.trace('request', page='detection'):
+            with tracer.span('tahap.cepat'):
+                sum(range(1000))
+            slow_stage()
+
+    print(json.dumps(tracer.summary(), indent=2))
+    print(tracer.to_jsonl().splitlines()[-1])
+
+    disabled = Tracer(enabled=False)
+    start = time.perf_counter()
+    for _ in range(100_000):
+        with disabled.span('x'):
+            pass
+    print(f"Overhead nonaktif: {(time.perf_counter() - start) / 100_000 * 1e9:.0f} ns/span")
@@ -0,0 +1,393 @@
+"""
+Pipeline Training KNN yang Reproducible
+Tahap audit, load -> encode -> split -> scale -> search -> evaluate, masing-masing
+di-cache berdasarkan isi (hash data input + parameter tahap + kunci tahap
+sebelumnya), sehingga mengubah grid pencarian saja memakai ulang data yang
+sudah di-parse, di-encode dan di-scale
+
+Contoh:
+    python training_pipeline.py                                  # data_balita.csv -> models/
+    python training_pipeline.py --data data_baru.csv --output models --publish
+    python training_pipeline.py --grid '{"n_neighbors": [9, 13, 17], "weights": ["distance"]}'
+    python training_pipeline.py --no-optimize --no-cache
+"""
+
+import argparse
+import hashlib
+import json
+import os
+import pickle
+import platform
+import sys
+import time
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+import sklearn
+from sklearn.metrics import accuracy_score, classification_report, confusion_matrix
+from sklearn.model_selection import cross_val_score, train_test_split
+from sklearn.neighbors import KNeighborsClassifier
+from sklearn.preprocessing import LabelEncoder, StandardScaler
+
+from dataset_audit import audit_dataset
+from knn_model_trainer import PARAM_GRID, StuntingKNNModel
+from model_evaluation import evaluate_predictions, print_evaluation
+from model_manager import ModelManager
+
+CURRENT_DIR = os.path.dirname(os.path.abspath(__file__))
+DEFAULT_DATA = os.path.join(CURRENT_DIR, 'data_balita.csv')
+DEFAULT_OUTPUT = os.path.join(CURRENT_DIR, 'models')
+DEFAULT_CACHE_DIR = os.path.join(CURRENT_DIR, '.pipeline_cache')
+
+# Naikkan jika format artefak tahap berubah (cache lama otomatis tidak terpakai)
+CACHE_FORMAT = 2
+
+FEATURE_COLUMNS = ['Umur (bulan)', 'Jenis Kelamin Encoded', 'Tinggi Badan (cm)']
+
+# Parameter model tanpa grid search (sama dengan train_model(optimize=False))
+DEFAULT_PARAMS = {'n_neighbors': 5, 'weights': 'distance', 'metric': 'minkowski'}
+
+
+def file_digest(path, chunk_size=1 << 20):
+    """SHA-256 isi file (dibaca per blok)"""
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(chunk_size), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def stage_key(stage, params, *inputs):
+    """Kunci isi tahap: hash nama tahap, parameter, kunci input dan versi library"""
+    payload = json.dumps({
+        'stage': stage,
+        'params': params,
+        'inputs': inputs,
+        'format': CACHE_FORMAT,
+        'sklearn': sklearn.__version__
+    }, sort_keys=True, default=str)
+    return hashlib.sha256(payload.encode('utf-8')).hexdigest()[:24]
+
+
+class StageCache:
+    """Artefak tahap pipeline di cache_dir/<tahap>/<kunci>.pkl"""
+
+    def __init__(self, cache_dir, enabled=True):
+        self.cache_dir = cache_dir
+        self.enabled = enabled
+        self.log = []
+
+    def path(self, stage, key):
+        return os.path.join(self.cache_dir, stage, f"{key}.pkl")
+
+    def run(self, stage, key, func):
+        """Ambil artefak dari cache atau jalankan func() lalu simpan"""
+        path = self.path(stage, key)
+        if self.enabled and os.path.exists(path):
+            with open(path, 'rb') as f:
+                artifact = pickle.load(f)
+            self.log.append({'stage': stage, 'key': key, 'cached': True, 'seconds': 0.0})
+            print(f"♻️  [{stage}] cache {key}")
+            return artifact
+
+        print(f"⚙️  [{stage}] menjalankan ({key})")
+        start = time.perf_counter()
+        artifact = func()
+        seconds = time.perf_counter() - start
+        self.log.append({'stage': stage, 'key': key, 'cached': False, 'seconds': round(seconds, 3)})
+
+        if self.enabled:
+            # Tulis ke file sementara lalu rename agar proses lain tidak membaca artefak setengah jadi
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            tmp_path = f"{path}.{os.getpid()}.tmp"
+            with open(tmp_path, 'wb') as f:
+                pickle.dump(artifact, f, protocol=pickle.HIGHEST_PROTOCOL)
+            os.replace(tmp_path, path)
+        return artifact
+
+
+# =====================================================
+# TAHAP PIPELINE
+# =====================================================
+
+def stage_load(data_path, drop_duplicates):
+    """Parse CSV, normalisasi teks kategori, buang duplikat (seperti notebook) dan nilai kosong"""
+    df = pd.read_csv(data_path)
+    n_raw = len(df)
+    for column in ('Jenis Kelamin', 'Status Gizi'):
+        df[column] = df[column].str.strip().str.lower()
+    if drop_duplicates:
+        df = df.drop_duplicates()
+    n_deduplicated = len(df)
+    df = df.dropna().reset_index(drop=True)
+    return {
+        'df': df,
+        'stats': {
+            'n_raw': n_raw,
+            'n_duplicates': n_raw - n_deduplicated,
+            'n_missing': n_deduplicated - len(df),
+            'n_rows': len(df),
+            'label_distribution': df['Status Gizi'].value_counts().to_dict()
+        }
+    }
+
+
+def stage_audit(data_path):
+    """Audit dataset mentah terhadap WHO Z-Score (hanya ringkasan yang disimpan)"""
+    report, _ = audit_dataset(pd.read_csv(data_path))
+    return report
+
+
+def stage_encode(df):
+    gender_encoder = LabelEncoder()
+    label_encoder = LabelEncoder()
+    X = np.column_stack([
+        df['Umur (bulan)'].to_numpy(dtype=np.float64),
+        gender_encoder.fit_transform(df['Jenis Kelamin']),
+        df['Tinggi Badan (cm)'].to_numpy(dtype=np.float64)
+    ])
+    y = label_encoder.fit_transform(df['Status Gizi'])
+    return {'X': X, 'y': y, 'gender_encoder': gender_encoder, 'label_encoder': label_encoder}
+
+
+def stage_split(X, y, test_size, random_state):
+    X_train, X_test, y_train, y_test = train_test_split(
+        X, y, test_size=test_size, random_state=random_state, stratify=y
+    )
+    return {'X_train': X_train, 'X_test': X_test, 'y_train': y_train, 'y_test': y_test}
+
+
+def stage_scale(X_train, X_test):
+    scaler = StandardScaler()
+    return {
+        'scaler': scaler,
+        'X_train_scaled': scaler.fit_transform(X_train),
+        'X_test_scaled': scaler.transform(X_test)
+    }
+
+
+def stage_search(X_train_scaled, y_train, param_grid, cv):
+    """Grid search (memakai StuntingKNNModel._grid_search); hanya parameter & ringkasan yang disimpan"""
+    trainer = StuntingKNNModel(None)
+    best = trainer._grid_search(X_train_scaled, y_train, param_grid, cv)
+    return {
+        # Semua parameter KNN (juga yang tidak ada di grid dan memakai default sklearn)
+        'best_params': {key: best.get_params()[key] for key in sorted({*PARAM_GRID, *param_grid})},
+        'summary': trainer.search_summary
+    }
+
+
+def stage_evaluate(scaled, split, params, cv, class_names):
+    """Fit model final dengan parameter terpilih lalu evaluasi train/test/CV, per kelas & kelompok umur"""
+    model = KNeighborsClassifier(**params)
+    model.fit(scaled['X_train_scaled'], split['y_train'])
+    y_pred = model.predict(scaled['X_test_scaled'])
+    probabilities = model.predict_proba(scaled['X_test_scaled'])
+    cv_scores = cross_val_score(model, scaled['X_train_scaled'], split['y_train'], cv=cv, scoring='accuracy')
+    return {
+        'model': model,
+        'y_pred': y_pred,
+        'train_accuracy': float(accuracy_score(split['y_train'], model.predict(scaled['X_train_scaled']))),
+        'test_accuracy': float(accuracy_score(split['y_test'], y_pred)),
+        'cv_scores': cv_scores.tolist(),
+        'classification_report': classification_report(
+            split['y_test'], y_pred, labels=np.arange(len(class_names)), target_names=class_names,
+            output_dict=True, zero_division=0
+        ),
+        'confusion_matrix': confusion_matrix(split['y_test'], y_pred, labels=np.arange(len(class_names))).tolist(),
+        'evaluation': evaluate_predictions(split['y_test'], y_pred, probabilities, split['X_test'][:, 0], class_names)
+    }
+
+
+# =====================================================
+# PIPELINE
+# =====================================================
+
+def run_pipeline(data_path=DEFAULT_DATA, param_grid=None, optimize=True, cv=5, test_size=0.2, random_state=42,
+                 drop_duplicates=True, cache_dir=DEFAULT_CACHE_DIR, use_cache=True, compact_precision='float32'):
+    """
+    Jalankan semua tahap training
+
+    Returns: StuntingKNNModel siap disimpan (metadata lengkap di .metadata)
+    """
+    param_grid = param_grid or PARAM_GRID
+    cache = StageCache(cache_dir, enabled=use_cache)
+    data_hash = file_digest(data_path)
+
+    audit_key = stage_key('audit', {}, data_hash)
+    audit = cache.run('audit', audit_key, lambda: stage_audit(data_path))
+    agreement = audit['label_agreement']
+    agreement_text = f"kesesuaian label vs WHO {agreement:.2%}, " if agreement is not None else ""
+    print(f"🔎 Audit: {agreement_text}|Z| > {audit['z_limit']:g}: {audit['flag_counts']['implausible_zscore']}, "
+          f"duplikat: {audit['flag_counts']['duplicate']}")
+
+    load_key = stage_key('load', {'drop_duplicates': drop_duplicates}, data_hash)
+    loaded = cache.run('load', load_key, lambda: stage_load(data_path, drop_duplicates))
+
+    encode_key = stage_key('encode', {}, load_key)
+    encoded = cache.run('encode', encode_key, lambda: stage_encode(loaded['df']))
+
+    split_key = stage_key('split', {'test_size': test_size, 'random_state': random_state}, encode_key)
+    split = cache.run('split', split_key, lambda: stage_split(encoded['X'], encoded['y'], test_size, random_state))
+
+    scale_key = stage_key('scale', {}, split_key)
+    scaled = cache.run('scale', scale_key, lambda: stage_scale(split['X_train'], split['X_test']))
+
+    if optimize:
+        search_key = stage_key('search', {'param_grid': param_grid, 'cv': cv}, scale_key)
+        search = cache.run('search', search_key,
+                           lambda: stage_search(scaled['X_train_scaled'], split['y_train'], param_grid, cv))
+        params = search['best_params']
+    else:
+        search_key, search = None, None
+        params = dict(DEFAULT_PARAMS)
+
+    class_names = list(encoded['label_encoder'].classes_)
+    evaluate_key = stage_key('evaluate', {'params': params, 'cv': cv}, scale_key)
+    evaluation = cache.run('evaluate', evaluate_key,
+                           lambda: stage_evaluate(scaled, split, params, cv, class_names))
+
+    # Rakit model dari artefak tahap
+    knn_model = StuntingKNNModel(data_path)
+    knn_model.model = evaluation['model']
+    knn_model.scaler = scaled['scaler']
+    knn_model.gender_encoder = encoded['gender_encoder']
+    knn_model.label_encoder = encoded['label_encoder']
+    knn_model.search_summary = search['summary'] if search else None
+    knn_model.version = knn_model._next_version()
+
+    cv_scores = np.asarray(evaluation['cv_scores'])
+    knn_model.metadata = {
+        'version': knn_model.version,
+        'train_date': datetime.now().strftime('%Y-%m-%d %H:%M:%S'),
+        'train_accuracy': evaluation['train_accuracy'],
+        'test_accuracy': evaluation['test_accuracy'],
+        'cv_mean': float(cv_scores.mean()),
+        'cv_std': float(cv_scores.std()),
+        'cv_scores': evaluation['cv_scores'],
+        'best_params': {key: params[key] for key in PARAM_GRID if key in params},
+        'feature_names': FEATURE_COLUMNS,
+        'target_classes': class_names,
+        'gender_classes': list(encoded['gender_encoder'].classes_),
+        'n_train_samples': int(split['X_train'].shape[0]),
+        'n_test_samples': int(split['X_test'].shape[0]),
+        'classification_report': evaluation['classification_report'],
+        'confusion_matrix': evaluation['confusion_matrix'],
+        'search': search['summary'] if search else None,
+        'evaluation': {**evaluation['evaluation'], 'model_version': knn_model.version},
+        'data': {
+            'path': os.path.abspath(data_path),
+            'sha256': data_hash,
+            **loaded['stats'],
+            'audit': audit
+        },
+        'pipeline': {
+            'test_size': test_size,
+            'random_state': random_state,
+            'cv': cv,
+            'optimize': optimize,
+            'drop_duplicates': drop_duplicates,
+            'stage_keys': {
+                'audit': audit_key, 'load': load_key, 'encode': encode_key, 'split': split_key,
+                'scale': scale_key, 'search': search_key, 'evaluate': evaluate_key
+            },
+            'stages': cache.log
+        },
+        'environment': {
+            'python': platform.python_version(),
+            'numpy': np.__version__,
+            'pandas': pd.__version__,
+            'sklearn': sklearn.__version__
+        },
+        'update_history': []
+    }
+
+    if compact_precision:
+        knn_model.build_compact_index(compact_precision, X_check=scaled['X_test_scaled'])
+    knn_model.build_drift_reference(split['X_train'])
+    knn_model.build_distance_reference()
+    return knn_model
+
+
+def print_summary(knn_model):
+    metadata = knn_model.metadata
+    print("\n📈 Model Performance:")
+    print(f"Train accuracy: {metadata['train_accuracy']:.4f}")
+    print(f"Test accuracy:  {metadata['test_accuracy']:.4f}")
+    print(f"CV: {metadata['cv_mean']:.4f} (+/- {metadata['cv_std'] * 2:.4f})")
+    print(f"Params: {metadata['best_params']}")
+    print("\nConfusion Matrix:")
+    print(pd.DataFrame(metadata['confusion_matrix'], index=metadata['target_classes'],
+                       columns=metadata['target_classes']))
+    print_evaluation(metadata['evaluation'])
+    stages = []
+    for stage in metadata['pipeline']['stages']:
+        status = 'cache' if stage['cached'] else f"{stage['seconds']:.1f}s"
+        stages.append(f"{stage['stage']} ({status})")
+    print("\n🧱 Tahap: " + ", ".join(stages))
+
+
+def main(argv=None):
+    """Entry point command line"""
+    parser = argparse.ArgumentParser(description="Training model KNN stunting dengan cache per tahap")
+    parser.add_argument('--data', default=DEFAULT_DATA, help="CSV dengan skema data_balita.csv")
+    parser.add_argument('--output', default=DEFAULT_OUTPUT, help="Folder model (default: models/)")
+    parser.add_argument('--publish', action='store_true',
+                        help="Simpan sebagai versi baru (versions/<versi>/ + manifest.json) untuk hot reload")
+    parser.add_argument('--grid', default=None,
+                        help="Grid hyperparameter: JSON inline atau path file JSON (default: PARAM_GRID)")
+    parser.add_argument('--no-optimize', action='store_true', help="Tanpa grid search (n_neighbors=5, distance)")
+    parser.add_argument('--cv', type=int, default=5, help="Jumlah fold cross-validation")
+    parser.add_argument('--test-size', type=float, default=0.2)
+    parser.add_argument('--random-state', type=int, default=42)
+    parser.add_argument('--keep-duplicates', action='store_true',
+                        help="Jangan buang baris duplikat (notebook membuangnya)")
+    parser.add_argument('--cache-dir', default=DEFAULT_CACHE_DIR)
+    parser.add_argument('--no-cache', action='store_true', help="Jalankan semua tahap tanpa membaca/menulis cache")
+    parser.add_argument('--compact-precision', default='float32', choices=['float32', 'int16', 'none'],
+                        help="Presisi indeks KNN ringkas yang ikut disimpan")
+    args = parser.parse_args(argv)
+
+    if not os.path.exists(args.data):
+        parser.error(f"Dataset tidak ditemukan: {args.data} (buat data contoh dengan generate_sample_data.py)")
+
+    param_grid = None
+    if args.grid:
+        if os.path.exists(args.grid):
+            with open(args.grid, 'r', encoding='utf-8') as f:
+                param_grid = json.load(f)
+        else:
+            param_grid = json.loads(args.grid)
+
+    print("=" * 80)
+    print("🚀 TRAINING KNN MODEL UNTUK DETEKSI STUNTING")
+    print("=" * 80)
+    print(f"📂 Data: {args.data}")
+
+    knn_model = run_pipeline(
+        args.data, param_grid, optimize=not args.no_optimize, cv=args.cv, test_size=args.test_size,
+        random_state=args.random_state, drop_duplicates=not args.keep_duplicates, cache_dir=args.cache_dir,
+        use_cache=not args.no_cache,
+        compact_precision=None if args.compact_precision == 'none' else args.compact_precision
+    )
+    print_summary(knn_model)
+
+    if args.publish:
+        ModelManager.publish(knn_model, args.output)
+    else:
+        knn_model.save_model(args.output)
+
+    print("\n" + "=" * 80)
+    print("✅ TRAINING COMPLETED")
+    print("=" * 80)
+
+    # Test prediction
+    result = knn_model.predict(24, 'laki-laki', 80)
+    print(f"\n📝 Test: Umur=24 bulan, laki-laki, TB=80cm -> {result['prediction']} "
+          f"(risiko {result['risk_percentage']}%)")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -3,13 +3,291 @@ Z-Score Calculator untuk Deteksi Stunting
 Berdasarkan Standar WHO Child Growth Standards
 """
 
+from types import MappingProxyType
+
 import numpy as np
 from scipy import interpolate
 
+
+# Panjang rata-rata satu bulan (hari) sesuai definisi WHO
+DAYS_PER_MONTH = 30.4375
+
+# Indikator dengan sumbu umur (punya tabel LMS harian); BB/TB memakai sumbu panjang/tinggi
+AGE_INDICATORS = ('hfa', 'wfa', 'bfa')
+
+
+def age_in_days(birth_date, measured_at):
+    """
+    Umur (hari) antara tanggal lahir dan tanggal pengukuran
+    
+    Menerima date/datetime/string ISO tunggal atau array/kolom tanggal (vektor, tanpa loop);
+    tanggal kosong (NaT) menghasilkan NaN. Returns: int untuk skalar, array float untuk array.
+    """
+    birth = np.asarray(birth_date, dtype='datetime64[D]')
+    measured = np.asarray(measured_at, dtype='datetime64[D]')
+    days = (measured - birth).astype(np.float64)
+    days = np.where(np.isnat(birth) | np.isnat(measured), np.nan, days)
+    if days.ndim == 0:
+        return int(days) if not np.isnan(days) else None
+    return days
+
+
+def encode_gender(gender):
+    """
+    Kode jenis kelamin: 0 = laki-laki, 1 = perempuan
+    Menerima string tunggal, array string, atau array kode 0/1
+    """
+    if isinstance(gender, str):
+        return 0 if gender.lower() == 'laki-laki' else 1
+    
+    gender = np.asarray(gender)
+    if gender.dtype.kind in 'iub':
+        return gender.astype(np.int8)
+    return np.where(np.char.lower(gender.astype(str)) == 'laki-laki', 0, 1).astype(np.int8)
+
+
+def lms_zscore(y, L, M, S):
+    """
+    Kernel vektor metode LMS WHO
+    
+    Formula: Z = ((y/M)^L - 1) / (L * S), atau Z = ln(y/M) / S jika L = 0
+    """
+    y = np.asarray(y, dtype=np.float64)
+    L = np.asarray(L, dtype=np.float64)
+    is_log = np.abs(L) < 1e-12
+    L_safe = np.where(is_log, 1.0, L)
+    
+    with np.errstate(divide='ignore', invalid='ignore'):
+        ratio = y / M
+        zscore = np.where(is_log, np.log(ratio) / S, (ratio ** L_safe - 1) / (L_safe * S))
+    return zscore
+
+
+def lms_value(zscore, L, M, S):
+    """
+    Kebalikan metode LMS: nilai pengukuran pada Z-Score tertentu
+    
+    Formula: y = M * (1 + L*S*Z)^(1/L), atau y = M * exp(S*Z) jika L = 0
+    """
+    zscore = np.asarray(zscore, dtype=np.float64)
+    L = np.asarray(L, dtype=np.float64)
+    is_log = np.abs(L) < 1e-12
+    L_safe = np.where(is_log, 1.0, L)
+    
+    with np.errstate(invalid='ignore'):
+        value = np.where(is_log, M * np.exp(S * zscore), M * (1 + L_safe * S * zscore) ** (1 / L_safe))
+    return value
+
+
+def _adjust_zscore_tails(zscore, y, L, M, S):
+    """
+    Koreksi WHO untuk |Z| > 3 pada indikator berbasis berat badan:
+    di luar ±3 SD, jarak diukur linear terhadap selisih SD2-SD3
+    """
+    sd3_pos = lms_value(3, L, M, S)
+    sd2_pos = lms_value(2, L, M, S)
+    sd3_neg = lms_value(-3, L, M, S)
+    sd2_neg = lms_value(-2, L, M, S)
+    
+    with np.errstate(invalid='ignore'):
+        zscore = np.where(zscore > 3, 3 + (y - sd3_pos) / (sd3_pos - sd2_pos), zscore)
+        zscore = np.where(zscore < -3, -3 + (y - sd3_neg) / (sd2_neg - sd3_neg), zscore)
+    return zscore
+
+
+# -------------------------------------------------
+# Tabel kategori TB/U statis (dibangun sekali saat import, tidak bisa diubah)
+# Kode ringkas: 0-3 anak, 4-7 dewasa (kode anak + HFA_ADULT_OFFSET), -1 = Z-Score NaN
+# -------------------------------------------------
+
+HFA_SEVERELY_STUNTED, HFA_STUNTED, HFA_NORMAL, HFA_TALL = range(4)
+HFA_ADULT_OFFSET = 4
+HFA_ADULT_VERY_SHORT, HFA_ADULT_SHORT, HFA_ADULT_NORMAL, HFA_ADULT_TALL = range(HFA_ADULT_OFFSET, HFA_ADULT_OFFSET + 4)
+HFA_UNKNOWN = -1
+
+
+def _readonly(values):
+    array = np.asarray(values, dtype=np.float64)
+    array.setflags(write=False)
+    return array
+
+
+# Batas WHO: Z < -3 | -3 <= Z < -2 | -2 <= Z <= 3 | Z > 3
+HFA_LOWER_CUTS = _readonly((-3, -2))
+HFA_UPPER_CUTS = _readonly((3,))
+
+HFA_LABELS = (
+    "Severely Stunted (Sangat Pendek)",
+    "Stunted (Pendek)",
+    "Normal",
+    "Tall (Tinggi)",
+    # Dewasa: dibandingkan dengan standar akhir (19 tahun)
+    "Perawakan Sangat Pendek (Kemungkinan Stunting di Masa Kecil)",
+    "Perawakan Pendek (Kemungkinan Stunting di Masa Kecil)",
+    "Perawakan Normal",
+    "Perawakan Tinggi"
+)
+
+HFA_INTERPRETATIONS = (
+    "Tinggi badan anak berada sangat jauh di bawah standar WHO untuk usianya.",
+    "Tinggi badan anak berada di bawah standar WHO untuk usianya.",
+    "Tinggi badan anak sesuai dengan standar WHO untuk usianya.",
+    "Tinggi badan anak berada di atas standar WHO untuk usianya.",
+    "Tinggi badan berada sangat jauh di bawah standar rata-rata dewasa. Ini mungkin indikasi stunting yang terjadi di masa kecil.",
+    "Tinggi badan berada di bawah standar rata-rata dewasa. Ini mungkin indikasi stunting yang terjadi di masa kecil.",
+    "Tinggi badan berada dalam rentang normal untuk dewasa.",
+    "Tinggi badan berada di atas standar rata-rata dewasa."
+)
+
+_RECOMMENDATION_TEXT = {
+    HFA_SEVERELY_STUNTED: {
+        "title": "⚠️ PERLU PERHATIAN SERIUS",
+        "actions": (
+            "Segera konsultasi ke Dokter Spesialis Anak atau Puskesmas terdekat",
+            "Anak memerlukan intervensi gizi intensif dengan Pemberian Makanan Tambahan (PMT) tinggi protein",
+            "Berikan makanan bergizi tinggi: telur, ikan, daging, tahu/tempe setiap hari",
+            "Pastikan ASI terus diberikan jika anak masih menyusui",
+            "Periksa dan obati penyakit penyerta (cacingan, TBC, diare kronis)",
+            "Lakukan stimulasi tumbuh kembang secara rutin",
+            "Pantau pertumbuhan setiap bulan di Posyandu"
+        ),
+        "color": "#DC2626"
+    },
+    HFA_STUNTED: {
+        "title": "⚠️ PERLU PERBAIKAN GIZI",
+        "actions": (
+            "Konsultasikan ke Bidan Desa atau Puskesmas untuk evaluasi lebih lanjut",
+            "Tingkatkan asupan protein hewani: minimal 1 butir telur/hari",
+            "Berikan makanan beragam dengan gizi seimbang (Isi Piringku)",
+            "Teruskan pemberian ASI hingga 2 tahun jika masih menyusui",
+            "Berikan MPASI yang tepat sesuai usia anak",
+            "Rutin ke Posyandu untuk pemantauan pertumbuhan",
+            "Jaga kebersihan dan sanitasi lingkungan"
+        ),
+        "color": "#F59E0B"
+    },
+    HFA_NORMAL: {
+        "title": "✅ STATUS GIZI BAIK",
+        "actions": (
+            "Pertahankan pola makan bergizi seimbang",
+            "Teruskan pemberian ASI eksklusif (0-6 bulan) dan dilanjutkan hingga 2 tahun",
+            "Berikan MPASI yang bervariasi dan bergizi",
+            "Rutin ke Posyandu untuk memantau tumbuh kembang",
+            "Lengkapi imunisasi dasar sesuai jadwal",
+            "Jaga kebersihan dan pola hidup sehat",
+            "Lakukan stimulasi tumbuh kembang secara rutin"
+        ),
+        "color": "#10B981"
+    },
+    HFA_TALL: {
+        "title": "✅ PERTUMBUHAN BAIK",
+        "actions": (
+            "Pertumbuhan anak sangat baik, pertahankan pola asuh yang sehat",
+            "Tetap berikan makanan bergizi seimbang",
+            "Pantau tumbuh kembang secara berkala di Posyandu",
+            "Jaga aktivitas fisik anak tetap seimbang",
+            "Lengkapi imunisasi sesuai jadwal",
+            "Konsultasi rutin untuk memastikan pertumbuhan proporsional"
+        ),
+        "color": "#10B981"
+    },
+    # Dewasa (>19 tahun)
+    HFA_ADULT_VERY_SHORT: {
+        "title": "⚠️ INDIKASI STUNTING DI MASA KECIL",
+        "actions": (
+            "Tinggi badan Anda menunjukkan kemungkinan mengalami stunting di masa kecil",
+            "Konsultasi dengan dokter untuk evaluasi kesehatan secara menyeluruh",
+            "Periksa kemungkinan defisiensi nutrisi yang masih ada",
+            "Jaga pola makan bergizi seimbang untuk kesehatan optimal",
+            "Lakukan pemeriksaan kesehatan rutin",
+            "Penting untuk memastikan anak-anak Anda mendapat nutrisi yang cukup sejak dini",
+            "Konsultasi dengan ahli gizi jika merencanakan kehamilan"
+        ),
+        "color": "#DC2626"
+    },
+    HFA_ADULT_SHORT: {
+        "title": "⚠️ KEMUNGKINAN STUNTING DI MASA KECIL",
+        "actions": (
+            "Tinggi badan Anda sedikit di bawah rata-rata, kemungkinan terkait nutrisi masa kecil",
+            "Konsultasi dengan dokter untuk evaluasi kesehatan",
+            "Jaga pola makan bergizi seimbang",
+            "Lakukan pemeriksaan kesehatan rutin",
+            "Pastikan anak-anak Anda mendapat nutrisi optimal sejak dini",
+            "Konsultasi dengan ahli gizi untuk pola makan yang lebih baik"
+        ),
+        "color": "#F59E0B"
+    },
+    HFA_ADULT_NORMAL: {
+        "title": "✅ PERAWAKAN NORMAL",
+        "actions": (
+            "Tinggi badan Anda berada dalam rentang normal",
+            "Pertahankan pola makan bergizi seimbang",
+            "Jaga kesehatan dengan olahraga teratur",
+            "Lakukan pemeriksaan kesehatan rutin",
+            "Pastikan pola hidup sehat dan istirahat cukup"
+        ),
+        "color": "#10B981"
+    },
+    HFA_ADULT_TALL: {
+        "title": "✅ PERAWAKAN TINGGI",
+        "actions": (
+            "Tinggi badan Anda di atas rata-rata",
+            "Pertahankan pola makan bergizi seimbang",
+            "Jaga kesehatan dengan olahraga teratur",
+            "Lakukan pemeriksaan kesehatan rutin",
+            "Pastikan pola hidup sehat"
+        ),
+        "color": "#10B981"
+    }
+}
+
+# Rekomendasi per kode (dict read-only, aksi berupa tuple)
+HFA_RECOMMENDATIONS = tuple(MappingProxyType(_RECOMMENDATION_TEXT[code]) for code in range(len(HFA_LABELS)))
+del _RECOMMENDATION_TEXT
+
+# Label status -> kode (untuk input berupa teks status)
+HFA_STATUS_CODES = MappingProxyType({label: code for code, label in enumerate(HFA_LABELS)})
+
+# Label per kode; indeks -1 (HFA_UNKNOWN) jatuh ke elemen terakhir None
+_HFA_LABEL_ARRAY = np.array(HFA_LABELS + (None,), dtype=object)
+
+
+def category_codes(zscore, lower_cuts, upper_cuts, n_categories=None):
+    """
+    Kode kategori vektor dari batas Z-Score (tanpa loop per anak)
+
+    Batas bawah tertutup kiri (Z >= batas), batas atas tertutup kanan (Z > batas).
+    Returns: Array int8 kode kategori (-1 untuk Z-Score NaN)
+    """
+    zscore = np.asarray(zscore, dtype=np.float64)
+    codes = (np.searchsorted(lower_cuts, zscore, side='right')
+             + np.searchsorted(upper_cuts, zscore, side='left'))
+    if n_categories is not None:
+        codes = np.minimum(codes, n_categories - 1)
+    return np.where(np.isnan(zscore), HFA_UNKNOWN, codes).astype(np.int8)
+
+
+def classify_hfa_codes(zscore, is_adult=False):
+    """
+    Kode kategori TB/U untuk array Z-Score anak dan dewasa dalam satu pass
+
+    Returns: Array int8 kode (lihat HFA_LABELS); -1 untuk Z-Score NaN
+    """
+    codes = category_codes(zscore, HFA_LOWER_CUTS, HFA_UPPER_CUTS)
+    return np.where((codes >= 0) & np.asarray(is_adult, dtype=bool),
+                    codes + HFA_ADULT_OFFSET, codes).astype(np.int8)
+
+
+def hfa_labels(codes):
+    """Ekspansi kode kategori TB/U ke label (None untuk kode -1); dipakai hanya saat output"""
+    return _HFA_LABEL_ARRAY[np.asarray(codes, dtype=np.intp)]
+
+
 class WHOZScoreCalculator:
     """
     Kalkulator Z-Score berdasarkan standar WHO
-    Menggunakan data referensi WHO untuk Height-for-Age (Tinggi Badan menurut Umur)
+    Menggunakan data referensi WHO untuk Height-for-Age (Tinggi Badan menurut Umur),
+    Weight-for-Age, Weight-for-Length/Height dan BMI-for-Age
     """
     
     def __init__(self):
@@ -89,40 +367,354 @@ class WHOZScoreCalculator:
             216: {'L': 1, 'M': 162.6, 'S': 0.04006},
             228: {'L': 1, 'M': 162.8, 'S': 0.03994}
         }
+        
+        # DATA LAKI-LAKI (Weight-for-Age, 0-60 bulan)
+        self.wfa_male_data = {
+            0: {'L': 0.3487, 'M': 3.3464, 'S': 0.14602},
+            1: {'L': 0.2297, 'M': 4.4709, 'S': 0.13395},
+            2: {'L': 0.1970, 'M': 5.5675, 'S': 0.12385},
+            3: {'L': 0.1738, 'M': 6.3762, 'S': 0.11727},
+            6: {'L': 0.1257, 'M': 7.9340, 'S': 0.10958},
+            9: {'L': 0.0917, 'M': 8.9014, 'S': 0.10881},
+            12: {'L': 0.0644, 'M': 9.6479, 'S': 0.10925},
+            18: {'L': 0.0197, 'M': 10.9385, 'S': 0.11139},
+            24: {'L': -0.0137, 'M': 12.1515, 'S': 0.11426},
+            36: {'L': -0.0789, 'M': 14.3429, 'S': 0.12051},
+            48: {'L': -0.1315, 'M': 16.3489, 'S': 0.12652},
+            60: {'L': -0.1737, 'M': 18.3366, 'S': 0.13178}
+        }
+        
+        # DATA PEREMPUAN (Weight-for-Age, 0-60 bulan)
+        self.wfa_female_data = {
+            0: {'L': 0.3809, 'M': 3.2322, 'S': 0.14171},
+            1: {'L': 0.1714, 'M': 4.1873, 'S': 0.13724},
+            2: {'L': 0.0962, 'M': 5.1282, 'S': 0.13000},
+            3: {'L': 0.0402, 'M': 5.8458, 'S': 0.12619},
+            6: {'L': -0.0756, 'M': 7.2970, 'S': 0.12204},
+            9: {'L': -0.1467, 'M': 8.2254, 'S': 0.12157},
+            12: {'L': -0.2024, 'M': 8.9481, 'S': 0.12268},
+            18: {'L': -0.2475, 'M': 10.2315, 'S': 0.12577},
+            24: {'L': -0.2941, 'M': 11.4775, 'S': 0.13000},
+            36: {'L': -0.3364, 'M': 13.8503, 'S': 0.13722},
+            48: {'L': -0.3520, 'M': 16.0697, 'S': 0.14377},
+            60: {'L': -0.3615, 'M': 18.2193, 'S': 0.14888}
+        }
+        
+        # DATA LAKI-LAKI (Weight-for-Length/Height, 45-120 cm)
+        self.wfh_male_data = {
+            45: {'L': -0.3521, 'M': 2.4410, 'S': 0.09182},
+            50: {'L': -0.3521, 'M': 3.3278, 'S': 0.08890},
+            55: {'L': -0.3521, 'M': 4.5349, 'S': 0.08562},
+            60: {'L': -0.3521, 'M': 5.9423, 'S': 0.08291},
+            65: {'L': -0.3521, 'M': 7.4327, 'S': 0.08167},
+            70: {'L': -0.3521, 'M': 8.6104, 'S': 0.08111},
+            75: {'L': -0.3521, 'M': 9.6469, 'S': 0.08058},
+            80: {'L': -0.3521, 'M': 10.6822, 'S': 0.08031},
+            85: {'L': -0.3521, 'M': 11.8300, 'S': 0.08070},
+            90: {'L': -0.3521, 'M': 12.9865, 'S': 0.08148},
+            95: {'L': -0.3521, 'M': 14.1708, 'S': 0.08249},
+            100: {'L': -0.3521, 'M': 15.4000, 'S': 0.08361},
+            105: {'L': -0.3521, 'M': 16.7600, 'S': 0.08491},
+            110: {'L': -0.3521, 'M': 18.2700, 'S': 0.08636},
+            115: {'L': -0.3521, 'M': 19.9600, 'S': 0.08795},
+            120: {'L': -0.3521, 'M': 21.8000, 'S': 0.08966}
+        }
+        
+        # DATA PEREMPUAN (Weight-for-Length/Height, 45-120 cm)
+        self.wfh_female_data = {
+            45: {'L': -0.3833, 'M': 2.4607, 'S': 0.09029},
+            50: {'L': -0.3833, 'M': 3.3254, 'S': 0.08905},
+            55: {'L': -0.3833, 'M': 4.4452, 'S': 0.08754},
+            60: {'L': -0.3833, 'M': 5.7540, 'S': 0.08589},
+            65: {'L': -0.3833, 'M': 7.2402, 'S': 0.08479},
+            70: {'L': -0.3833, 'M': 8.3420, 'S': 0.08452},
+            75: {'L': -0.3833, 'M': 9.3800, 'S': 0.08444},
+            80: {'L': -0.3833, 'M': 10.4000, 'S': 0.08464},
+            85: {'L': -0.3833, 'M': 11.5500, 'S': 0.08520},
+            90: {'L': -0.3833, 'M': 12.7800, 'S': 0.08600},
+            95: {'L': -0.3833, 'M': 14.0600, 'S': 0.08702},
+            100: {'L': -0.3833, 'M': 15.4400, 'S': 0.08818},
+            105: {'L': -0.3833, 'M': 16.9500, 'S': 0.08946},
+            110: {'L': -0.3833, 'M': 18.6300, 'S': 0.09084},
+            115: {'L': -0.3833, 'M': 20.5000, 'S': 0.09231},
+            120: {'L': -0.3833, 'M': 22.5300, 'S': 0.09385}
+        }
+        
+        # DATA LAKI-LAKI (BMI-for-Age, 0-60 bulan)
+        self.bfa_male_data = {
+            0: {'L': -0.3053, 'M': 13.4069, 'S': 0.09560},
+            1: {'L': 0.2708, 'M': 14.9441, 'S': 0.09027},
+            2: {'L': 0.1118, 'M': 16.3195, 'S': 0.08677},
+            3: {'L': 0.0068, 'M': 16.8987, 'S': 0.08495},
+            6: {'L': -0.1830, 'M': 17.3422, 'S': 0.08217},
+            9: {'L': -0.2700, 'M': 17.1946, 'S': 0.08113},
+            12: {'L': -0.3290, 'M': 16.8987, 'S': 0.08108},
+            18: {'L': -0.4288, 'M': 16.3825, 'S': 0.08132},
+            24: {'L': -0.6187, 'M': 16.0189, 'S': 0.08046},
+            36: {'L': -0.7387, 'M': 15.6107, 'S': 0.08033},
+            48: {'L': -0.8508, 'M': 15.3893, 'S': 0.08104},
+            60: {'L': -0.9424, 'M': 15.2641, 'S': 0.08253}
+        }
+        
+        # DATA PEREMPUAN (BMI-for-Age, 0-60 bulan)
+        self.bfa_female_data = {
+            0: {'L': -0.0631, 'M': 13.3363, 'S': 0.09272},
+            1: {'L': 0.3448, 'M': 14.5679, 'S': 0.09556},
+            2: {'L': 0.1749, 'M': 15.7679, 'S': 0.09371},
+            3: {'L': 0.0643, 'M': 16.3574, 'S': 0.09254},
+            6: {'L': -0.1524, 'M': 16.9374, 'S': 0.09062},
+            9: {'L': -0.2746, 'M': 16.7290, 'S': 0.08924},
+            12: {'L': -0.3796, 'M': 16.3859, 'S': 0.08862},
+            18: {'L': -0.4909, 'M': 15.9213, 'S': 0.08850},
+            24: {'L': -0.5684, 'M': 15.6881, 'S': 0.08878},
+            36: {'L': -0.6847, 'M': 15.4115, 'S': 0.09016},
+            48: {'L': -0.7793, 'M': 15.2862, 'S': 0.09229},
+            60: {'L': -0.8509, 'M': 15.2441, 'S': 0.09432}
+        }
+        
+        # Registry indikator: setiap indikator disimpan sebagai tabel NumPy ringkas
+        self.indicators = {}
+        self.daily_tables = {}
+        self.register_indicator('hfa', self.male_data, self.female_data,
+                                clamp=True,
+                                lower_cuts=HFA_LOWER_CUTS, upper_cuts=HFA_UPPER_CUTS,
+                                labels=HFA_LABELS[:HFA_ADULT_OFFSET],
+                                adult_labels=HFA_LABELS[HFA_ADULT_OFFSET:])
+        self.register_indicator('wfa', self.wfa_male_data, self.wfa_female_data,
+                                adjust_tails=True,
+                                lower_cuts=(-3, -2), upper_cuts=(1,),
+                                labels=("Berat Badan Sangat Kurang (Severely Underweight)",
+                                        "Berat Badan Kurang (Underweight)",
+                                        "Berat Badan Normal",
+                                        "Risiko Berat Badan Lebih"))
+        wasting_labels = ("Gizi Buruk (Severely Wasted)", "Gizi Kurang (Wasted)",
+                          "Gizi Baik (Normal)", "Berisiko Gizi Lebih",
+                          "Gizi Lebih (Overweight)", "Obesitas (Obese)")
+        self.register_indicator('wfh', self.wfh_male_data, self.wfh_female_data,
+                                adjust_tails=True,
+                                lower_cuts=(-3, -2), upper_cuts=(1, 2, 3),
+                                labels=wasting_labels)
+        self.register_indicator('bfa', self.bfa_male_data, self.bfa_female_data,
+                                adjust_tails=True,
+                                lower_cuts=(-3, -2), upper_cuts=(1, 2, 3),
+                                labels=wasting_labels)
+        
+        # Tabel LMS per hari umur, dibangun sekali (lookup O(1) untuk umur dalam hari)
+        for name in AGE_INDICATORS:
+            self.daily_tables[name] = self.build_daily_table(name)
+        self.adult_age_days = max(self.male_data) * DAYS_PER_MONTH
+    
+    def register_indicator(self, name, male_data, female_data, clamp=False, adjust_tails=False,
+                           lower_cuts=(), upper_cuts=(), labels=(), adult_labels=None):
+        """
+        Mendaftarkan indikator WHO sebagai tabel LMS NumPy
+        
+        Parameters:
+        - name: Kode indikator (mis. 'hfa', 'wfa', 'wfh', 'bfa')
+        - male_data, female_data: Dict {x: {'L', 'M', 'S'}} dengan x = umur (bulan) atau panjang/tinggi (cm)
+        - clamp: True -> x di luar tabel memakai nilai tepi, False -> hasil NaN
+        - adjust_tails: Terapkan koreksi WHO untuk |Z| > 3 (indikator berbasis berat badan)
+        - lower_cuts: Batas kategori tertutup kiri (Z >= batas)
+        - upper_cuts: Batas kategori tertutup kanan (Z > batas)
+        - labels: Nama kategori, len(lower_cuts) + len(upper_cuts) + 1 buah
+        - adult_labels: Nama kategori untuk usia di atas tabel (opsional)
+        """
+        tables = []
+        for data in (male_data, female_data):
+            keys = sorted(data.keys())
+            # Baris: x, L, M, S
+            tables.append(np.array(
+                [keys,
+                 [data[k]['L'] for k in keys],
+                 [data[k]['M'] for k in keys],
+                 [data[k]['S'] for k in keys]],
+                dtype=np.float64
+            ))
+        
+        self.indicators[name] = {
+            'tables': tables,
+            'clamp': clamp,
+            'adjust_tails': adjust_tails,
+            'lower_cuts': np.asarray(lower_cuts, dtype=np.float64),
+            'upper_cuts': np.asarray(upper_cuts, dtype=np.float64),
+            'labels': np.asarray(labels, dtype=object),
+            'adult_labels': np.asarray(adult_labels if adult_labels else labels, dtype=object)
+        }
+    
+    def build_daily_table(self, indicator):
+        """
+        Tabel L, M, S indikator berbasis umur untuk setiap hari 0 .. umur maksimum tabel
+        
+        Nilai per hari diinterpolasi dari titik tabel bulanan, sehingga hasilnya sama dengan
+        interpolate_lms_array pada umur (hari / DAYS_PER_MONTH).
+        
+        Returns: Array float64 read-only (jenis kelamin, hari, [L, M, S])
+        """
+        spec = self.indicators[indicator]
+        max_days = int(np.ceil(max(table[0][-1] for table in spec['tables']) * DAYS_PER_MONTH))
+        age_months = np.arange(max_days + 1) / DAYS_PER_MONTH
+        table = np.stack([
+            np.stack(self.interpolate_lms_array(indicator, age_months, code), axis=-1)
+            for code in range(len(spec['tables']))
+        ])
+        table.setflags(write=False)
+        return table
+    
+    def lms_by_days(self, indicator, age_days, sex_code):
+        """
+        L, M, S dari tabel harian dengan indexing langsung (umur dibulatkan ke hari terdekat)
+        
+        Umur di luar tabel memakai baris tepi jika indikator di-clamp, selain itu NaN
+        (sama dengan interpolate_lms_array); umur NaN menghasilkan NaN.
+        
+        Returns: (L, M, S) array
+        """
+        table = self.daily_tables[indicator]
+        last = table.shape[1] - 1
+        days = np.rint(np.asarray(age_days, dtype=np.float64))
+        sex_code = np.broadcast_to(np.asarray(sex_code), days.shape)
+        
+        if self.indicators[indicator]['clamp']:
+            valid = ~np.isnan(days)
+        else:
+            valid = (days >= 0) & (days <= last)
+        index = np.clip(np.where(valid, days, 0), 0, last).astype(np.intp)
+        lms = table[sex_code, index]
+        lms = np.where(valid[..., None], lms, np.nan)
+        return lms[..., 0], lms[..., 1], lms[..., 2]
     
     def interpolate_lms(self, age_months, gender):
         """
         Interpolasi nilai L, M, S untuk umur yang tidak ada di tabel
         Returns: (L, M, S, is_adult)
         """
-        data = self.male_data if gender.lower() == 'laki-laki' else self.female_data
+        x, L_values, M_values, S_values = self.indicators['hfa']['tables'][encode_gender(gender)]
         
-        ages = sorted(data.keys())
-        is_adult = False
+        # Flag untuk usia dewasa (>19 tahun); umur di luar range memakai nilai terdekat
+        is_adult = age_months > x[-1]
         
-        # Jika umur di luar range, gunakan nilai terdekat
-        if age_months < min(ages):
-            age_months = min(ages)
-        elif age_months > max(ages):
-            age_months = max(ages)
-            is_adult = True  # Flag untuk usia dewasa (>19 tahun)
+        L = np.interp(age_months, x, L_values)
+        M = np.interp(age_months, x, M_values)
+        S = np.interp(age_months, x, S_values)
         
-        # Jika umur tepat ada di data
-        if age_months in data:
-            return data[age_months]['L'], data[age_months]['M'], data[age_months]['S'], is_adult
+        return L, M, S, is_adult
+    
+    def interpolate_lms_array(self, indicator, x, sex_code):
+        """
+        Interpolasi L, M, S untuk array x sekaligus
+        
+        Parameters:
+        - indicator: Kode indikator yang sudah didaftarkan
+        - x: Array umur (bulan) atau panjang/tinggi (cm)
+        - sex_code: Array kode jenis kelamin (0 = laki-laki, 1 = perempuan)
+        
+        Returns: (L, M, S) array; NaN untuk x di luar tabel jika indikator tidak di-clamp
+        """
+        spec = self.indicators[indicator]
+        x = np.asarray(x, dtype=np.float64)
+        sex_code = np.broadcast_to(np.asarray(sex_code), x.shape)
         
-        # Interpolasi linear
-        L_values = [data[age]['L'] for age in ages]
-        M_values = [data[age]['M'] for age in ages]
-        S_values = [data[age]['S'] for age in ages]
+        L = np.full(x.shape, np.nan)
+        M = np.full(x.shape, np.nan)
+        S = np.full(x.shape, np.nan)
         
-        L = np.interp(age_months, ages, L_values)
-        M = np.interp(age_months, ages, M_values)
-        S = np.interp(age_months, ages, S_values)
+        # Satu kali np.interp per jenis kelamin, bukan per anak
+        for code, (tx, tL, tM, tS) in enumerate(spec['tables']):
+            mask = sex_code == code
+            if not mask.any():
+                continue
+            xs = x[mask]
+            L[mask] = np.interp(xs, tx, tL)
+            M[mask] = np.interp(xs, tx, tM)
+            S[mask] = np.interp(xs, tx, tS)
+            if not spec['clamp']:
+                outside = (xs < tx[0]) | (xs > tx[-1])
+                idx = np.flatnonzero(mask)[outside]
+                L[idx] = M[idx] = S[idx] = np.nan
         
-        return L, M, S, is_adult
+        return L, M, S
     
-    def calculate_zscore(self, age_months, height_cm, gender):
+    def calculate_indicator(self, indicator, x, measurement, gender, decimals=2, x_in_days=False):
+        """
+        Menghitung Z-Score indikator WHO untuk array anak dalam satu kernel vektor
+        
+        Parameters:
+        - indicator: 'hfa' (x = umur, TB), 'wfa' (x = umur, BB),
+                     'wfh' (x = TB, BB) atau 'bfa' (x = umur, IMT)
+        - x: Array umur (bulan) atau panjang/tinggi (cm)
+        - measurement: Array nilai pengukuran (cm, kg atau kg/m²)
+        - gender: Array 'laki-laki'/'perempuan' atau kode 0/1
+        - decimals: Pembulatan hasil (None = tanpa pembulatan)
+        - x_in_days: True jika x adalah umur dalam hari (tabel LMS harian, indikator berbasis umur)
+        
+        Returns:
+        - zscore: Array Z-Score (NaN jika di luar cakupan tabel)
+        """
+        spec = self.indicators[indicator]
+        y = np.asarray(measurement, dtype=np.float64)
+        if x_in_days:
+            L, M, S = self.lms_by_days(indicator, x, encode_gender(gender))
+        else:
+            L, M, S = self.interpolate_lms_array(indicator, x, encode_gender(gender))
+        
+        zscore = lms_zscore(y, L, M, S)
+        
+        if spec['adjust_tails']:
+            zscore = _adjust_zscore_tails(zscore, y, L, M, S)
+        
+        if decimals is not None:
+            zscore = np.round(zscore, decimals)
+        return zscore
+    
+    def calculate_all_indicators(self, age_months, height_cm, weight_kg, gender, age_days=None):
+        """
+        Menghitung semua indikator antropometri (TB/U, BB/U, BB/TB, IMT/U) sekaligus
+        
+        Jika age_days diberikan, indikator berbasis umur memakai tabel LMS harian
+        (age_months boleh None).
+        
+        Returns: Dict {kode_indikator: array Z-Score}
+        """
+        age, in_days = (age_days, True) if age_days is not None else (age_months, False)
+        height_cm = np.asarray(height_cm, dtype=np.float64)
+        weight_kg = np.asarray(weight_kg, dtype=np.float64)
+        sex_code = encode_gender(gender)
+        bmi = weight_kg / (height_cm / 100) ** 2
+        
+        return {
+            'hfa': self.calculate_indicator('hfa', age, height_cm, sex_code, x_in_days=in_days),
+            'wfa': self.calculate_indicator('wfa', age, weight_kg, sex_code, x_in_days=in_days),
+            'wfh': self.calculate_indicator('wfh', height_cm, weight_kg, sex_code),
+            'bfa': self.calculate_indicator('bfa', age, bmi, sex_code, x_in_days=in_days)
+        }
+    
+    def indicator_codes(self, indicator, zscore):
+        """Kode kategori vektor indikator (indeks ke label; -1 untuk Z-Score NaN)"""
+        spec = self.indicators[indicator]
+        return category_codes(zscore, spec['lower_cuts'], spec['upper_cuts'], len(spec['labels']))
+    
+    def classify_indicator(self, indicator, zscore, is_adult=None):
+        """
+        Klasifikasi vektor Z-Score ke kategori indikator (tanpa loop per anak)
+        
+        Parameters:
+        - indicator: Kode indikator
+        - zscore: Array Z-Score
+        - is_adult: Array boolean opsional; baris True memakai label dewasa
+        
+        Returns: Array label kategori (None untuk Z-Score NaN)
+        """
+        spec = self.indicators[indicator]
+        codes = self.indicator_codes(indicator, zscore)
+        
+        # Kode dibulatkan ke 0 untuk NaN saat indexing, lalu dikembalikan ke None
+        safe_codes = np.maximum(codes, 0)
+        labels = spec['labels'][safe_codes]
+        if is_adult is not None:
+            labels = np.where(is_adult, spec['adult_labels'][safe_codes], labels)
+        return np.where(codes < 0, None, labels)
+    
+    def calculate_zscore(self, age_months, height_cm, gender, age_days=None):
         """
         Menghitung Z-Score Height-for-Age menggunakan metode LMS WHO
         
@@ -132,20 +724,24 @@ class WHOZScoreCalculator:
         - age_months: Umur dalam bulan (0-228 / 0-19 tahun)
         - height_cm: Tinggi badan dalam cm
         - gender: 'Laki-laki' atau 'Perempuan'
+        - age_days: Umur dalam hari (opsional, lebih presisi; age_months diabaikan)
         
         Returns:
         - zscore: Nilai Z-Score
         - is_adult: Boolean flag apakah usia > 19 tahun
         """
-        L, M, S, is_adult = self.interpolate_lms(age_months, gender)
+        if age_days is not None:
+            # Lookup langsung satu baris tabel harian (TB/U di-clamp di kedua sisi)
+            table = self.daily_tables['hfa']
+            L, M, S = table[encode_gender(gender), min(max(round(age_days), 0), table.shape[1] - 1)]
+            is_adult = age_days > self.adult_age_days
+        else:
+            L, M, S, is_adult = self.interpolate_lms(age_months, gender)
         
         # Formula WHO LMS method
-        if L != 0:
-            zscore = (((height_cm / M) ** L) - 1) / (L * S)
-        else:
-            zscore = np.log(height_cm / M) / S
+        zscore = float(lms_zscore(height_cm, L, M, S))
         
-        return round(zscore, 2), is_adult
+        return round(zscore, 2), bool(is_adult)
     
     def classify_nutrition_status(self, zscore, is_adult=False):
         """
@@ -158,157 +754,23 @@ class WHOZScoreCalculator:
         - Tall: Z-score > +3 SD
         
         Untuk dewasa (>19 tahun), menggunakan referensi tinggi rata-rata
+        (label lihat HFA_LABELS; untuk array gunakan classify_hfa_codes)
         """
-        if is_adult:
-            # Untuk dewasa, gunakan klasifikasi berdasarkan perbandingan dengan standar akhir (19 tahun)
-            if zscore < -3:
-                return "Perawakan Sangat Pendek (Kemungkinan Stunting di Masa Kecil)"
-            elif -3 <= zscore < -2:
-                return "Perawakan Pendek (Kemungkinan Stunting di Masa Kecil)"
-            elif -2 <= zscore <= 3:
-                return "Perawakan Normal"
-            else:
-                return "Perawakan Tinggi"
-        else:
-            if zscore < -3:
-                return "Severely Stunted (Sangat Pendek)"
-            elif -3 <= zscore < -2:
-                return "Stunted (Pendek)"
-            elif -2 <= zscore <= 3:
-                return "Normal"
-            else:
-                return "Tall (Tinggi)"
+        code = int(classify_hfa_codes(zscore, is_adult))
+        return HFA_LABELS[code] if code != HFA_UNKNOWN else None
     
     def get_recommendation(self, zscore, status):
         """
-        Memberikan rekomendasi berdasarkan status gizi
+        Memberikan rekomendasi berdasarkan status gizi (dict read-only dari HFA_RECOMMENDATIONS)
         """
-        recommendations = {
-            "Severely Stunted (Sangat Pendek)": {
-                "title": "⚠️ PERLU PERHATIAN SERIUS",
-                "actions": [
-                    "Segera konsultasi ke Dokter Spesialis Anak atau Puskesmas terdekat",
-                    "Anak memerlukan intervensi gizi intensif dengan Pemberian Makanan Tambahan (PMT) tinggi protein",
-                    "Berikan makanan bergizi tinggi: telur, ikan, daging, tahu/tempe setiap hari",
-                    "Pastikan ASI terus diberikan jika anak masih menyusui",
-                    "Periksa dan obati penyakit penyerta (cacingan, TBC, diare kronis)",
-                    "Lakukan stimulasi tumbuh kembang secara rutin",
-                    "Pantau pertumbuhan setiap bulan di Posyandu"
-                ],
-                "color": "#DC2626"
-            },
-            "Stunted (Pendek)": {
-                "title": "⚠️ PERLU PERBAIKAN GIZI",
-                "actions": [
-                    "Konsultasikan ke Bidan Desa atau Puskesmas untuk evaluasi lebih lanjut",
-                    "Tingkatkan asupan protein hewani: minimal 1 butir telur/hari",
-                    "Berikan makanan beragam dengan gizi seimbang (Isi Piringku)",
-                    "Teruskan pemberian ASI hingga 2 tahun jika masih menyusui",
-                    "Berikan MPASI yang tepat sesuai usia anak",
-                    "Rutin ke Posyandu untuk pemantauan pertumbuhan",
-                    "Jaga kebersihan dan sanitasi lingkungan"
-                ],
-                "color": "#F59E0B"
-            },
-            "Normal": {
-                "title": "✅ STATUS GIZI BAIK",
-                "actions": [
-                    "Pertahankan pola makan bergizi seimbang",
-                    "Teruskan pemberian ASI eksklusif (0-6 bulan) dan dilanjutkan hingga 2 tahun",
-                    "Berikan MPASI yang bervariasi dan bergizi",
-                    "Rutin ke Posyandu untuk memantau tumbuh kembang",
-                    "Lengkapi imunisasi dasar sesuai jadwal",
-                    "Jaga kebersihan dan pola hidup sehat",
-                    "Lakukan stimulasi tumbuh kembang secara rutin"
-                ],
-                "color": "#10B981"
-            },
-            "Tall (Tinggi)": {
-                "title": "✅ PERTUMBUHAN BAIK",
-                "actions": [
-                    "Pertumbuhan anak sangat baik, pertahankan pola asuh yang sehat",
-                    "Tetap berikan makanan bergizi seimbang",
-                    "Pantau tumbuh kembang secara berkala di Posyandu",
-                    "Jaga aktivitas fisik anak tetap seimbang",
-                    "Lengkapi imunisasi sesuai jadwal",
-                    "Konsultasi rutin untuk memastikan pertumbuhan proporsional"
-                ],
-                "color": "#10B981"
-            },
-            # Rekomendasi untuk dewasa (>19 tahun)
-            "Perawakan Sangat Pendek (Kemungkinan Stunting di Masa Kecil)": {
-                "title": "⚠️ INDIKASI STUNTING DI MASA KECIL",
-                "actions": [
-                    "Tinggi badan Anda menunjukkan kemungkinan mengalami stunting di masa kecil",
-                    "Konsultasi dengan dokter untuk evaluasi kesehatan secara menyeluruh",
-                    "Periksa kemungkinan defisiensi nutrisi yang masih ada",
-                    "Jaga pola makan bergizi seimbang untuk kesehatan optimal",
-                    "Lakukan pemeriksaan kesehatan rutin",
-                    "Penting untuk memastikan anak-anak Anda mendapat nutrisi yang cukup sejak dini",
-                    "Konsultasi dengan ahli gizi jika merencanakan kehamilan"
-                ],
-                "color": "#DC2626"
-            },
-            "Perawakan Pendek (Kemungkinan Stunting di Masa Kecil)": {
-                "title": "⚠️ KEMUNGKINAN STUNTING DI MASA KECIL",
-                "actions": [
-                    "Tinggi badan Anda sedikit di bawah rata-rata, kemungkinan terkait nutrisi masa kecil",
-                    "Konsultasi dengan dokter untuk evaluasi kesehatan",
-                    "Jaga pola makan bergizi seimbang",
-                    "Lakukan pemeriksaan kesehatan rutin",
-                    "Pastikan anak-anak Anda mendapat nutrisi optimal sejak dini",
-                    "Konsultasi dengan ahli gizi untuk pola makan yang lebih baik"
-                ],
-                "color": "#F59E0B"
-            },
-            "Perawakan Normal": {
-                "title": "✅ PERAWAKAN NORMAL",
-                "actions": [
-                    "Tinggi badan Anda berada dalam rentang normal",
-                    "Pertahankan pola makan bergizi seimbang",
-                    "Jaga kesehatan dengan olahraga teratur",
-                    "Lakukan pemeriksaan kesehatan rutin",
-                    "Pastikan pola hidup sehat dan istirahat cukup"
-                ],
-                "color": "#10B981"
-            },
-            "Perawakan Tinggi": {
-                "title": "✅ PERAWAKAN TINGGI",
-                "actions": [
-                    "Tinggi badan Anda di atas rata-rata",
-                    "Pertahankan pola makan bergizi seimbang",
-                    "Jaga kesehatan dengan olahraga teratur",
-                    "Lakukan pemeriksaan kesehatan rutin",
-                    "Pastikan pola hidup sehat"
-                ],
-                "color": "#10B981"
-            }
-        }
-        
-        return recommendations.get(status, recommendations["Normal"])
+        return HFA_RECOMMENDATIONS[HFA_STATUS_CODES.get(status, HFA_NORMAL)]
     
     def get_zscore_interpretation(self, zscore, is_adult=False):
         """
         Interpretasi nilai Z-Score untuk user
         """
-        if is_adult:
-            if zscore < -3:
-                return "Tinggi badan berada sangat jauh di bawah standar rata-rata dewasa. Ini mungkin indikasi stunting yang terjadi di masa kecil."
-            elif -3 <= zscore < -2:
-                return "Tinggi badan berada di bawah standar rata-rata dewasa. Ini mungkin indikasi stunting yang terjah di masa kecil."
-            elif -2 <= zscore <= 3:
-                return "Tinggi badan berada dalam rentang normal untuk dewasa."
-            else:
-                return "Tinggi badan berada di atas standar rata-rata dewasa."
-        else:
-            if zscore < -3:
-                return "Tinggi badan anak berada sangat jauh di bawah standar WHO untuk usianya."
-            elif -3 <= zscore < -2:
-                return "Tinggi badan anak berada di bawah standar WHO untuk usianya."
-            elif -2 <= zscore <= 3:
-                return "Tinggi badan anak sesuai dengan standar WHO untuk usianya."
-            else:
-                return "Tinggi badan anak berada di atas standar WHO untuk usianya."
+        code = int(classify_hfa_codes(zscore, is_adult))
+        return HFA_INTERPRETATIONS[code] if code != HFA_UNKNOWN else None
 
 
 # Testing function